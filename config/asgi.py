@@ -3,6 +3,18 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Production runs this entry point with uvicorn workers, so the async event
+endpoints (notifications/streams.py) can hold many idle SSE/long-poll
+connections without tying up a worker each:
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --workers 3
+
+The hot read endpoints (feed, profile, notifications) are async views under
+ASGI as well (core/async_views.py, ASYNC_READ_VIEWS). To compare throughput
+against the WSGI path, serve the same database both ways and run:
+
+    python manage.py benchmark --server http://127.0.0.1:8000 --concurrency 16
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
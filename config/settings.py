@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.instrumentation.PerformanceMiddleware", # Primeiro: mede a requisição inteira (ver core/instrumentation.py).
+    "core.db_routing.ReplicaRoutingMiddleware", # Leituras em réplicas, com read-your-writes (ver core/db_routing.py).
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
@@ -103,8 +105,23 @@ DATABASES = {
     }
 }
 
+def _database(url):
+    # SSL obrigatório só faz sentido no PostgreSQL (o sqlite rejeita a opção sslmode).
+    return dj_database_url.parse(url, conn_max_age=600, ssl_require=url.startswith(("postgres://", "postgresql://")))
+
+
 if os.environ.get("DATABASE_URL"):
-    DATABASES["default"] = dj_database_url.parse(os.environ["DATABASE_URL"], conn_max_age=600, ssl_require=True)
+    DATABASES["default"] = _database(os.environ["DATABASE_URL"])
+
+# Réplicas de leitura (ver core/db_routing.py): URLs separadas por vírgula em DATABASE_REPLICA_URLS.
+# Para testar localmente, aponte para uma cópia do banco (ex.: sqlite:////tmp/replica.sqlite3).
+for index, url in enumerate(filter(None, os.environ.get("DATABASE_REPLICA_URLS", "").split(",")), start=1):
+    DATABASES[f"replica{index}"] = {**_database(url.strip()), "TEST": {"MIRROR": "default"}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["core.db_routing.ReplicaRouter"]
+READ_YOUR_WRITES_SECONDS = 10 # Depois de escrever, o usuário lê do primário por este tempo (cobre o atraso da réplica).
+REPLICA_RETRY_SECONDS = 30 # Réplica que falhou ao conectar fica fora por este tempo.
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -148,6 +165,20 @@ if not DEBUG:
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_CACHE_MAX_AGE = 60 * 60 # Segundos de cache para arquivos sem hash no nome (originais, avatar padrão).
+# Envio pelo proxy da frente: "nginx" (X-Accel-Redirect para MEDIA_ACCEL_PREFIX, uma location internal
+# com alias para MEDIA_ROOT) ou "apache" (X-Sendfile com o caminho absoluto). Vazio: o Django envia o arquivo.
+MEDIA_ACCEL = os.environ.get("MEDIA_ACCEL", "")
+MEDIA_ACCEL_PREFIX = "/protected-media/"
+
+# Avatares (ver core/avatars.py): miniaturas quadradas geradas fora da requisição, com hash do conteúdo no nome.
+AVATAR_SIZES = {"small": 96, "medium": 200, "large": 400} # Lado em pixels (small cobre o avatar de 48px dos posts em telas 2x).
+AVATAR_VARIANTS_DIR = "avatars/v"
+AVATAR_DEFAULT = "avatars/default1.png"
+AVATAR_MAX_UPLOAD_BYTES = 5 * 1024 * 1024
+AVATAR_MAX_PIXELS = 40_000_000
+AVATAR_PROCESSING = os.environ.get("AVATAR_PROCESSING", "thread") # "thread" (pool em segundo plano) ou "sync".
+AVATAR_WORKERS = 2
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -161,9 +192,13 @@ CORS_ALLOW_CREDENTIALS = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.ConcurrentLimitOffsetPagination',
     'PAGE_SIZE': 5,
 }
 
@@ -188,4 +223,88 @@ SIMPLE_JWT = {
 
     # Define o tempo de vida dos tokens.
     # Tokens são rotacionados e podem ser colocados em blacklist após uso.
-}
\ No newline at end of file
+}
+# Timeline (feed) materializada.
+TIMELINE_FANOUT_LIMIT = int(os.environ.get("TIMELINE_FANOUT_LIMIT", 5000)) # Acima disso o autor é "popular": sem fan-out na escrita, lido na hora do feed.
+TIMELINE_BACKFILL_SIZE = int(os.environ.get("TIMELINE_BACKFILL_SIZE", 200)) # Quantos posts recentes copiar ao seguir alguém.
+
+# Cache compartilhado. Sem REDIS_URL usa memória local (por processo), suficiente para desenvolvimento e testes.
+# "fragments" guarda os posts serializados (ver core/fragments.py): o LocMem descarta os menos usados ao passar de
+# MAX_ENTRIES (LRU); no Redis a expiração é pelo TIMEOUT e pela política de memória do servidor (allkeys-lru).
+FRAGMENT_CACHE_TTL = 60 * 60
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": os.environ["REDIS_URL"]},
+        "fragments": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": os.environ["REDIS_URL"],
+                      "KEY_PREFIX": "fragments", "TIMEOUT": FRAGMENT_CACHE_TTL},
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "xplace"},
+        "fragments": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "xplace-fragments",
+                      "TIMEOUT": FRAGMENT_CACHE_TTL, "OPTIONS": {"MAX_ENTRIES": 10000}},
+    }
+
+# Trending (posts em alta), recalculado por `manage.py compute_trending`.
+TRENDING_WINDOWS = {"1h": 60 * 60, "24h": 60 * 60 * 24, "7d": 60 * 60 * 24 * 7} # Janelas disponíveis, em segundos.
+TRENDING_DEFAULT_WINDOW = "24h"
+TRENDING_HALF_LIFE_RATIO = 0.25 # Meia-vida do peso de um evento, como fração da janela.
+TRENDING_WEIGHTS = {"like": 1.0, "bookmark": 1.5, "repost": 2.0}
+TRENDING_SIZE = 50 # Quantos posts guardar por janela.
+TRENDING_CACHE_TTL = 60 # Segundos que a lista pronta fica no cache antes de reler a tabela TrendingPost.
+TRENDING_REBUILD_SECONDS = 60 * 60 # A cada quanto o compute_trending recalcula a janela inteira em vez de só o incremento.
+
+# Instrumentação (ver core/instrumentation.py): Server-Timing, log de requisições lentas e /metrics.
+PERF_SERVER_TIMING = os.environ.get("PERF_SERVER_TIMING", "0") == "1" # Desligado por padrão: expõe tempos de banco a qualquer cliente.
+PERF_SLOW_REQUEST_MS = int(os.environ.get("PERF_SLOW_REQUEST_MS", "500"))
+PERF_WORST_QUERIES = 3 # Consultas mais lentas citadas no log de requisição lenta.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "") # /metrics exige "Authorization: Bearer <token>"; sem token fica desligado (404).
+
+# Usuário autenticado em cache nas leituras (ver core/authentication.py).
+AUTH_USER_CACHE_TTL = 30 # Segundos.
+
+# Índice do grafo de follows em cache (ver core/graph.py).
+GRAPH_CACHE_TTL = 60 * 10 # Segundos.
+GRAPH_LOCAL_CACHE_TTL = 5 # Segundos, com cache local por processo (sem REDIS_URL): limita o atraso entre workers.
+GRAPH_MAX_IDS = 50000 # Acima disso a lista de seguidores de um perfil não vai para o cache.
+
+# Sincronização incremental GET /api/sync/ (ver core/sync.py e core/changes.py).
+SYNC_RETENTION = 60 * 60 * 24 * 7 # Segundos de registro de mudanças guardados (comando prune_changes); tokens mais antigos pedem resync.
+SYNC_SETTLE_SECONDS = 2 # Mudanças mais novas que isso ficam para a próxima sincronização (transações ainda abertas).
+SYNC_MAX_POSTS = 50 # Posts novos do feed por resposta; acima disso posts_truncated pede recarregar o topo.
+SYNC_MAX_HELD = 500 # Ids de posts que o cliente pode informar em ?posts=.
+
+# Hashtags (ver core/tags.py): janela das "tags em alta", com baldes por hora expirados junto com compute_trending.
+HASHTAG_TRENDING_WINDOW = 60 * 60 * 24
+
+# Sugestões de quem seguir, pré-calculadas por `manage.py compute_suggestions`.
+SUGGESTIONS_PER_USER = 50 # Candidatos guardados por usuário.
+SUGGESTIONS_SAMPLE_POOL = 20 # A requisição sorteia entre os N melhores candidatos.
+SUGGESTIONS_MUTUAL_WEIGHT = 2.0 # Peso de cada seguido em comum, somado a log(1 + seguidores do candidato).
+
+# Entrega de notificações: "outbox" grava um evento na requisição e o worker `manage.py deliver_notifications`
+# entrega em lote; "sync" grava a notificação na própria requisição. "outbox" só com o worker rodando (no
+# render.yaml os dois vêm juntos): sem ele nada é entregue. O atraso da fila aparece em /metrics
+# (notifications_outbox_oldest_seconds).
+NOTIFICATIONS_DELIVERY = os.environ.get("NOTIFICATIONS_DELIVERY", "sync")
+NOTIFICATIONS_MAX_ATTEMPTS = 5 # Depois disso o evento fica no outbox para inspeção.
+NOTIFICATIONS_RETRY_BACKOFF = 5 # Segundos até a primeira nova tentativa (dobra a cada falha).
+NOTIFICATIONS_COALESCE_WINDOW = 60 * 60 * 24 # Segundos em que likes/reposts/bookmarks/follows do mesmo post são agrupados numa notificação.
+NOTIFICATIONS_RECENT_ACTORS = 3 # Quantos atores recentes guardar na notificação agrupada.
+NOTIFICATIONS_UNREAD_CACHE_TTL = 30 # Segundos que o contador de não lidas fica em cache (limita o atraso com cache local por processo).
+
+# Feed, perfil e notificações em views assíncronas (ver core/async_views.py); 0 volta para as ações síncronas.
+ASYNC_READ_VIEWS = os.environ.get("ASYNC_READ_VIEWS", "1") == "1"
+# Threads (e conexões extras por banco) de cada processo para as consultas paralelas (ver core/concurrency.py).
+# Conexões por banco no total: processos x (1 + ASYNC_QUERY_WORKERS).
+ASYNC_QUERY_WORKERS = int(os.environ.get("ASYNC_QUERY_WORKERS", 4))
+
+# Eventos em tempo real (SSE/long-poll em notifications/streams.py, servidos via ASGI).
+REDIS_URL = os.environ.get("REDIS_URL")
+EVENTS_BROKER = "core.pubsub.RedisBroker" if REDIS_URL else "core.pubsub.InProcessBroker" # Em memória só alcança conexões do mesmo processo.
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_MAX_STREAM_SECONDS = 60 * 5
+EVENTS_LONGPOLL_SECONDS = 25
+EVENTS_RETRY_MS = 3000 # Tempo de reconexão sugerido ao EventSource.
+EVENTS_TICKET_TTL = 30 # Validade, em segundos, do ticket de uso único que autentica o EventSource.
+EVENTS_QUEUE_SIZE = 100 # Eventos pendentes por conexão antes de descartar os mais antigos.
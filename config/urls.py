@@ -15,17 +15,23 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
-from core.views import CustomUserViewSet, MostLikedPostsViewSet, PostViewSet, UserRegisterView, RandomFollowersViewSet
+from core.views import CustomUserViewSet, MostLikedPostsViewSet, PostViewSet, UserRegisterView, RandomFollowersViewSet, SearchView, SyncView
 from django.conf import settings
-from django.conf.urls.static import static
+from core.instrumentation import metrics_view
+from core.media import serve_media
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 from notifications.views import NotificationViewSet
+from notifications.streams import EventTicketView, event_poll, event_stream
+from notifications.async_views import notification_list
+from core import async_views
 
 router = DefaultRouter()
 router.register(r'users', CustomUserViewSet)
@@ -34,11 +40,28 @@ router.register(r'most-liked-posts', MostLikedPostsViewSet, basename="most-liked
 router.register(r'random-users', RandomFollowersViewSet, basename="random-users")
 router.register(r'notifications', NotificationViewSet, basename='notifications')
 
+# Leituras mais acessadas em views assíncronas, antes das rotas do router (ver core/async_views.py).
+async_read_urls = [
+    path('api/posts/feed/', async_views.feed, name='post-feed-async'),
+    re_path(r'^api/users/profile/(?P<username>[^/.]+)/$', async_views.profile, name='user-profile-async'),
+    path('api/notifications/', notification_list, name='notifications-list-async'),
+]
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    *(async_read_urls if settings.ASYNC_READ_VIEWS else []),
     path('api/', include(router.urls)),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/register/', UserRegisterView.as_view(), name='register'),
+    path('api/search/', SearchView.as_view(), name='search'),
+    path('api/sync/', SyncView.as_view(), name='sync'),
+    path('metrics', metrics_view, name='metrics'),
+    path('api/events/ticket/', EventTicketView.as_view(), name='event_ticket'),
+    path('api/events/stream/', event_stream, name='event_stream'),
+    path('api/events/poll/', event_poll, name='event_poll'),
 ]
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Arquivos enviados (avatares), com cache e Range; atrás de nginx/apache só delega o envio (ver core/media.py).
+urlpatterns += [
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+]
\ No newline at end of file
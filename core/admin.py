@@ -35,5 +35,5 @@ class CustomUserAdmin(UserAdmin):
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):  # Registra o modelo Post com personalização da interface.
     list_display = ("user", "content", "created_at") # Exibe o autor, conteúdo e data de criação na listagem de posts.
-    search_fields = ("content", "username") # Habilita busca por conteúdo do post e nome de usuário
+    search_fields = ("content", "user__username") # Habilita busca por conteúdo do post e nome de usuário do autor
     list_filter = ("created_at",) # Permite filtrar posts por data de criação no admin.
\ No newline at end of file
@@ -2,4 +2,37 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "core"
\ No newline at end of file
+    name = "core"
+
+    def ready(self):
+        # Mede as consultas SQL de cada requisição (ver instrumentation.py) em toda conexão aberta daqui em diante.
+        from django.db.backends.signals import connection_created
+
+        from .instrumentation import install_on_open_connections, install_query_recorder
+
+        connection_created.connect(install_query_recorder, dispatch_uid="core.instrumentation")
+        install_on_open_connections()
+
+        # Usuário em cache na autenticação (ver authentication.py): qualquer gravação do usuário o invalida.
+        from django.db.models.signals import post_delete, post_save
+
+        from .authentication import invalidate_user_on_change
+        from .models import CustomUser
+
+        post_save.connect(invalidate_user_on_change, sender=CustomUser, dispatch_uid="core.auth_cache")
+        post_delete.connect(invalidate_user_on_change, sender=CustomUser, dispatch_uid="core.auth_cache")
+
+        # Follows gravados pelo ORM fora de reactions.py (admin, shell) invalidam o índice do grafo (ver graph.py).
+        from django.db.models.signals import m2m_changed
+
+        from .graph import invalidate_on_m2m_change, invalidate_on_user_change
+
+        m2m_changed.connect(invalidate_on_m2m_change, sender=CustomUser.followers.through, dispatch_uid="core.graph")
+        post_save.connect(invalidate_on_user_change, sender=CustomUser, dispatch_uid="core.graph")
+        post_delete.connect(invalidate_on_user_change, sender=CustomUser, dispatch_uid="core.graph")
+
+        # Hashtags: toda remoção de PostHashtag, inclusive em cascata, desconta os contadores da tag (ver tags.py).
+        from .models import PostHashtag
+        from .tags import uncount_on_delete
+
+        post_delete.connect(uncount_on_delete, sender=PostHashtag, dispatch_uid="core.tags")
\ No newline at end of file
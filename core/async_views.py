@@ -0,0 +1,100 @@
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from . import concurrency, conditional, graph
+from .authentication import CachedJWTAuthentication
+from .models import CustomUser
+from .pagination import PostListPagination
+from .renderers import TimedJSONRenderer
+from .reposts import attach_originals
+from .serializers import PostSerializer
+from .timeline import feed_queryset
+from .viewer_state import aresolve_page_state
+from .views import POST_RELATED, profile_payload
+
+# Versões assíncronas (ASGI) dos endpoints de leitura mais acessados, nas mesmas URLs quando ASYNC_READ_VIEWS
+# está ligado (com ele desligado valem as ações síncronas dos viewsets). Mesmas respostas, mas:
+# - a espera pelo banco não prende o worker: sob uvicorn, outras requisições andam enquanto isso;
+# - consultas independentes (COUNT e página, estado do usuário e originais dos reposts, perfil e is_following)
+#   rodam em paralelo, cada uma com a sua conexão (ver concurrency.py).
+# Autenticação, paginação e serializers são os mesmos do DRF, chamados daqui.
+
+AUTHENTICATOR = CachedJWTAuthentication
+
+
+def render(data, status=200):
+    # Response do DRF renderizada aqui mesmo (sem APIView para negociar o formato): sempre JSON.
+    response = Response(data, status=status)
+    response.accepted_renderer = TimedJSONRenderer()
+    response.accepted_media_type = TimedJSONRenderer.media_type
+    response.renderer_context = {}
+    if status == 401:
+        response["WWW-Authenticate"] = AUTHENTICATOR().authenticate_header(None)
+    return response.render()
+
+
+def async_api(view):
+    # Só leitura; erros do DRF (401, 404, cursor inválido...) viram o mesmo JSON das views síncronas.
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            if request.method not in ("GET", "HEAD"):
+                raise MethodNotAllowed(request.method)
+            return await view(request, *args, **kwargs)
+        except Http404:
+            error = NotFound()
+            return render({"detail": error.detail}, status=error.status_code)
+        except APIException as error:
+            return render({"detail": error.detail}, status=error.status_code)
+    return wrapper
+
+
+async def authenticate(request, required=True):
+    drf_request = Request(request, authenticators=[AUTHENTICATOR()])
+    user = await sync_to_async(lambda: drf_request.user)()
+    if required and not user.is_authenticated:
+        raise NotAuthenticated()
+    return drf_request
+
+
+# GET /api/posts/feed/
+@async_api
+async def feed(request):
+    request = await authenticate(request)
+    posts = (await sync_to_async(feed_queryset)(request.user)).select_related(*POST_RELATED)
+
+    paginator = PostListPagination()
+    page = await paginator.apaginate_queryset(posts, request)
+    page_state, _ = await asyncio.gather(
+        aresolve_page_state(request.user, page), concurrency.gather(lambda: attach_originals(page))
+    )
+
+    context = {"request": request, "page_state": page_state}
+    data = await sync_to_async(lambda: PostSerializer(page, many=True, context=context).data)()
+    return render(paginator.get_paginated_response(data).data)
+
+
+# GET /api/users/profile/<username>/
+@async_api
+async def profile(request, username):
+    request = await authenticate(request, required=False)
+    viewer = request.user
+    queries = [lambda: CustomUser.objects.filter(username=username).first()]
+    if viewer.is_authenticated:
+        queries.append(lambda: graph.following(viewer.pk))
+    user, *following = await concurrency.gather(*queries)
+    if user is None:
+        raise NotFound()
+
+    etag = conditional.make_etag(request, user.pk, user.version)
+    cached = conditional.not_modified(request, etag, user.updated_at)
+    if cached is not None:
+        return cached
+    data = profile_payload(request, user, bool(following) and graph.contains(following[0], user.pk))
+    return conditional.with_validators(render(data), etag, user.updated_at)
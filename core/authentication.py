@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from . import db_routing
+from .instrumentation import span
+
+
+class TimedJWTAuthentication(JWTAuthentication): # Mede a validação do token e a busca do usuário (Server-Timing "auth").
+    def authenticate(self, request):
+        with span("auth"):
+            return super().authenticate(request)
+
+
+# Usuário autenticado lido do cache (AUTH_USER_CACHE_TTL) em vez do SELECT por requisição.
+# - Só em leituras (GET/HEAD/OPTIONS): escritas sempre leem do banco, para não salvar por cima
+#   campos que mudaram desde que o objeto foi para o cache (contadores, por exemplo).
+# - Invalidado em todo save/delete do usuário (PATCH em /me, desativação, troca de senha; ver apps.py).
+# - Contadores alterados por update() podem ficar até o TTL atrasados no objeto em cache.
+
+def user_cache_key(user_id):
+    return f"auth:user:{user_id}"
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+def invalidate_user_on_change(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+class CachedJWTAuthentication(TimedJWTAuthentication):
+    def authenticate(self, request):
+        # O DRF instancia o autenticador a cada requisição: guardar o método aqui é seguro.
+        self.cacheable = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            db_routing.identify(user_id) # Antes da primeira consulta: quem escreveu há pouco lê do primário.
+        if not getattr(self, "cacheable", False) or user_id is None:
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.AUTH_USER_CACHE_TTL)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed("Usuário inativo.", code="user_inactive")
+        return user
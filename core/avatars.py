@@ -0,0 +1,180 @@
+import hashlib
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from . import counters
+from .models import CustomUser
+
+# Processamento de avatares: o upload guarda o original re-codificado sem metadados (EXIF/GPS, XMP) e, fora da
+# requisição, gera miniaturas quadradas em tamanhos fixos (WebP e JPEG), também sem metadados.
+# Os arquivos gerados têm o hash do conteúdo no nome, então a URL muda quando a imagem muda
+# e pode ser servida com cache "para sempre"; avatares iguais (ex.: o padrão) reaproveitam o mesmo arquivo.
+# O resultado fica em CustomUser.avatar_variants: {"small": {"webp": nome, "jpeg": nome}, ...}.
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+ACCEPTED_FORMATS = {"JPEG", "PNG", "WEBP", "GIF"}
+
+_executor = None
+
+
+class InvalidAvatar(ValueError):
+    pass
+
+
+def validate(upload):
+    # Chamado pelo serializer: recusa arquivos grandes demais, formatos não suportados e dimensões abusivas
+    # (decompression bomb) antes de gravar qualquer coisa.
+    if upload.size > settings.AVATAR_MAX_UPLOAD_BYTES:
+        raise InvalidAvatar(f"A imagem deve ter no máximo {settings.AVATAR_MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+    try:
+        upload.seek(0)
+        with Image.open(upload) as image:
+            image_format, (width, height) = image.format, image.size
+            image.verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise InvalidAvatar("Arquivo de imagem inválido.")
+    finally:
+        upload.seek(0)
+    if image_format not in ACCEPTED_FORMATS:
+        raise InvalidAvatar("Formato de imagem não suportado.")
+    if width * height > settings.AVATAR_MAX_PIXELS:
+        raise InvalidAvatar("Imagem com dimensões grandes demais.")
+
+
+def strip_metadata(upload):
+    # Chamado pelo serializer depois de validate: o original também é servido (URL própria e enquanto as
+    # miniaturas não existem), então não pode levar EXIF/GPS. Mantém o formato e o perfil de cor.
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        options = {"icc_profile": image.info["icc_profile"]} if image.info.get("icc_profile") else {}
+        if getattr(image, "is_animated", False):
+            options.update(save_all=True, loop=image.info.get("loop", 0), duration=image.info.get("duration"))
+        else:
+            image = ImageOps.exif_transpose(image) # A rotação do EXIF passa para os pixels antes de descartá-lo.
+        if image_format == "JPEG":
+            options.update(quality=90, optimize=True)
+        elif image_format == "WEBP":
+            options.update(quality=90)
+        data = _encode(image, image_format, {key: value for key, value in options.items() if value is not None})
+    return ContentFile(data, name=upload.name)
+
+
+def _encode(image, image_format, options):
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options) # Sem exif=...: a nova imagem sai sem metadados.
+    return buffer.getvalue()
+
+
+def _store(data, size, extension):
+    name = f"{settings.AVATAR_VARIANTS_DIR}/{hashlib.sha256(data).hexdigest()[:20]}-{size}.{extension}"
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(data))
+    return name
+
+
+def render_variants(source):
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image) # Aplica a rotação do EXIF antes de descartá-lo.
+        image = image.convert("RGBA") if image.mode in ("P", "LA") else image
+        if image.mode == "RGBA":
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        image = image.convert("RGB")
+
+        variants = {}
+        for label, size in settings.AVATAR_SIZES.items():
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            variants[label] = {
+                extension: _store(_encode(thumbnail, image_format, options), size, extension)
+                for extension, (image_format, options) in FORMATS.items()
+            }
+    return variants
+
+
+def process(user_id):
+    user = CustomUser.objects.filter(pk=user_id).only("id", "avatar", "avatar_source").first()
+    if user is None or not user.avatar or user.avatar_source == user.avatar.name:
+        return False
+    source = user.avatar.name
+    try:
+        with user.avatar.open("rb") as file:
+            variants = render_variants(file)
+    except (OSError, ValueError, Image.DecompressionBombError) as error:
+        logger.warning("Falha ao processar o avatar de %s (%s): %s", user_id, source, error)
+        variants = {}
+
+    # Só grava se o avatar não mudou de novo durante o processamento.
+    updated = CustomUser.objects.filter(pk=user_id, avatar=source).update(avatar_variants=variants, avatar_source=source)
+    if updated:
+        counters.touch_user(user_id) # Novas URLs: invalida ETags e fragmentos do autor.
+    return bool(updated)
+
+
+def _run(user_id):
+    close_old_connections()
+    try:
+        process(user_id)
+    except Exception:
+        logger.exception("Erro no processamento do avatar de %s", user_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(user_id):
+    # Chamado após o commit do upload. "thread": pool em segundo plano no próprio processo
+    # (o comando process_avatars recupera o que ficar pendente se o processo cair); "sync": na hora (testes).
+    global _executor
+    if settings.AVATAR_PROCESSING == "sync":
+        process(user_id)
+        return
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.AVATAR_WORKERS, thread_name_prefix="avatars")
+    _executor.submit(_run, user_id)
+
+
+def schedule_on_commit(user_id):
+    transaction.on_commit(lambda: schedule(user_id))
+
+
+def pending():
+    return CustomUser.objects.exclude(avatar="").exclude(avatar__isnull=True).exclude(avatar_source=F("avatar"))
+
+
+def variant_name(user, size, extension="jpeg"):
+    if user.avatar_source and user.avatar_source == (user.avatar.name if user.avatar else None):
+        return user.avatar_variants.get(size, {}).get(extension)
+    return None
+
+
+def avatar_url(request, user, size, extension="jpeg"):
+    # URL da miniatura no tamanho pedido; enquanto não foi processada, o original; sem avatar, o padrão.
+    name = variant_name(user, size, extension)
+    if name:
+        url = default_storage.url(name)
+    elif user.avatar:
+        url = user.avatar.url
+    else:
+        url = f"{settings.MEDIA_URL}{settings.AVATAR_DEFAULT}"
+    return request.build_absolute_uri(url) if request else url
+
+
+def avatar_urls(request, user):
+    return {
+        size: {extension: avatar_url(request, user, size, extension) for extension in FORMATS}
+        for size in settings.AVATAR_SIZES
+    }
@@ -0,0 +1,172 @@
+import json
+import math
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import caches
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import instrumentation
+from .models import CustomUser, Post
+
+# Benchmark dos endpoints (comando benchmark): chama cada rota com o test client, como um usuário real
+# (autenticado), e mede latência (p50/p95/p99), consultas SQL e linhas serializadas por requisição.
+# O resultado pode ser salvo como baseline JSON e comparado depois para detectar regressões.
+# Com --server, mede a vazão (req/s) contra um servidor rodando, com requisições concorrentes:
+# serve para comparar o mesmo banco servido por WSGI (gunicorn) e por ASGI (uvicorn).
+
+
+def percentile(samples, fraction):
+    # Nearest-rank: o menor valor que cobre a fração pedida das amostras.
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+def pick_viewers():
+    # Três perfis representativos: o mais seguido, o que mais segue e um mediano (pela contagem de seguidores).
+    users = CustomUser.objects.filter(is_active=True)
+    total = users.count()
+    if not total:
+        return {}
+    median = users.order_by("followers_count", "id")[total // 2]
+    return {
+        "popular": users.order_by("-followers_count", "id").first(),
+        "heavy_reader": users.order_by("-following_count", "id").first(),
+        "median": median,
+    }
+
+
+def endpoints(viewers):
+    popular = viewers["popular"].username
+    return {
+        "feed": "/api/posts/feed/",
+        "feed_cursor": "/api/posts/feed/?cursor=&count=false",
+        "profile": f"/api/users/profile/{popular}/",
+        "followers": f"/api/users/profile/{popular}/followers/",
+        "posts_by_user": f"/api/posts/user/{popular}/",
+        "most_liked": "/api/most-liked-posts/",
+        "notifications": "/api/notifications/",
+        "unread_count": "/api/notifications/unread_count/",
+        "suggestions": "/api/random-users/",
+    }
+
+
+def _rows(data):
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        return len(data["results"])
+    if isinstance(data, list):
+        return len(data)
+    return 1
+
+
+def measure(client, url, iterations, warmup=1, cold=False):
+    for _ in range(warmup):
+        client.get(url)
+    timings, queries, rows, status = [], [], 0, None
+    for _ in range(iterations):
+        if cold: # Sem cache (fragmentos, trending, não lidas): mede o pior caso.
+            for cache in caches.all():
+                cache.clear()
+        # Consultas contadas pela instrumentação (todas as conexões, inclusive as das consultas paralelas).
+        with instrumentation.collect_requests() as collected:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(sum(stats.queries for stats in collected))
+        status = response.status_code
+        rows = _rows(getattr(response, "data", None))
+    return {
+        "status": status,
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+        "p99_ms": round(percentile(timings, 0.99), 2),
+        "queries": max(queries),
+        "rows": rows,
+    }
+
+
+def run(iterations=20, viewer="median", only=None, cold=False):
+    viewers = pick_viewers()
+    if not viewers:
+        raise ValueError("Banco sem usuários: gere dados com generate_dataset antes.")
+    client = APIClient()
+    client.force_authenticate(viewers[viewer])
+    results = {}
+    for name, url in endpoints(viewers).items():
+        if only and name not in only:
+            continue
+        results[name] = {"url": url, **measure(client, url, iterations, cold=cold)}
+    return {
+        "viewer": viewer,
+        "iterations": iterations,
+        "cold": cold,
+        "dataset": {
+            "users": CustomUser.objects.count(),
+            "max_followers": viewers["popular"].followers_count,
+            "posts": Post.objects.count(),
+        },
+        "results": results,
+    }
+
+
+def _fetch(url, headers):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return status, (time.perf_counter() - started) * 1000
+
+
+def load_test(server, requests=200, concurrency=16, viewer="median", only=None):
+    viewers = pick_viewers()
+    if not viewers:
+        raise ValueError("Banco sem usuários: gere dados com generate_dataset antes.")
+    headers = {"Authorization": f"Bearer {RefreshToken.for_user(viewers[viewer]).access_token}"}
+    results = {}
+    with ThreadPoolExecutor(concurrency) as pool:
+        for name, path in endpoints(viewers).items():
+            if only and name not in only:
+                continue
+            url = server.rstrip("/") + path
+            started = time.perf_counter()
+            samples = list(pool.map(lambda _: _fetch(url, headers), range(requests)))
+            elapsed = time.perf_counter() - started
+            timings = [timing for _, timing in samples]
+            results[name] = {
+                "url": path,
+                "status": max(status for status, _ in samples),
+                "rps": round(requests / elapsed, 1),
+                "p50_ms": round(percentile(timings, 0.50), 2),
+                "p95_ms": round(percentile(timings, 0.95), 2),
+            }
+    return {"server": server, "viewer": viewer, "requests": requests, "concurrency": concurrency, "results": results}
+
+
+def compare(current, baseline, tolerance):
+    # Regressão: p95 acima da baseline além da tolerância (fração) ou mais consultas SQL que antes.
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        if result["queries"] > before["queries"]:
+            regressions.append(f"{name}: {before['queries']} -> {result['queries']} consultas")
+        if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+    return regressions
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save(report, path):
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
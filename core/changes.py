@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ChangeLog
+
+# Registro de mudanças (ChangeLog) lido pela sincronização incremental (ver sync.py):
+# - alimentado pelos contadores (like, bookmark, repost, follow, criação e remoção de posts; ver counters.py)
+#   e pela entrega de notificações (ver notifications/aggregation.py);
+# - o token é o id do registro. Linhas mais novas que SYNC_SETTLE_SECONDS ficam para a próxima sincronização:
+#   uma transação ainda aberta pode confirmar um id menor depois, e o cliente nunca deve pular esse id;
+# - guarda SYNC_RETENTION (comando prune_changes).
+
+
+def record(kind, user_id=None, object_id=None):
+    ChangeLog.objects.create(kind=kind, user_id=user_id, object_id=object_id)
+
+
+def record_many(kind, pairs):
+    ChangeLog.objects.bulk_create([ChangeLog(kind=kind, user_id=user_id, object_id=object_id) for user_id, object_id in pairs])
+
+
+def latest_token():
+    cutoff = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    return ChangeLog.objects.filter(created_at__lte=cutoff).order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def prune():
+    # Nunca apaga a linha mais recente: o token atual continua reconhecível mesmo sem atividade.
+    cutoff = timezone.now() - timedelta(seconds=settings.SYNC_RETENTION)
+    newest = ChangeLog.objects.order_by("-id").values_list("id", flat=True).first()
+    if newest is None:
+        return 0
+    deleted, _ = ChangeLog.objects.filter(created_at__lt=cutoff, id__lt=newest).delete()
+    return deleted
@@ -0,0 +1,58 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+# Consultas independentes em paralelo nas views assíncronas (ver async_views.py).
+# O ORM assíncrono do Django (aget, acount...) passa tudo pela mesma thread da requisição, uma consulta
+# depois da outra; aqui cada função roda numa thread de um pool próprio, com a própria conexão, então as
+# consultas realmente se sobrepõem. Cada thread descarta conexões vencidas ou quebradas antes e depois do uso,
+# como o Django faz no início e no fim de cada requisição, e reaproveita a sua entre requisições (CONN_MAX_AGE).
+# O pool tem ASYNC_QUERY_WORKERS threads: no máximo essa quantidade de conexões extras por processo e por banco
+# (o pool padrão do asyncio chega a dezenas de threads, cada uma com uma conexão aberta).
+# Dentro de uma transação aberta (ATOMIC_REQUESTS, testes) outras conexões não enxergariam as escritas
+# ainda não confirmadas, então as funções rodam em sequência na conexão da própria requisição.
+
+
+def _isolated(func):
+    def run():
+        close_old_connections()
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return run
+
+
+_executor = None
+
+
+def _pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.ASYNC_QUERY_WORKERS, thread_name_prefix="queries")
+    return _executor
+
+
+def _in_transaction():
+    return any(connection.in_atomic_block for connection in connections.all(initialized_only=True))
+
+
+def _sequential(funcs):
+    if _in_transaction():
+        return [func() for func in funcs]
+    return None
+
+
+async def gather(*funcs):
+    results = await sync_to_async(_sequential)(funcs)
+    if results is not None:
+        return results
+    loop = asyncio.get_running_loop()
+    # copy_context: a thread enxerga o estado da requisição (ex.: réplica escolhida em db_routing).
+    return await asyncio.gather(
+        *(loop.run_in_executor(_pool(), contextvars.copy_context().run, _isolated(func)) for func in funcs)
+    )
@@ -0,0 +1,36 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+# GET condicional (ETag / Last-Modified) a partir dos carimbos de versão dos modelos.
+# A view monta o ETag só com os carimbos (consultas leves) e chama not_modified() antes de serializar:
+# se o cliente já tem essa versão, responde 304 sem rodar o serializer nem as consultas pesadas.
+# As respostas dependem do usuário (is_liked, is_following...), então o ETag inclui o id de quem lê
+# e o cache é privado, sempre revalidado.
+
+
+def make_etag(request, *parts):
+    viewer = request.user.pk if request.user.is_authenticated else 0
+    raw = "|".join(str(part) for part in (request.get_full_path(), viewer, *parts))
+    return '"%s"' % hashlib.blake2b(raw.encode(), digest_size=12).hexdigest()
+
+
+def _timestamp(last_modified):
+    return int(last_modified.timestamp()) if last_modified else None
+
+
+def not_modified(request, etag, last_modified=None):
+    response = get_conditional_response(request, etag=etag, last_modified=_timestamp(last_modified))
+    if response is not None:
+        return with_validators(response, etag, last_modified)
+    return None
+
+
+def with_validators(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(_timestamp(last_modified))
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ("Authorization",))
+    return response
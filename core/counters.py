@@ -0,0 +1,114 @@
+from collections import Counter
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import changes
+from .models import Bookmark, ChangeLog, CustomUser, Like, Post
+
+# Atualização atômica dos contadores desnormalizados: um UPDATE ... SET campo = campo + n,
+# sem ler o valor antes (sem corrida entre requisições). Decrementos nunca passam de zero.
+# Toda mudança também avança version/updated_at da linha, que alimentam os ETags (ver conditional.py),
+# e entra no registro de mudanças da sincronização incremental (ver changes.py).
+
+
+def _stamp():
+    return {"version": F("version") + 1, "updated_at": timezone.now()}
+
+
+def _increments(deltas):
+    updates = {
+        field: F(field) + delta if delta >= 0 else Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items() if delta
+    }
+    if updates:
+        updates.update(_stamp())
+    return updates
+
+
+def adjust_post(post_id, **deltas):
+    updates = _increments(deltas)
+    if updates:
+        Post.objects.filter(pk=post_id).update(**updates)
+        changes.record(ChangeLog.POST_COUNTERS, object_id=post_id)
+
+
+def adjust_user(user_id, **deltas):
+    updates = _increments(deltas)
+    if updates:
+        CustomUser.objects.filter(pk=user_id).update(**updates)
+        changes.record(ChangeLog.USER_COUNTERS, user_id=user_id)
+
+
+# Edições que não mexem em contador (conteúdo do post, nome/avatar do perfil) só avançam a versão.
+def touch_post(post_id):
+    Post.objects.filter(pk=post_id).update(**_stamp())
+
+
+def touch_user(user_id):
+    CustomUser.objects.filter(pk=user_id).update(**_stamp())
+
+
+def post_created(post):
+    changes.record(ChangeLog.POST_CREATED, user_id=post.user_id, object_id=post.pk)
+    adjust_user(post.user_id, posts_count=1)
+    if post.repost_id:
+        adjust_post(post.repost_id, reposts_count=1)
+
+
+def post_deleted(post):
+    # Chamado antes de apagar: os reposts diretos são apagados em cascata junto com o post.
+    adjust_user(post.user_id, posts_count=-1)
+    if post.repost_id:
+        adjust_post(post.repost_id, reposts_count=-1)
+    cascaded = list(Post.objects.filter(repost=post).values_list("id", "user_id"))
+    for user_id, total in Counter(user_id for _, user_id in cascaded).items():
+        adjust_user(user_id, posts_count=-total)
+    changes.record_many(ChangeLog.POST_DELETED, [(post.user_id, post.pk)] + [(user_id, pk) for pk, user_id in cascaded])
+
+
+# Recontagem completa (comando recount_counters): compara com o valor armazenado e corrige só o que divergiu.
+
+def _restamp(obj, now):
+    obj.version += 1
+    obj.updated_at = now
+
+
+def _grouped(queryset, key):
+    return {row[key]: row["total"] for row in queryset.values(key).annotate(total=Count("*")).order_by()}
+
+
+def recount_posts(post_ids):
+    likes = _grouped(Like.objects.filter(post_id__in=post_ids), "post_id")
+    bookmarks = _grouped(Bookmark.objects.filter(post_id__in=post_ids), "post_id")
+    reposts = _grouped(Post.objects.filter(repost_id__in=post_ids), "repost_id")
+
+    drifted = []
+    now = timezone.now()
+    for post in Post.objects.filter(pk__in=post_ids).only("id", "likes_count", "bookmarks_count", "reposts_count", "version"):
+        expected = (likes.get(post.id, 0), bookmarks.get(post.id, 0), reposts.get(post.id, 0))
+        if (post.likes_count, post.bookmarks_count, post.reposts_count) != expected:
+            post.likes_count, post.bookmarks_count, post.reposts_count = expected
+            _restamp(post, now)
+            drifted.append(post)
+    Post.objects.bulk_update(drifted, ["likes_count", "bookmarks_count", "reposts_count", "version", "updated_at"])
+    return len(drifted)
+
+
+def recount_users(user_ids):
+    follows = CustomUser.followers.through.objects
+    followers = _grouped(follows.filter(from_customuser_id__in=user_ids), "from_customuser_id")
+    following = _grouped(follows.filter(to_customuser_id__in=user_ids), "to_customuser_id")
+    posts = _grouped(Post.objects.filter(user_id__in=user_ids), "user_id")
+
+    drifted = []
+    now = timezone.now()
+    for user in CustomUser.objects.filter(pk__in=user_ids).only("id", "followers_count", "following_count", "posts_count", "version"):
+        expected = (followers.get(user.id, 0), following.get(user.id, 0), posts.get(user.id, 0))
+        if (user.followers_count, user.following_count, user.posts_count) != expected:
+            user.followers_count, user.following_count, user.posts_count = expected
+            _restamp(user, now)
+            drifted.append(user)
+    CustomUser.objects.bulk_update(drifted, ["followers_count", "following_count", "posts_count", "version", "updated_at"])
+    return len(drifted)
@@ -0,0 +1,129 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Leituras em réplicas (DATABASE_REPLICAS), escritas sempre no "default":
+# - ReplicaRoutingMiddleware libera réplicas só para leituras (GET/HEAD/OPTIONS) das views de core e notifications;
+#   fora de uma requisição (comandos, shell, testes) tudo vai para o primário;
+# - read-your-writes: depois de uma escrita, o usuário fica preso ao primário por READ_YOUR_WRITES_SECONDS
+#   (marcado no cache padrão; com Redis vale entre workers). O usuário é conhecido na autenticação (identify),
+#   antes da primeira consulta dele;
+# - saúde: réplica que falha ao conectar fica fora por REPLICA_RETRY_SECONDS e as leituras caem no primário.
+
+logger = logging.getLogger("core.db")
+
+ROUTED_APPS = ("core.", "notifications.")
+
+_state = ContextVar("db_routing", default=None)
+_down_until = {} # alias -> instante (monotonic) até o qual a réplica é ignorada neste processo.
+
+
+class RoutingState:
+    __slots__ = ("replica", "user_id", "write")
+
+    def __init__(self, write):
+        self.replica = None # Alias escolhido para esta requisição, ou None (primário).
+        self.user_id = None
+        self.write = write
+
+
+def sticky_key(user_id):
+    return f"db:sticky:{user_id}"
+
+
+def mark_write(user_id):
+    cache.set(sticky_key(user_id), 1, settings.READ_YOUR_WRITES_SECONDS)
+
+
+def healthy(alias):
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection() # Sem custo se a conexão persistente já está aberta.
+    except DatabaseError:
+        logger.warning("Réplica %s indisponível; leituras no primário por %ss.", alias, settings.REPLICA_RETRY_SECONDS)
+        _down_until[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+        return False
+    return True
+
+
+def pick_replica():
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    return next((alias for alias in replicas if healthy(alias)), None)
+
+
+def identify(user_id):
+    # Chamado pela autenticação: fixa no primário quem escreveu há pouco.
+    state = _state.get()
+    if state is None:
+        return
+    state.user_id = user_id
+    if state.replica and cache.get(sticky_key(user_id)):
+        state.replica = None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        return state.replica if state is not None and state.replica else "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True # Réplicas têm os mesmos dados do primário.
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in settings.DATABASE_REPLICAS else None # Réplicas recebem o schema pela replicação.
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = RoutingState(write=request.method not in SAFE_METHODS)
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = RoutingState(write=request.method not in SAFE_METHODS)
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self.finish(state, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        view = getattr(view_func, "cls", view_func)
+        if state is None or state.write or not settings.DATABASE_REPLICAS or not view.__module__.startswith(ROUTED_APPS):
+            return None
+        state.replica = pick_replica()
+        return None
+
+    def finish(self, state, response):
+        if state.write and state.user_id is not None:
+            mark_write(state.user_id)
+        return response
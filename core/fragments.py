@@ -0,0 +1,38 @@
+import hashlib
+
+from django.core.cache import caches
+
+# Cache de fragmentos: a parte do PostSerializer que não depende de quem lê (autor, avatar, conteúdo,
+# contadores, repost), guardada por post. A chave leva a versão do post (avança em edição e engajamento,
+# ver counters.py), os dados exibidos do autor e a versão do original, então uma mudança gera outra chave
+# e a antiga só expira (TTL/LRU do cache "fragments") sem precisar de invalidação explícita.
+# Os campos is_* dependem do usuário e são sobrepostos depois, a cada requisição.
+
+VIEWER_FIELDS = ("is_liked", "is_bookmarked", "is_reposted")
+
+
+def _cache():
+    return caches["fragments"]
+
+
+def _author_parts(user):
+    return [user.username, user.first_name, user.last_name, user.avatar.name if user.avatar else "", user.avatar_source]
+
+
+def fragment_key(request, post):
+    # created_at protege contra ids reaproveitados (banco restaurado, testes).
+    parts = [request.scheme, request.get_host(), post.created_at.isoformat(), post.version, *_author_parts(post.user)]
+    if post.repost_id:
+        original = post.repost # O repost mostra contadores e autor do original.
+        parts += [original.version, *_author_parts(original.user)] if original else ["removido"]
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f"post:{post.pk}:{digest}"
+
+
+def get_many(keys):
+    return _cache().get_many(keys) if keys else {}
+
+
+def set_many(fragments):
+    if fragments:
+        _cache().set_many(fragments)
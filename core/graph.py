@@ -0,0 +1,124 @@
+from array import array
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from .models import CustomUser
+
+# Índice de adjacência do grafo de follows, em cache por usuário (GRAPH_CACHE_TTL):
+# - following(id) e followers(id) são arrays de inteiros ordenados (8 bytes por id, sem objetos Python);
+# - is_following é uma busca binária (O(log n)); interseções percorrem o lado menor com busca binária no maior;
+# - escrita direta (write-through) em add_edge/remove_edge, chamados pelo follow/unfollow (ver reactions.py);
+#   alterações feitas pelo ORM (followers.add/remove, admin) só invalidam (ver apps.py).
+# Perfis com mais de GRAPH_MAX_IDS seguidores não têm a lista de seguidores carregada: as interseções com ela
+# viram uma consulta pelo índice único (seguido, seguidor), limitada pelos ids do lado pequeno.
+# Dois follows simultâneos no mesmo perfil podem perder uma escrita na lista de seguidores dele; o TTL limita
+# o atraso. is_following usa só a lista de quem segue, que só ele mesmo altera.
+# Com cache local (LocMem, sem REDIS_URL) cada processo tem a sua cópia e o write-through só alcança o processo
+# que atendeu o follow: o TTL cai para GRAPH_LOCAL_CACHE_TTL, o atraso máximo nos outros processos.
+
+Follow = CustomUser.followers.through # from_customuser = seguido, to_customuser = seguidor.
+
+DIRECTIONS = {
+    "following": ("to_customuser_id", "from_customuser_id"),
+    "followers": ("from_customuser_id", "to_customuser_id"),
+}
+
+
+def _ttl():
+    return settings.GRAPH_LOCAL_CACHE_TTL if isinstance(caches["default"], LocMemCache) else settings.GRAPH_CACHE_TTL
+
+
+def _key(direction, user_id):
+    return f"graph:{direction}:{user_id}"
+
+
+def _load(direction, user_id):
+    key = _key(direction, user_id)
+    ids = cache.get(key)
+    if ids is None:
+        owner, other = DIRECTIONS[direction]
+        ids = array("q", Follow.objects.filter(**{owner: user_id}).order_by(other).values_list(other, flat=True))
+        cache.set(key, ids, _ttl())
+    return ids
+
+
+def following(user_id):
+    return _load("following", user_id)
+
+
+def followers(user_id):
+    return _load("followers", user_id)
+
+
+def contains(ids, value):
+    index = bisect_left(ids, value)
+    return index < len(ids) and ids[index] == value
+
+
+def intersect(first, second):
+    small, large = (first, second) if len(first) <= len(second) else (second, first)
+    return [value for value in small if contains(large, value)]
+
+
+def is_following(follower_id, followed_id):
+    return contains(following(follower_id), followed_id)
+
+
+def _followers_among(user, candidate_ids):
+    # Quais dos candidatos seguem o usuário.
+    if user.followers_count > settings.GRAPH_MAX_IDS:
+        return sorted(
+            Follow.objects.filter(from_customuser_id=user.pk, to_customuser_id__in=list(candidate_ids))
+            .values_list("to_customuser_id", flat=True)
+        )
+    return intersect(candidate_ids, followers(user.pk))
+
+
+def mutual_ids(user):
+    # Quem o usuário segue e também o segue de volta.
+    return _followers_among(user, following(user.pk))
+
+
+def followed_by_ids(viewer_id, user):
+    # Quem o viewer segue e também segue o usuário ("seguido por ...").
+    return _followers_among(user, following(viewer_id))
+
+
+def _write(direction, user_id, value, add):
+    key = _key(direction, user_id)
+    ids = cache.get(key)
+    if ids is None:
+        return # Não está em cache: a próxima leitura carrega do banco.
+    if add and not contains(ids, value):
+        insort(ids, value)
+    elif not add and contains(ids, value):
+        del ids[bisect_left(ids, value)]
+    cache.set(key, ids, _ttl())
+
+
+def add_edge(follower_id, followed_id):
+    _write("following", follower_id, followed_id, True)
+    _write("followers", followed_id, follower_id, True)
+
+
+def remove_edge(follower_id, followed_id):
+    _write("following", follower_id, followed_id, False)
+    _write("followers", followed_id, follower_id, False)
+
+
+def invalidate(*user_ids):
+    cache.delete_many([_key(direction, user_id) for user_id in user_ids for direction in DIRECTIONS])
+
+
+def invalidate_on_m2m_change(sender, instance, action, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate(instance.pk, *(pk_set or ()))
+
+
+def invalidate_on_user_change(sender, instance, created=True, **kwargs):
+    # Usuário criado ou apagado: não herda um índice antigo se o id for reaproveitado (sqlite reaproveita o último).
+    if created:
+        invalidate(instance.pk)
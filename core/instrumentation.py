@@ -0,0 +1,255 @@
+import heapq
+import hmac
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Min
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.serializers import ListSerializer
+
+# Instrumentação por requisição, leve o bastante para ficar ligada em produção:
+# - DB: um execute_wrapper instalado em toda conexão (sinal connection_created) soma tempo e número de
+#   consultas da requisição atual e guarda só as N mais lentas;
+# - serializer, render e auth: trechos medidos com span() (serializers, TimedJSONRenderer, autenticação);
+# - PerformanceMiddleware emite o cabeçalho Server-Timing (se PERF_SERVER_TIMING), registra em log as requisições lentas com as piores
+#   consultas e alimenta os histogramas expostos em /metrics (formato Prometheus, por processo).
+# O estado da requisição fica numa ContextVar, que acompanha sync_to_async/threads do asgiref.
+
+logger = logging.getLogger("core.performance")
+
+_current = ContextVar("request_stats", default=None)
+_collectors = [] # Listas abertas por collect_requests (comando benchmark).
+
+
+class RequestStats:
+    __slots__ = ("started", "queries", "db", "worst", "spans", "depth", "lock")
+
+    def __init__(self):
+        self.lock = threading.Lock() # Views assíncronas consultam em várias threads ao mesmo tempo (ver concurrency.py).
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.worst = [] # Heap (duração, sql) com as consultas mais lentas.
+        self.spans = {}
+        self.depth = {}
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        with stats.lock:
+            stats.queries += 1
+            stats.db += elapsed
+            entry = (elapsed, sql)
+            if len(stats.worst) < settings.PERF_WORST_QUERIES:
+                heapq.heappush(stats.worst, entry)
+            elif elapsed > stats.worst[0][0]:
+                heapq.heapreplace(stats.worst, entry)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_on_open_connections():
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection=connection)
+
+
+@contextmanager
+def collect_requests():
+    # Junta as estatísticas das requisições terminadas no bloco. Conta também as consultas feitas nas threads
+    # das views assíncronas, que CaptureQueriesContext (uma conexão só) não enxerga.
+    collected = []
+    _collectors.append(collected)
+    try:
+        yield collected
+    finally:
+        _collectors.remove(collected)
+
+
+@contextmanager
+def span(name):
+    # Trechos aninhados do mesmo nome (ListSerializer -> PostSerializer) contam uma vez só.
+    stats = _current.get()
+    if stats is None or stats.depth.get(name):
+        yield
+        return
+    stats.depth[name] = 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.depth[name] = 0
+        stats.spans[name] = stats.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+# Mede a serialização no ponto de entrada (.data), então overrides de to_representation e
+# serializers aninhados ficam dentro do mesmo trecho. Listagens usam TimedListSerializer.
+class TimedSerializerMixin:
+    @property
+    def data(self):
+        with span("serializer"):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, ListSerializer):
+    pass
+
+
+# Histogramas acumulados no processo (cada worker expõe os seus; o Prometheus agrega pelos rótulos).
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            items = sorted(self.series.items())
+            for labels, (counts, total, count) in items:
+                base = ",".join(f'{key}="{value}"' for key, value in labels)
+                prefix = f"{base}," if base else ""
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {bucket_count}')
+                lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+                lines.append(f"{self.name}_count{{{base}}} {count}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "Tempo total da requisição.", DURATION_BUCKETS)
+DB_SECONDS = Histogram("http_request_db_seconds", "Tempo em consultas SQL por requisição.", DURATION_BUCKETS)
+QUERIES = Histogram("http_request_queries", "Consultas SQL por requisição.", QUERY_BUCKETS)
+SPAN_SECONDS = Histogram("http_request_span_seconds", "Tempo em serializer, render e auth por requisição.", DURATION_BUCKETS)
+HISTOGRAMS = (REQUEST_SECONDS, DB_SECONDS, QUERIES, SPAN_SECONDS)
+
+
+def _outbox_gauges():
+    # Fila de notificações (modo outbox): cresce e envelhece se o worker deliver_notifications parou.
+    from notifications.models import NotificationOutbox
+    pending = NotificationOutbox.objects.aggregate(count=Count("id"), oldest=Min("created_at"))
+    age = (timezone.now() - pending["oldest"]).total_seconds() if pending["oldest"] else 0
+    return [
+        "# HELP notifications_outbox_pending Eventos de notificação ainda não entregues.",
+        "# TYPE notifications_outbox_pending gauge",
+        f"notifications_outbox_pending {pending['count']}",
+        "# HELP notifications_outbox_oldest_seconds Idade do evento mais antigo ainda não entregue.",
+        "# TYPE notifications_outbox_oldest_seconds gauge",
+        f"notifications_outbox_oldest_seconds {age:.0f}",
+    ]
+
+
+def render_metrics():
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(_outbox_gauges())
+    return "\n".join(lines) + "\n"
+
+
+def _route(request):
+    # Nome da rota (não o caminho) para manter a cardinalidade dos rótulos baixa.
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match and match.view_name else "unmatched"
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        total = time.perf_counter() - stats.started
+        route = _route(request)
+
+        REQUEST_SECONDS.observe((("route", route), ("method", request.method), ("status", str(response.status_code))), total)
+        DB_SECONDS.observe((("route", route),), stats.db)
+        QUERIES.observe((("route", route),), stats.queries)
+        for name, elapsed in stats.spans.items():
+            SPAN_SECONDS.observe((("route", route), ("span", name)), elapsed)
+        for collected in _collectors:
+            collected.append(stats)
+
+        if settings.PERF_SERVER_TIMING:
+            entries = [f'db;dur={stats.db * 1000:.1f};desc="{stats.queries} queries"']
+            entries += [f"{name};dur={elapsed * 1000:.1f}" for name, elapsed in stats.spans.items()]
+            entries.append(f"total;dur={total * 1000:.1f}")
+            response["Server-Timing"] = ", ".join(entries)
+
+        if total * 1000 >= settings.PERF_SLOW_REQUEST_MS:
+            worst = "; ".join(f"[{elapsed * 1000:.1f}ms] {sql[:300]}" for elapsed, sql in sorted(stats.worst, reverse=True))
+            logger.warning(
+                "Requisição lenta: %s %s %s %.1fms db=%.1fms (%d consultas) %s | piores: %s",
+                request.method, request.get_full_path(), response.status_code, total * 1000, stats.db * 1000, stats.queries,
+                " ".join(f"{name}={elapsed * 1000:.1f}ms" for name, elapsed in stats.spans.items()), worst or "-",
+            )
+        return response
+
+
+def metrics_view(request):
+    # GET /metrics, só com "Authorization: Bearer <METRICS_TOKEN>". Sem token configurado o endpoint não existe.
+    if not settings.METRICS_TOKEN:
+        return HttpResponse(status=404)
+    # Tempo constante; em bytes porque compare_digest recusa str com caracteres fora do ASCII.
+    if not hmac.compare_digest(request.headers.get("Authorization", "").encode(), f"Bearer {settings.METRICS_TOKEN}".encode()):
+        return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = "Mede latência (p50/p95/p99), consultas SQL e linhas serializadas dos endpoints; compara com uma baseline JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--viewer", choices=["median", "popular", "heavy_reader"], default="median")
+        parser.add_argument("--only", action="append", help="Mede só este endpoint (pode repetir).")
+        parser.add_argument("--cold", action="store_true", help="Limpa os caches antes de cada requisição.")
+        parser.add_argument("--output", help="Grava o resultado neste arquivo JSON (ex.: para usar como baseline).")
+        parser.add_argument("--baseline", help="Compara com este resultado salvo e falha se houver regressão.")
+        parser.add_argument("--tolerance", type=float, default=0.2, help="Aumento aceito no p95 antes de acusar regressão (fração).")
+        parser.add_argument("--server", help="Mede a vazão contra este servidor rodando (ex.: http://127.0.0.1:8000).")
+        parser.add_argument("--requests", type=int, default=200, help="Requisições por endpoint com --server.")
+        parser.add_argument("--concurrency", type=int, default=16, help="Requisições simultâneas com --server.")
+
+    def handle(self, *args, **options):
+        if options["server"]:
+            return self.handle_load(options)
+        try:
+            report = benchmark.run(options["iterations"], options["viewer"], options["only"], options["cold"])
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(f"{'endpoint':<16}{'status':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'sql':>6}{'linhas':>8}")
+        for name, result in report["results"].items():
+            self.stdout.write(
+                f"{name:<16}{result['status']:>7}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+                f"{result['p99_ms']:>9.2f}{result['queries']:>6}{result['rows']:>8}"
+            )
+
+        if options["output"]:
+            benchmark.save(report, options["output"])
+            self.stdout.write(f"Resultado salvo em {options['output']}.")
+
+        if options["baseline"]:
+            regressions = benchmark.compare(report, benchmark.load(options["baseline"]), options["tolerance"])
+            if regressions:
+                raise CommandError("Regressões em relação à baseline:\n" + "\n".join(regressions))
+            self.stdout.write(self.style.SUCCESS("Sem regressões em relação à baseline."))
+
+    def handle_load(self, options):
+        if options["baseline"]:
+            raise CommandError("--baseline não se aplica a --server; compare os arquivos de --output.")
+        try:
+            report = benchmark.load_test(
+                options["server"], options["requests"], options["concurrency"], options["viewer"], options["only"]
+            )
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(f"{'endpoint':<16}{'status':>7}{'req/s':>9}{'p50':>9}{'p95':>9}")
+        for name, result in report["results"].items():
+            self.stdout.write(
+                f"{name:<16}{result['status']:>7}{result['rps']:>9.1f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+            )
+        if options["output"]:
+            benchmark.save(report, options["output"])
+            self.stdout.write(f"Resultado salvo em {options['output']}.")
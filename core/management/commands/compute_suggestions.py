@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.models import CustomUser
+from core.suggestions import compute_for
+
+
+class Command(BaseCommand):
+    help = "Pré-calcula as sugestões de quem seguir (amigos de amigos + popularidade) para cada usuário."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Calcula apenas para estes usuários (padrão: todos os ativos).")
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.filter(is_active=True).order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+
+        total = 0
+        for user in users.iterator():
+            compute_for(user)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"Sugestões calculadas para {total} usuários."))
@@ -0,0 +1,26 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.tags import expire_buckets
+from core.trending import recompute
+
+
+class Command(BaseCommand):
+    help = "Recalcula o ranking de posts em alta (trending) para cada janela configurada e expira as contagens de hashtags fora da janela."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--window", action="append", choices=list(settings.TRENDING_WINDOWS), help="Janela a recalcular (padrão: todas).")
+        parser.add_argument("--loop", type=int, default=0, metavar="SEGUNDOS", help="Repete a cada N segundos (worker periódico).")
+
+    def handle(self, *args, **options):
+        windows = options["window"] or list(settings.TRENDING_WINDOWS)
+        while True:
+            for window in windows:
+                total = recompute(window)
+                self.stdout.write(f"{window}: {total} posts no ranking.")
+            self.stdout.write(f"Hashtags: {expire_buckets()} baldes expirados.")
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
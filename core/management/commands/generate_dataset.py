@@ -0,0 +1,45 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from core.synthetic import DatasetGenerator
+
+
+class Command(BaseCommand):
+    help = "Gera um conjunto de dados sintético (grafo de seguidores com cauda longa, posts, reposts, likes, bookmarks e notificações)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts-per-user", type=float, default=20)
+        parser.add_argument("--mean-following", type=float, default=50)
+        parser.add_argument("--likes-per-post", type=float, default=8)
+        parser.add_argument("--repost-ratio", type=float, default=0.1)
+        parser.add_argument("--days", type=int, default=30, help="Espalha os posts pelos últimos N dias.")
+        parser.add_argument("--exponent", type=float, default=1.1, help="Expoente da lei de potência da popularidade.")
+        parser.add_argument("--prefix", default="synth", help="Prefixo dos usernames gerados.")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--skip-derived", action="store_true", help="Não recalcula contadores, timelines e trending.")
+
+    def handle(self, *args, **options):
+        generator = DatasetGenerator(
+            users=options["users"],
+            posts_per_user=options["posts_per_user"],
+            mean_following=options["mean_following"],
+            likes_per_post=options["likes_per_post"],
+            repost_ratio=options["repost_ratio"],
+            days=options["days"],
+            exponent=options["exponent"],
+            prefix=options["prefix"],
+            seed=options["seed"],
+            batch_size=options["batch_size"],
+            stdout=self.stdout,
+        )
+        summary = generator.run()
+
+        # Dados derivados, pelos mesmos comandos usados em produção.
+        if not options["skip_derived"]:
+            call_command("recount_counters", stdout=self.stdout)
+            call_command("rebuild_timelines", stdout=self.stdout)
+            call_command("compute_trending", stdout=self.stdout)
+            call_command("compute_suggestions", stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Dataset gerado: {summary['users']} usuários, {summary['posts']} posts."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core import avatars
+
+
+class Command(BaseCommand):
+    help = "Gera as miniaturas dos avatares pendentes (uploads antigos ou cujo processamento em segundo plano não terminou)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None)
+
+    def handle(self, *args, **options):
+        ids = avatars.pending().order_by("pk").values_list("pk", flat=True)
+        if options["limit"]:
+            ids = ids[:options["limit"]]
+        processed = sum(avatars.process(user_id) for user_id in list(ids))
+        self.stdout.write(self.style.SUCCESS(f"Avatares processados: {processed}."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.changes import prune
+
+
+class Command(BaseCommand):
+    help = "Apaga do registro de mudanças (sincronização incremental) o que passou de SYNC_RETENTION."
+
+    def handle(self, *args, **options):
+        deleted = prune()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} mudanças antigas apagadas."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.models import CustomUser
+from core.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstrói as timelines materializadas (TimelineEntry) a partir dos posts e seguidores existentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="Reconstrói apenas estes usuários (padrão: todos).")
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by("id")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+
+        total = 0
+        for user in users.iterator():
+            rebuild(user)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"{total} timelines reconstruídas."))
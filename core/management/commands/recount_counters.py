@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.counters import recount_posts, recount_users
+from core.models import CustomUser, Post
+
+
+class Command(BaseCommand):
+    help = "Recalcula os contadores desnormalizados de posts e usuários em lotes e corrige divergências."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        fixed_posts = self.run_batches(Post.objects, recount_posts, batch_size)
+        fixed_users = self.run_batches(CustomUser.objects, recount_users, batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Contadores corrigidos: {fixed_posts} posts, {fixed_users} usuários."))
+
+    def run_batches(self, manager, recount, batch_size):
+        # Percorre por faixa de id (sem OFFSET), um lote por transação.
+        fixed = 0
+        last_id = 0
+        while True:
+            ids = list(manager.filter(pk__gt=last_id).order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return fixed
+            with transaction.atomic():
+                fixed += recount(ids)
+            last_id = ids[-1]
@@ -0,0 +1,112 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Entrega de arquivos de MEDIA_ROOT (avatares) em produção, no lugar do helper static() do Django:
+# - nomes com hash do conteúdo (miniaturas, ver avatars.py) vão com cache imutável de um ano;
+#   os demais com max-age curto e Last-Modified / If-Modified-Since (304);
+# - com um proxy na frente (MEDIA_ACCEL = "nginx" ou "apache") só devolve o cabeçalho
+#   X-Accel-Redirect / X-Sendfile e o proxy envia o arquivo;
+# - sem proxy, FileResponse (sendfile pelo file_wrapper do servidor) e Range de um intervalo (206);
+# - avatar inexistente cai no avatar padrão em vez de 404.
+
+HASHED_NAME = re.compile(r"(^|/)[0-9a-f]{20}-\d+\.\w+$")
+RANGE_HEADER = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+def _resolve(path):
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if os.path.isfile(full_path):
+        return path, full_path
+    if path.startswith("avatars/") and path != settings.AVATAR_DEFAULT:
+        return _resolve(settings.AVATAR_DEFAULT)
+    raise Http404
+
+
+def _cache_headers(response, path, stat):
+    if HASHED_NAME.search(path):
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response["Cache-Control"] = f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def _byte_range(request, size, mtime):
+    # Um único intervalo "bytes=a-b", "bytes=a-" ou "bytes=-n". Vários intervalos: responde o arquivo inteiro.
+    header = request.headers.get("Range")
+    if not header:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and parse_http_date_safe(if_range) != int(mtime):
+        return None # O arquivo mudou desde a primeira parte: manda tudo de novo.
+    match = RANGE_HEADER.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    else:
+        start, end = max(size - int(end), 0), size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def _read_range(full_path, start, length):
+    with open(full_path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+@require_safe
+def serve_media(request, path):
+    path, full_path = _resolve(path)
+    stat = os.stat(full_path)
+
+    modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    if modified_since is not None and int(stat.st_mtime) <= modified_since:
+        return _cache_headers(HttpResponseNotModified(), path, stat)
+
+    content_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+
+    if settings.MEDIA_ACCEL:
+        # O proxy cuida de Range, sendfile e keep-alive; o processo Python só decide o arquivo e os cabeçalhos.
+        response = HttpResponse(content_type=content_type)
+        if settings.MEDIA_ACCEL == "nginx":
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + path
+        else:
+            response["X-Sendfile"] = full_path
+        return _cache_headers(response, path, stat)
+
+    byte_range = _byte_range(request, stat.st_size, stat.st_mtime)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(full_path, start, end - start + 1), status=206, content_type=content_type)
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        return _cache_headers(response, path, stat)
+
+    response = FileResponse(open(full_path, "rb"), content_type=content_type)
+    return _cache_headers(response, path, stat)
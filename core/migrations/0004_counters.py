@@ -0,0 +1,67 @@
+# Generated by Django 5.2 on 2026-10-17 20:34
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, key):
+    return Coalesce(Subquery(queryset.values(key).annotate(total=Count('*')).values('total'), output_field=IntegerField()), 0)
+
+
+def populate_counters(apps, schema_editor):
+    CustomUser = apps.get_model('core', 'CustomUser')
+    Post = apps.get_model('core', 'Post')
+    follows = CustomUser.followers.through.objects
+
+    Post.objects.update(
+        likes_count=_count(Post.likes.through.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+        bookmarks_count=_count(Post.bookmark.through.objects.filter(post_id=OuterRef('pk')), 'post_id'),
+        reposts_count=_count(Post.objects.filter(repost_id=OuterRef('pk')), 'repost_id'),
+    )
+    CustomUser.objects.update(
+        followers_count=_count(follows.filter(from_customuser_id=OuterRef('pk')), 'from_customuser_id'),
+        following_count=_count(follows.filter(to_customuser_id=OuterRef('pk')), 'to_customuser_id'),
+        posts_count=_count(Post.objects.filter(user_id=OuterRef('pk')), 'user_id'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='bookmarks_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='reposts_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 5.2 on 2026-10-17 20:36
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_counters'),
+    ]
+
+    operations = [
+        # As tabelas core_post_likes e core_post_bookmark já existem (criadas pelo ManyToMany automático):
+        # só o estado dos modelos muda, o banco ganha apenas a coluna created_at abaixo.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Bookmark',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookmark_entries', to='core.post')),
+                        ('user', models.ForeignKey(db_column='customuser_id', on_delete=django.db.models.deletion.CASCADE, related_name='bookmark_entries', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'core_post_bookmark',
+                        'unique_together': {('post', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='bookmark',
+                    field=models.ManyToManyField(blank=True, related_name='bookmarked_posts', through='core.Bookmark', to=settings.AUTH_USER_MODEL),
+                ),
+                migrations.CreateModel(
+                    name='Like',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='like_entries', to='core.post')),
+                        ('user', models.ForeignKey(db_column='customuser_id', on_delete=django.db.models.deletion.CASCADE, related_name='like_entries', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'core_post_likes',
+                        'unique_together': {('post', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='post',
+                    name='likes',
+                    field=models.ManyToManyField(blank=True, related_name='liked_posts', through='core.Like', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='bookmark',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='like',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(max_length=10)),
+                ('rank', models.PositiveIntegerField()),
+                ('score', models.FloatField()),
+                ('computed_at', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_entries', to='core.post')),
+            ],
+            options={
+                'ordering': ['window', 'rank'],
+                'constraints': [models.UniqueConstraint(fields=('window', 'rank'), name='unique_trending_rank')],
+            },
+        ),
+    ]
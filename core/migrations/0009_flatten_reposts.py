@@ -0,0 +1,38 @@
+# Generated by Django 5.2 on 2026-10-17 20:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def flatten_reposts(apps, schema_editor):
+    Post = apps.get_model('core', 'Post')
+    # Sobe um nível por rodada até que todo repost aponte para um post original.
+    while Post.objects.filter(repost__repost__isnull=False).update(
+        repost_id=Subquery(Post.objects.filter(pk=OuterRef('repost_id')).values('repost_id')[:1])
+    ):
+        pass
+    Post.objects.filter(repost__isnull=False).update(
+        repost_author_id=Subquery(Post.objects.filter(pk=OuterRef('repost_id')).values('user_id')[:1])
+    )
+    # Os reposts intermediários deixam de contar; o original passa a contar todos.
+    reposts = Post.objects.filter(repost_id=OuterRef('pk')).values('repost_id').annotate(total=Count('*')).values('total')
+    Post.objects.update(reposts_count=Coalesce(Subquery(reposts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_avatar_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='repost_author',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(flatten_reposts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Índices de busca textual (ver core/search.py). Não há campo no modelo: o índice é mantido pelo próprio banco.
+# - PostgreSQL: coluna gerada tsvector + índice GIN; índice de prefixo para username.
+# - SQLite: tabela virtual FTS5 com conteúdo externo (core_post), sincronizada por triggers.
+# Outros bancos ficam sem índice e a busca usa icontains.
+
+from django.db import migrations
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE core_post ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('portuguese', coalesce(content, ''))) STORED",
+    "CREATE INDEX core_post_search_vector_idx ON core_post USING GIN (search_vector)",
+    "CREATE INDEX core_user_username_prefix_idx ON core_customuser (UPPER(username::text) text_pattern_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_user_username_prefix_idx",
+    "DROP INDEX IF EXISTS core_post_search_vector_idx",
+    "ALTER TABLE core_post DROP COLUMN IF EXISTS search_vector",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_post_fts USING fts5("
+    "content, content='core_post', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER core_post_fts_insert AFTER INSERT ON core_post BEGIN "
+    "INSERT INTO core_post_fts(rowid, content) VALUES (new.id, coalesce(new.content, '')); END",
+    "CREATE TRIGGER core_post_fts_delete AFTER DELETE ON core_post BEGIN "
+    "INSERT INTO core_post_fts(core_post_fts, rowid, content) VALUES ('delete', old.id, coalesce(old.content, '')); END",
+    "CREATE TRIGGER core_post_fts_update AFTER UPDATE OF content ON core_post BEGIN "
+    "INSERT INTO core_post_fts(core_post_fts, rowid, content) VALUES ('delete', old.id, coalesce(old.content, '')); "
+    "INSERT INTO core_post_fts(rowid, content) VALUES (new.id, coalesce(new.content, '')); END",
+    "INSERT INTO core_post_fts(rowid, content) SELECT id, coalesce(content, '') FROM core_post",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_post_fts_update",
+    "DROP TRIGGER IF EXISTS core_post_fts_delete",
+    "DROP TRIGGER IF EXISTS core_post_fts_insert",
+    "DROP TABLE IF EXISTS core_post_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_flatten_reposts'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRES_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2 on 2026-10-17 21:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_hashtags_mentions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post_created', 'Post criado'), ('post_deleted', 'Post apagado'), ('post_counters', 'Contadores do post'), ('user_counters', 'Contadores do usuário'), ('notification', 'Notificação nova ou atualizada'), ('notification_deleted', 'Notificação removida')], max_length=24)),
+                ('user_id', models.BigIntegerField(null=True)),
+                ('object_id', models.BigIntegerField(null=True)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user_id', 'kind', 'id'], name='changelog_user_idx'), models.Index(fields=['object_id', 'kind', 'id'], name='changelog_object_idx')],
+            },
+        ),
+    ]
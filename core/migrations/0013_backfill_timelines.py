@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def backfill_timelines(apps, schema_editor):
+    # Usuários anteriores à TimelineEntry: os próprios posts e os dos autores não populares que seguem
+    # (mesma regra de timeline.rebuild, com os modelos históricos).
+    CustomUser = apps.get_model('core', 'CustomUser')
+    Post = apps.get_model('core', 'Post')
+    TimelineEntry = apps.get_model('core', 'TimelineEntry')
+    Follow = CustomUser.followers.through # from_customuser = seguido, to_customuser = seguidor.
+
+    def recent(author_id):
+        return Post.objects.filter(user_id=author_id).order_by('-created_at').values_list('id', 'created_at')[:settings.TIMELINE_BACKFILL_SIZE]
+
+    popular = set(CustomUser.objects.filter(followers_count__gte=settings.TIMELINE_FANOUT_LIMIT).values_list('id', flat=True))
+    for user_id in CustomUser.objects.order_by('id').values_list('id', flat=True).iterator():
+        authors = [user_id] + [
+            author_id for author_id in Follow.objects.filter(to_customuser_id=user_id).values_list('from_customuser_id', flat=True)
+            if author_id not in popular
+        ]
+        entries = [
+            TimelineEntry(owner_id=user_id, post_id=post_id, created_at=created_at)
+            for author_id in authors for post_id, created_at in recent(author_id)
+        ]
+        TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_changelog'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_timelines, migrations.RunPython.noop),
+    ]
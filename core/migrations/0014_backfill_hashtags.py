@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.tags import extract_hashtags, extract_mentions
+
+
+def backfill_hashtags(apps, schema_editor):
+    # Posts anteriores à indexação na escrita: grava hashtags e menções e recalcula os contadores das tags
+    # (total, baldes horários e recent_count) a partir do índice. Idempotente.
+    CustomUser = apps.get_model('core', 'CustomUser')
+    Post = apps.get_model('core', 'Post')
+    Hashtag = apps.get_model('core', 'Hashtag')
+    HashtagBucket = apps.get_model('core', 'HashtagBucket')
+    PostHashtag = apps.get_model('core', 'PostHashtag')
+    Mention = apps.get_model('core', 'Mention')
+
+    posts = Post.objects.exclude(content__isnull=True).exclude(content='').order_by('id')
+    for post_id, content, created_at in posts.values_list('id', 'content', 'created_at').iterator(chunk_size=1000):
+        names = extract_hashtags(content)
+        if names:
+            Hashtag.objects.bulk_create([Hashtag(name=name) for name in names], ignore_conflicts=True)
+            PostHashtag.objects.bulk_create(
+                [PostHashtag(post_id=post_id, hashtag_id=hashtag_id, created_at=created_at)
+                 for hashtag_id in Hashtag.objects.filter(name__in=names).values_list('id', flat=True)],
+                ignore_conflicts=True,
+            )
+        usernames = extract_mentions(content)
+        if usernames:
+            Mention.objects.bulk_create(
+                [Mention(post_id=post_id, user_id=user_id, created_at=created_at)
+                 for user_id in CustomUser.objects.filter(username__in=usernames, is_active=True).values_list('id', flat=True)],
+                ignore_conflicts=True,
+            )
+
+    Hashtag.objects.update(posts_count=Coalesce(
+        Subquery(PostHashtag.objects.filter(hashtag_id=OuterRef('pk')).values('hashtag_id').annotate(total=Count('id')).values('total'),
+                 output_field=IntegerField()),
+        0,
+    ))
+
+    # Baldes da janela de "tags em alta", com o mesmo início de hora de tags._bucket_start.
+    HashtagBucket.objects.all().delete()
+    since = timezone.now() - timedelta(seconds=settings.HASHTAG_TRENDING_WINDOW)
+    buckets = {}
+    for hashtag_id, created_at in PostHashtag.objects.filter(created_at__gte=since - timedelta(hours=1)).values_list('hashtag_id', 'created_at'):
+        start = created_at.replace(minute=0, second=0, microsecond=0)
+        if start > since:
+            buckets[hashtag_id, start] = buckets.get((hashtag_id, start), 0) + 1
+    HashtagBucket.objects.bulk_create(
+        [HashtagBucket(hashtag_id=hashtag_id, start=start, count=count) for (hashtag_id, start), count in buckets.items()],
+        batch_size=1000,
+    )
+    Hashtag.objects.update(recent_count=0)
+    totals = {}
+    for (hashtag_id, _), count in buckets.items():
+        totals[hashtag_id] = totals.get(hashtag_id, 0) + count
+    for hashtag_id, total in totals.items():
+        Hashtag.objects.filter(pk=hashtag_id).update(recent_count=total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_backfill_timelines'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_hashtags, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,23 @@
 from django.contrib.auth.models import AbstractUser # Permite criar um modelo de usuário customizado com os mesmos campos e comportamentos padrão do Django.
 from django.db import models
+from django.utils import timezone
 
 class CustomUser(AbstractUser): # Herda todos os campos de User padrão do Django, mas permite extensão com campos personalizados.
     followers = models.ManyToManyField('self', symmetrical=False, related_name='following') #symmetrical=False: significa que seguir alguém não implica ser seguido de volta. related_name='following': permite acessar os usuários que este usuário segue.
     groups = models.ManyToManyField('auth.Group',related_name="customuser_set",blank=True)
     user_permissions = models.ManyToManyField('auth.Permission',related_name="customuser_set",blank=True)
     avatar = models.ImageField(upload_to="avatars/", default="avatars/default1.png", blank=True, null=True) # upload_to="avatars/": salva os arquivos enviados na pasta avatars/.
+    avatar_variants = models.JSONField(default=dict, blank=True) # Miniaturas geradas a partir do avatar (ver avatars.py).
+    avatar_source = models.CharField(max_length=255, blank=True, default="") # Avatar de onde saíram as miniaturas; diferente de avatar = pendente.
+
+    # Contadores desnormalizados, atualizados com F() nas ações (ver counters.py) e reparados pelo comando recount_counters.
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    posts_count = models.PositiveIntegerField(default=0) # Inclui reposts.
+
+    # Carimbo de versão do perfil: avança a cada mudança visível (edição, contadores). Vira o ETag/Last-Modified (ver conditional.py).
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return self.username
@@ -14,19 +26,173 @@ class Post(models.Model): # Representa uma publicação feita por um usuário.
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="posts") # Cada post pertence a um CustomUser.
     content = models.TextField(max_length=280, blank=True, null=True) # Post ou repost
     created_at = models.DateTimeField(auto_now_add=True) # Data/hora automática de criação do post.
-    likes = models.ManyToManyField(CustomUser, related_name="liked_posts", blank=True) # Lista de usuários que curtiram este post.
-    bookmark = models.ManyToManyField(CustomUser, related_name="bookmarked_posts", blank=True) # Lista de usuários que salvaram (favoritaram) o post.
-    repost = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True, related_name="reposts") # Repost aponta para outro post. Permite cadeia de reposts (ex: repost de repost).
+    likes = models.ManyToManyField(CustomUser, through="Like", related_name="liked_posts", blank=True) # Lista de usuários que curtiram este post.
+    bookmark = models.ManyToManyField(CustomUser, through="Bookmark", related_name="bookmarked_posts", blank=True) # Lista de usuários que salvaram (favoritaram) o post.
+    # Repost aponta sempre para o post original (raiz): repostar um repost reposta o original (ver reposts.py),
+    # então não há cadeias e apagar o original apaga só um nível de reposts.
+    repost = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True, related_name="reposts")
+    repost_author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name="+") # Autor do original, desnormalizado.
+
+    # Contadores desnormalizados de engajamento (ver counters.py).
+    likes_count = models.PositiveIntegerField(default=0)
+    bookmarks_count = models.PositiveIntegerField(default=0)
+    reposts_count = models.PositiveIntegerField(default=0)
+
+    # Versão de engajamento: avança em edições e em toda mudança de contador (ver counters.py).
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
-        try:
-            if self.repost:
-                username = self.repost.user.username if self.repost.user else "usuário desconhecido"
-                content = self.repost.content[:50] if self.repost.content else ""
-                return f"{self.user.username} reposted: {username} - {content}"
-        except Exception:
-            return f"{self.user.username} reposted: conteúdo indisponível"
+        if self.repost_id:
+            original = self.repost # Raiz direta: no máximo uma consulta, sem percorrer cadeia.
+            username = original.user.username if original else "usuário desconhecido"
+            content = original.content[:50] if original and original.content else ""
+            return f"{self.user.username} reposted: {username} - {content}"
         return f"{self.user.username}: {self.content[:50] if self.content else ''}"
         # Este método define como o post será exibido como string:
         # Se for um repost, mostra o nome do autor original e trecho do conteúdo.
         # Se não, mostra os primeiros 50 caracteres do conteúdo.
+
+# Tabelas intermediárias explícitas de likes e bookmarks. Reaproveitam as tabelas que o Django criou
+# para o ManyToMany (mesmos nomes de tabela e colunas) e acrescentam a data do evento, usada no trending.
+class Like(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="like_entries")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, db_column="customuser_id", related_name="like_entries")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = "core_post_likes"
+        unique_together = [("post", "user")] # Um like por usuário e post.
+
+class Bookmark(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="bookmark_entries")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, db_column="customuser_id", related_name="bookmark_entries")
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = "core_post_bookmark"
+        unique_together = [("post", "user")] # Um bookmark por usuário e post.
+
+class TrendingPost(models.Model): # Ranking pré-calculado pelo comando compute_trending (ver trending.py).
+    window = models.CharField(max_length=10) # Janela de tempo: "1h", "24h", "7d"...
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="trending_entries")
+    rank = models.PositiveIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["window", "rank"]
+        constraints = [
+            models.UniqueConstraint(fields=["window", "rank"], name="unique_trending_rank"),
+        ]
+
+    def __str__(self):
+        return f"{self.window} #{self.rank}: post {self.post_id}"
+
+class FollowSuggestion(models.Model): # Sugestões de "quem seguir" pré-calculadas pelo comando compute_suggestions (ver suggestions.py).
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="follow_suggestions")
+    candidate = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField()
+    mutual_count = models.PositiveIntegerField(default=0) # Quantos seguidos do usuário seguem o candidato.
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "candidate"], name="unique_follow_suggestion"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-score"], name="suggestion_user_score_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.candidate} ({self.score:.2f})"
+
+class TimelineEntry(models.Model): # Timeline materializada (fan-out na escrita): uma linha por post visível no feed do dono.
+    owner = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="timeline_entries") # Dono do feed.
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries") # Post entregue ao feed. Apagar o post remove as entradas.
+    created_at = models.DateTimeField() # Cópia de post.created_at, permite ordenar pelo índice sem join.
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "post"], name="unique_timeline_entry"), # Evita entregar o mesmo post duas vezes.
+        ]
+        indexes = [
+            models.Index(fields=["owner", "-created_at", "-post"], name="timeline_owner_recent_idx"), # Leitura do feed: dono + mais recentes primeiro.
+        ]
+
+    def __str__(self):
+        return f"{self.owner} <- post {self.post_id}"
+
+# Hashtags e menções extraídas do conteúdo na escrita (ver tags.py), para consultar por índice em vez de LIKE no texto.
+class Hashtag(models.Model):
+    name = models.CharField(max_length=50, unique=True) # Sempre em minúsculas, sem o "#".
+    posts_count = models.PositiveIntegerField(default=0)
+    # Usos dentro da janela HASHTAG_TRENDING_WINDOW: somado na escrita e descontado quando o balde
+    # horário sai da janela (expire_buckets). "Tags em alta" é só ler os k maiores pelo índice.
+    recent_count = models.PositiveIntegerField(default=0, db_index=True)
+
+    def __str__(self):
+        return f"#{self.name}"
+
+class HashtagBucket(models.Model): # Usos de uma hashtag numa hora; permite tirar da contagem o que saiu da janela.
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name="buckets")
+    start = models.DateTimeField(db_index=True) # Início da hora.
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["hashtag", "start"], name="unique_hashtag_bucket"),
+        ]
+
+class PostHashtag(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="hashtag_entries")
+    hashtag = models.ForeignKey(Hashtag, on_delete=models.CASCADE, related_name="post_entries")
+    created_at = models.DateTimeField() # Cópia de post.created_at: a timeline da tag sai do índice, sem join.
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "hashtag"], name="unique_post_hashtag"),
+        ]
+        indexes = [
+            models.Index(fields=["hashtag", "-created_at", "-post"], name="hashtag_recent_idx"),
+        ]
+
+class Mention(models.Model):
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="mentions")
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="mentions")
+    created_at = models.DateTimeField() # Cópia de post.created_at.
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "user"], name="unique_mention"),
+        ]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-post"], name="mention_recent_idx"),
+        ]
+
+class ChangeLog(models.Model): # Registro só de inserção do que mudou, lido pela sincronização incremental (ver changes.py).
+    POST_CREATED = "post_created"
+    POST_DELETED = "post_deleted"
+    POST_COUNTERS = "post_counters"
+    USER_COUNTERS = "user_counters"
+    NOTIFICATION = "notification"
+    NOTIFICATION_DELETED = "notification_deleted"
+    KIND_CHOICES = [
+        (POST_CREATED, "Post criado"),
+        (POST_DELETED, "Post apagado"),
+        (POST_COUNTERS, "Contadores do post"),
+        (USER_COUNTERS, "Contadores do usuário"),
+        (NOTIFICATION, "Notificação nova ou atualizada"),
+        (NOTIFICATION_DELETED, "Notificação removida"),
+    ]
+
+    # O id é o token de sincronização (monotônico). Sem chaves estrangeiras: o registro sobrevive ao que apaga.
+    kind = models.CharField(max_length=24, choices=KIND_CHOICES)
+    user_id = models.BigIntegerField(null=True) # Dono da mudança: autor do post, usuário dos contadores, destinatário.
+    object_id = models.BigIntegerField(null=True) # Post ou notificação.
+    created_at = models.DateTimeField(default=timezone.now, db_index=True) # Retenção (SYNC_RETENTION).
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user_id", "kind", "id"], name="changelog_user_idx"),
+            models.Index(fields=["object_id", "kind", "id"], name="changelog_object_idx"),
+        ]
@@ -0,0 +1,236 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import concurrency
+
+
+class PostPagination(PageNumberPagination): # Classe de paginação
+    page_size = 10  # Número de itens por página
+    page_size_query_param = 'page_size'
+    max_page_size = 100  # Tamanho máximo da página
+
+
+class KeysetPagination(BasePagination):
+    # Paginação por cursor (keyset): em vez de OFFSET, filtra a partir da chave do último item visto.
+    # O custo de cada página não cresce com a profundidade do scroll e novos itens não deslocam as páginas.
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count' # ?count=false dispensa o COUNT(*) total.
+    ordering = ('-created_at', '-id') # Chave composta; o último campo precisa ser único.
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordered = self.prepare(queryset, request)
+        self.count = queryset.count() if self.include_count(request) else None
+        return self.finish(list(ordered[:self.page_size + 1]))
+
+    # Views assíncronas: o COUNT(*) e a página rodam em paralelo.
+    async def apaginate_queryset(self, queryset, request):
+        ordered = self.prepare(queryset, request)
+        queries = [lambda: list(ordered[:self.page_size + 1])]
+        if self.include_count(request):
+            queries.append(queryset.count)
+        rows, *count = await concurrency.gather(*queries)
+        self.count = count[0] if count else None
+        return self.finish(rows)
+
+    def prepare(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.direction, values = self.decode_cursor(request)
+
+        if self.direction is None:
+            return queryset.order_by(*self.ordering)
+        # Cursor bem formado com valores que não servem para os campos (data inválida, texto no id...):
+        # o filtro converte cada valor pelo campo e falha aqui, antes de consultar.
+        try:
+            if self.direction == 'prev':
+                return queryset.filter(self.keyset_filter(values, reverse=True)).order_by(*self.reversed_ordering())
+            return queryset.filter(self.keyset_filter(values)).order_by(*self.ordering)
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def finish(self, rows):
+        # Busca um item a mais só para saber se existe outra página nesse sentido.
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.direction == 'prev':
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.direction == 'next'
+
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, '').lower() not in ('0', 'false', 'no')
+
+    # Cursor opaco: JSON com sentido + valores da chave, codificado em base64 urlsafe.
+    def encode_cursor(self, direction, obj):
+        values = [self.serialize_value(self.key_value(obj, field)) for field in self.ordering_fields()]
+        raw = json.dumps({'d': direction, 'v': values}, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, None
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            data = json.loads(raw)
+            direction, values = data['d'], data['v']
+        except (binascii.Error, ValueError, TypeError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if not all(self.valid_value(value) for value in values):
+            raise NotFound(self.invalid_cursor_message)
+        return direction, values
+
+    def valid_value(self, value):
+        # Só escalares do JSON; inteiros no intervalo de um bigint.
+        if isinstance(value, bool) or value is None:
+            return False
+        if isinstance(value, int):
+            return -2 ** 63 <= value < 2 ** 63
+        return isinstance(value, (str, float))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.cursor_link('next', self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.cursor_link('prev', self.page[0])
+
+    def cursor_link(self, direction, obj):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, 'page')
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(direction, obj))
+
+    def ordering_fields(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def reversed_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def key_value(self, obj, field):
+        return getattr(obj, field)
+
+    def serialize_value(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+
+    def keyset_filter(self, values, reverse=False):
+        # Comparação lexicográfica da chave composta, ex.: (created_at, id) < (c, i)
+        # vira created_at < c OR (created_at = c AND id < i).
+        condition = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+class PostCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class UserCursorPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+# Busca (ver search.py): a relevância anotada entra na chave, com o id como desempate.
+class SearchPostPagination(KeysetPagination):
+    ordering = ('-rank', '-id')
+
+
+class SearchUserPagination(KeysetPagination):
+    ordering = ('-rank', '-followers_count', 'id')
+
+
+# Timeline de uma hashtag: percorre PostHashtag pelo índice (hashtag, -created_at, -post).
+class HashtagCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-post_id')
+
+
+class HybridPagination(BasePagination):
+    # Usa o cursor quando o cliente pede (?cursor=, mesmo vazio, inicia o scroll infinito);
+    # sem ele mantém a paginação por número de página, por compatibilidade.
+    keyset_class = PostCursorPagination
+    page_class = PostPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.delegate = self.keyset_class()
+        else:
+            self.delegate = self.page_class()
+        return self.delegate.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request):
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.delegate = self.keyset_class()
+            return await self.delegate.apaginate_queryset(queryset, request)
+        self.delegate = self.page_class()
+        return await sync_to_async(self.delegate.paginate_queryset)(queryset, request)
+
+    def get_paginated_response(self, data):
+        return self.delegate.get_paginated_response(data)
+
+
+class PostListPagination(HybridPagination):
+    keyset_class = PostCursorPagination
+
+
+class UserListPagination(HybridPagination):
+    keyset_class = UserCursorPagination
+
+
+class ConcurrentLimitOffsetPagination(LimitOffsetPagination):
+    # Paginação padrão da API (limit/offset); nas views assíncronas o COUNT(*) e a página rodam em paralelo.
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        rows, self.count = await concurrency.gather(
+            lambda: list(queryset[self.offset:self.offset + self.limit]), queryset.count
+        )
+        return rows
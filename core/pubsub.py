@@ -0,0 +1,138 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Pub/sub de eventos em tempo real (novas notificações, novos posts no feed), consumido pelo stream SSE.
+# Canais: "user:<id>" para eventos pessoais e "author:<id>" para posts de autores populares (sem fan-out).
+# O broker é escolhido por settings.EVENTS_BROKER:
+# - InProcessBroker: memória do processo; basta em desenvolvimento ou com um único processo ASGI.
+# - RedisBroker: compartilhado entre processos (web, worker de notificações), necessário em produção.
+# Interface: publish_many(channels, event) síncrono (chamado das views/worker) e
+# await subscribe(channels) -> assinatura com await get(timeout) e await close().
+
+
+class InProcessSubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+
+    def deliver(self, event):
+        # Pode ser chamado de outra thread (views síncronas): entrega pelo loop da conexão.
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass # Loop já encerrado: a conexão caiu.
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait() # Cliente lento: descarta o evento mais antigo.
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def close(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def publish_many(self, channels, event):
+        with self._lock:
+            targets = {subscription for channel in channels for subscription in self._subscriptions.get(channel, ())}
+        for subscription in targets:
+            subscription.deliver(event)
+
+    async def subscribe(self, channels):
+        subscription = InProcessSubscription(self, channels)
+        with self._lock:
+            for channel in channels:
+                self._subscriptions[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscriptions = self._subscriptions.get(channel)
+                if subscriptions is not None:
+                    subscriptions.discard(subscription)
+                    if not subscriptions:
+                        del self._subscriptions[channel]
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None and message["type"] == "message":
+                return json.loads(message["data"])
+
+    async def close(self):
+        await self.pubsub.unsubscribe()
+        await self.pubsub.aclose()
+
+
+class RedisBroker:
+    # Requer o pacote redis (mesma dependência do cache em Redis) e settings.REDIS_URL.
+    def __init__(self):
+        import redis
+        import redis.asyncio
+
+        self._client = redis.Redis.from_url(settings.REDIS_URL)
+        self._async_client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+
+    def publish_many(self, channels, event):
+        if not channels:
+            return
+        data = json.dumps(event)
+        pipeline = self._client.pipeline(transaction=False)
+        for channel in channels:
+            pipeline.publish(channel, data)
+        pipeline.execute()
+
+    async def subscribe(self, channels):
+        pubsub = self._async_client.pubsub()
+        await pubsub.subscribe(*channels)
+        return RedisSubscription(pubsub)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENTS_BROKER)()
+    return _broker
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def author_channel(user_id):
+    return f"author:{user_id}"
+
+
+def publish(channels, event):
+    get_broker().publish_many(list(channels), event)
@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from . import counters, graph
+from .models import Bookmark, CustomUser, Like, Post
+from .timeline import backfill, demote, prune
+
+# Reações (like/bookmark) e follow como escrita direta na tabela intermediária:
+# - adicionar = um INSERT protegido pela restrição única (se já existe, nada muda);
+# - remover = um DELETE filtrado pelo índice (post, usuário).
+# O contador só muda quando a linha realmente entrou ou saiu, então toques duplos não desalinham nada.
+
+REACTIONS = {
+    "like": (Like, "likes_count"),
+    "bookmark": (Bookmark, "bookmarks_count"),
+}
+
+Follow = CustomUser.followers.through # from_customuser = seguido, to_customuser = seguidor.
+
+
+def _insert(model, **fields):
+    try:
+        with transaction.atomic(): # Savepoint: a violação da restrição única não derruba a transação externa.
+            model.objects.create(**fields)
+    except IntegrityError:
+        return False
+    return True
+
+
+def add_reaction(kind, post, user):
+    model, counter = REACTIONS[kind]
+    with transaction.atomic():
+        created = _insert(model, post_id=post.pk, user_id=user.pk)
+        if created:
+            counters.adjust_post(post.pk, **{counter: 1})
+    return created
+
+
+def remove_reaction(kind, post, user):
+    model, counter = REACTIONS[kind]
+    with transaction.atomic():
+        deleted, _ = model.objects.filter(post_id=post.pk, user_id=user.pk).delete()
+        if deleted:
+            counters.adjust_post(post.pk, **{counter: -1})
+    return bool(deleted)
+
+
+def reaction_count(kind, post):
+    _, counter = REACTIONS[kind]
+    return Post.objects.filter(pk=post.pk).values_list(counter, flat=True).first() or 0
+
+
+def add_follow(user, target):
+    with transaction.atomic():
+        created = _insert(Follow, from_customuser_id=target.pk, to_customuser_id=user.pk)
+        if created:
+            counters.adjust_user(user.pk, following_count=1)
+            counters.adjust_user(target.pk, followers_count=1)
+    if created:
+        graph.add_edge(user.pk, target.pk)
+        backfill(user, target) # Traz os posts recentes do novo seguido para a timeline.
+    return created
+
+
+def remove_follow(user, target):
+    with transaction.atomic():
+        deleted, _ = Follow.objects.filter(from_customuser_id=target.pk, to_customuser_id=user.pk).delete()
+        if deleted:
+            counters.adjust_user(user.pk, following_count=-1)
+            counters.adjust_user(target.pk, followers_count=-1)
+            # Lido com a linha ainda travada pelo UPDATE: só um unfollow vê a passagem exata pelo limite.
+            demoted = followers_count(target) == settings.TIMELINE_FANOUT_LIMIT - 1
+    if deleted:
+        graph.remove_edge(user.pk, target.pk)
+        prune(user, target) # Remove da timeline os posts de quem deixou de seguir.
+        if demoted:
+            demote(target)
+    return bool(deleted)
+
+
+def followers_count(user):
+    return CustomUser.objects.filter(pk=user.pk).values_list("followers_count", flat=True).first() or 0
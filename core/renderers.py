@@ -0,0 +1,9 @@
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentation import span
+
+
+class TimedJSONRenderer(JSONRenderer): # JSONRenderer com o tempo de renderização medido (Server-Timing "render").
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span("render"):
+            return super().render(data, accepted_media_type, renderer_context)
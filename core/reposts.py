@@ -0,0 +1,36 @@
+from .models import CustomUser, Post
+
+# Reposts achatados: todo repost guarda o post original (raiz) em repost e o autor dele em repost_author.
+# Repostar um repost reposta a raiz, então uma página nunca precisa percorrer cadeias: os originais e
+# seus autores são carregados em lote, no máximo duas consultas por página.
+
+
+def root_of(post):
+    return post.repost if post.repost_id else post
+
+
+def target_id(post):
+    # Id que um repost deste post teria em repost_id (estado is_reposted, toggle).
+    return post.repost_id or post.id
+
+
+def attach_originals(posts):
+    pending = [post for post in posts if post.repost_id and not Post.repost.is_cached(post)]
+    if not pending:
+        return posts
+
+    originals = Post.objects.in_bulk({post.repost_id for post in pending})
+
+    # Os autores dos originais costumam já estar na página (autores dos próprios posts); só os demais são buscados.
+    authors = {post.user_id: post.user for post in posts if Post.user.is_cached(post)}
+    missing = {original.user_id for original in originals.values()} - authors.keys()
+    if missing:
+        authors.update(CustomUser.objects.in_bulk(missing))
+
+    for original in originals.values():
+        if original.user_id in authors:
+            original.user = authors[original.user_id]
+    for post in pending:
+        if post.repost_id in originals:
+            post.repost = originals[post.repost_id]
+    return posts
@@ -0,0 +1,75 @@
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, Case, FloatField, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import CustomUser, Post
+
+# Busca textual de posts e usuários sobre o índice mantido pelo banco (migração 0010_search_index):
+# - PostgreSQL: search_vector @@ to_tsquery, ordenado por ts_rank, usando o índice GIN;
+# - SQLite (desenvolvimento/CI): tabela FTS5 core_post_fts, ordenada por bm25;
+# - outros bancos: icontains, sem ranking.
+# Cada termo vale como prefixo ("desen" encontra "desenvolvimento") e todos precisam aparecer.
+# O resultado é um queryset anotado com rank, pronto para a paginação por cursor ('-rank', '-id').
+
+MAX_TERMS = 8
+
+
+def terms(query):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _postgres_posts(words):
+    tsquery = " & ".join(f"{word}:*" for word in words)
+    match = RawSQL("core_post.search_vector @@ to_tsquery('portuguese', %s)", [tsquery], output_field=BooleanField())
+    # ts_rank devolve real; em float8 o valor que volta no cursor (double do Python) compara exatamente na página seguinte.
+    rank = RawSQL("ts_rank(core_post.search_vector, to_tsquery('portuguese', %s))::float8", [tsquery], output_field=FloatField())
+    return Post.objects.filter(match).annotate(rank=rank)
+
+
+def _sqlite_posts(words):
+    fts_query = " ".join(f'"{word}"*' for word in words)
+    match = RawSQL("core_post.id IN (SELECT rowid FROM core_post_fts WHERE core_post_fts MATCH %s)",
+                   [fts_query], output_field=BooleanField())
+    # bm25 é menor para os melhores resultados; negado para ordenar do mais relevante para o menos.
+    rank = RawSQL("(SELECT -bm25(core_post_fts) FROM core_post_fts WHERE core_post_fts MATCH %s AND rowid = core_post.id)",
+                  [fts_query], output_field=FloatField())
+    return Post.objects.filter(match).annotate(rank=rank)
+
+
+def _fallback_posts(words):
+    condition = Q()
+    for word in words:
+        condition &= Q(content__icontains=word)
+    return Post.objects.filter(condition).annotate(rank=Value(0.0, output_field=FloatField()))
+
+
+BACKENDS = {"postgresql": _postgres_posts, "sqlite": _sqlite_posts}
+
+
+def search_posts(query):
+    words = terms(query)
+    if not words:
+        return Post.objects.none()
+    return BACKENDS.get(connection.vendor, _fallback_posts)(words)
+
+
+def search_users(query):
+    # Prefixo do username (índice de prefixo no PostgreSQL) ou do nome; username exato primeiro,
+    # depois prefixo de username, depois nome; empates pelos mais seguidos.
+    words = terms(query)
+    if not words:
+        return CustomUser.objects.none()
+    prefix = "".join(words) if len(words) > 1 else words[0]
+    name_match = Q()
+    for word in words:
+        name_match &= Q(first_name__istartswith=word) | Q(last_name__istartswith=word)
+    return CustomUser.objects.filter(
+        Q(is_active=True) & (Q(username__istartswith=prefix) | name_match)
+    ).annotate(rank=Case(
+        When(username__iexact=prefix, then=Value(2)),
+        When(username__istartswith=prefix, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    ))
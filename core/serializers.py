@@ -1,28 +1,43 @@
 from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+from . import avatars
+from .instrumentation import TimedListSerializer, TimedSerializerMixin
+from .fragments import VIEWER_FIELDS, fragment_key, get_many, set_many
 from .models import CustomUser, Post
-
-class UserSerializer(serializers.ModelSerializer): # Serializador principal para listar/exibir perfis de usuários.
-    # Conta a quantidade de seguidores, seguindo e posts para cada usuário.
-    followers_count = serializers.IntegerField(source='followers.count', read_only=True)
-    following_count = serializers.IntegerField(source='following.count', read_only=True)
-    posts_count = serializers.IntegerField(source='posts.count', read_only=True)
-
+from .reposts import attach_originals, target_id
+
+# Validação do upload de avatar (tamanho, formato, dimensões), compartilhada por cadastro e edição de perfil.
+# O arquivo aceito é gravado já sem metadados.
+def validate_avatar_upload(value):
+    if value:
+        try:
+            avatars.validate(value)
+            return avatars.strip_metadata(value)
+        except avatars.InvalidAvatar as error:
+            raise serializers.ValidationError(str(error))
+    return value
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer): # Serializador principal para listar/exibir perfis de usuários.
     # Campos calculados manualmente por métodos get_avatar e get_name.
     avatar = serializers.SerializerMethodField() 
+    avatar_urls = serializers.SerializerMethodField()
     name = serializers.SerializerMethodField()
 
     class Meta: # Define os campos a serem retornados na API de usuário.
         model = CustomUser
-        fields = ['id', 'name','username', 'email', 'posts_count','followers_count', 'following_count', 'avatar']
-
-    def get_avatar(self,obj):   # Retorna o URL absoluto do avatar
-        request = self.context.get("request")
-
-        if obj.avatar:
-            if request:
-                return request.build_absolute_uri(obj.avatar.url)
-            return obj.avatar.url 
-        return None 
+        fields = ['id', 'name','username', 'email', 'posts_count','followers_count', 'following_count', 'avatar', 'avatar_urls']
+        read_only_fields = ['posts_count', 'followers_count', 'following_count'] # Contadores desnormalizados, mantidos pelas ações.
+        list_serializer_class = TimedListSerializer
+
+    def get_avatar(self,obj):   # Retorna o URL absoluto do avatar (miniatura grande; o original enquanto não foi processado).
+        if not obj.avatar:
+            return None
+        return avatars.avatar_url(self.context.get("request"), obj, "large")
+
+    def get_avatar_urls(self, obj): # Miniaturas por tamanho e formato: {"small": {"webp": url, "jpeg": url}, ...}
+        if not obj.avatar:
+            return None
+        return avatars.avatar_urls(self.context.get("request"), obj)
     
     def get_name(self, obj):    # Concatena nome e sobrenome para formar o nome completo.
         first_name = obj.first_name or ""
@@ -35,6 +50,9 @@ class UserUpdateSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ['first_name', 'last_name', 'username', 'avatar']  # Só permite editar nome, sobrenome, nome de usuário e avatar.
 
+    def validate_avatar(self, value):
+        return validate_avatar_upload(value)
+
 class UserRegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)   # Define o campo password como somente de escrita, para não ser exibido no retorno.
     first_name = serializers.CharField(required=True, allow_blank=False)
@@ -44,6 +62,9 @@ class UserRegisterSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ["username", "email", "password", "first_name", "last_name", "avatar"]
 
+    def validate_avatar(self, value):
+        return validate_avatar_upload(value)
+
     def create(self, validated_data):
         password = validated_data.pop("password")
         user = CustomUser(**validated_data)
@@ -53,7 +74,26 @@ class UserRegisterSerializer(serializers.ModelSerializer):
     # Remove a senha do dicionário original.
     # Cria o usuário e aplica set_password, que faz o hash corretamente.
 
-class PostSerializer(serializers.ModelSerializer):  # Serializador completo para exibir e criar postagens.
+class PostListSerializer(TimedListSerializer):
+    # Monta a página com um único get_many no cache de fragmentos; só os posts ausentes (ou com versão nova)
+    # são serializados, e os campos is_* de quem lê entram por cima.
+    def to_representation(self, data):
+        posts = attach_originals(list(data.all() if hasattr(data, 'all') else data))
+        request = self.context['request']
+        keys = [fragment_key(request, post) for post in posts]
+        cached = get_many(keys)
+
+        missing = {}
+        result = []
+        for post, key in zip(posts, keys):
+            fragment = cached.get(key)
+            if fragment is None:
+                fragment = missing[key] = self.child.to_fragment(post)
+            result.append(self.child.with_viewer_fields(fragment, post))
+        set_many(missing)
+        return result
+
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):  # Serializador completo para exibir e criar postagens.
     repost = serializers.SerializerMethodField()
     username = serializers.CharField(source='user.username', read_only=True)
     name = serializers.SerializerMethodField()
@@ -68,6 +108,33 @@ class PostSerializer(serializers.ModelSerializer):  # Serializador completo para
     class Meta: # Lista completa dos campos que serão expostos na API de post.
         model = Post
         fields = ['id', 'user', 'name', 'username', 'user_avatar', 'content', 'created_at', 'likes', 'bookmark', 'repost','is_liked', 'is_bookmarked', 'is_reposted'  ]
+        read_only_fields = ['user'] # O autor vem sempre do usuário autenticado (ver create).
+        list_serializer_class = PostListSerializer
+
+    def to_representation(self, instance):
+        key = fragment_key(self.context['request'], instance)
+        fragment = get_many([key]).get(key)
+        if fragment is None:
+            fragment = self.to_fragment(instance)
+            set_many({key: fragment})
+        return self.with_viewer_fields(fragment, instance)
+
+    # Mesma serialização do DRF, sem os campos que dependem do usuário (esses não vão para o cache).
+    def to_fragment(self, instance):
+        fragment = {}
+        for field in self._readable_fields:
+            if field.field_name in VIEWER_FIELDS:
+                continue
+            attribute = field.get_attribute(instance)
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            fragment[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
+        return fragment
+
+    def with_viewer_fields(self, fragment, instance):
+        data = dict(fragment)
+        for name in VIEWER_FIELDS:
+            data[name] = getattr(self, f'get_{name}')(instance)
+        return data
 
     def create(self, validated_data):   # Garante que o post seja associado ao usuário autenticado. Não aceita user como input do cliente.
         validated_data['user'] = self.context['request'].user
@@ -79,39 +146,60 @@ class PostSerializer(serializers.ModelSerializer):  # Serializador completo para
         last_name = obj.user.last_name or ""
         return f"{first_name} {last_name}".strip()
     
-    def get_user_avatar(self,obj):
-        if obj.user.avatar:
-            return self.context['request'].build_absolute_uri(obj.user.avatar.url)
-        return self.context['request'].build_absolute_uri('/media/avatars/default1.png')  
+    def get_user_avatar(self,obj):  # Miniatura pequena (o avatar aparece com ~48px nos posts).
+        return avatars.avatar_url(self.context['request'], obj.user, "small")
     
     def get_created_at(self, obj):
         return obj.created_at.strftime("%d/%m/%y - %H:%M")
     
     def get_likes(self, obj):
-        return obj.likes.count()
+        return obj.likes_count
     
     def get_bookmark(self, obj):
-        return obj.bookmark.count()
+        return obj.bookmarks_count
     
-    # Retorna um mini-objeto com dados do post original (em reposts).
+    # Retorna um mini-objeto com dados do post original (em reposts), com contadores e avatar do autor.
+    # Em listagens o original e o autor já vêm carregados em lote (ver reposts.attach_originals).
     def get_repost(self, obj):
         if obj.repost:
+            original = obj.repost
             return {
-                "id": obj.repost.id,
-                "username": obj.repost.user.username,
-                "content": obj.repost.content,
-                "created_at": obj.repost.created_at
+                "id": original.id,
+                "username": original.user.username,
+                "name": f"{original.user.first_name or ''} {original.user.last_name or ''}".strip(),
+                "user_avatar": avatars.avatar_url(self.context['request'], original.user, "small"),
+                "content": original.content,
+                "created_at": original.created_at,
+                "likes": original.likes_count,
+                "bookmark": original.bookmarks_count,
+                "reposts": original.reposts_count,
             }
 
     # Verificam se o post já foi curtido, salvo ou repostado pelo usuário autenticado.
+    # Em listagens o estado vem pronto em context['page_state'] (ver viewer_state.py); sem ele, consulta só a linha do usuário.
     def get_is_liked(self, obj):
         user = self.context['request'].user
-        return user in obj.likes.all() if user.is_authenticated else False
+        if not user.is_authenticated:
+            return False
+        state = self.context.get('page_state')
+        if state is not None:
+            return obj.id in state['liked_ids']
+        return obj.likes.filter(pk=user.pk).exists()
 
     def get_is_bookmarked(self, obj):
         user = self.context['request'].user
-        return user in obj.bookmark.all() if user.is_authenticated else False
+        if not user.is_authenticated:
+            return False
+        state = self.context.get('page_state')
+        if state is not None:
+            return obj.id in state['bookmarked_ids']
+        return obj.bookmark.filter(pk=user.pk).exists()
 
     def get_is_reposted(self, obj):
         user = self.context['request'].user
-        return Post.objects.filter(user=user, repost=obj).exists() if user.is_authenticated else False
\ No newline at end of file
+        if not user.is_authenticated:
+            return False
+        state = self.context.get('page_state')
+        if state is not None:
+            return target_id(obj) in state['reposted_ids']
+        return Post.objects.filter(user=user, repost_id=target_id(obj)).exists()
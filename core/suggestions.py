@@ -0,0 +1,94 @@
+import math
+import random
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from . import graph
+from .models import CustomUser, FollowSuggestion
+
+# Sugestões de "quem seguir":
+# - Pré-cálculo (compute_suggestions): amigos de amigos (quem é seguido por quem eu sigo) + popularidade,
+#   excluindo a própria pessoa e quem ela já segue.
+# - Na requisição: sorteia entre os melhores candidatos guardados; sem candidatos (ou usuário anônimo),
+#   sonda ids aleatórios pelo índice da chave primária em vez de ORDER BY RANDOM() na tabela inteira.
+
+Follow = CustomUser.followers.through # from_customuser = seguido, to_customuser = seguidor.
+
+
+def following_ids(user):
+    return set(graph.following(user.pk))
+
+
+def compute_for(user):
+    following = following_ids(user)
+    excluded = following | {user.pk}
+
+    # Candidatos por amigos de amigos, com a contagem de seguidos em comum.
+    mutuals = {
+        row["from_customuser_id"]: row["total"]
+        for row in Follow.objects.filter(to_customuser_id__in=following)
+        .exclude(from_customuser_id__in=excluded)
+        .values("from_customuser_id")
+        .annotate(total=Count("*"))
+        .order_by("-total")[:settings.SUGGESTIONS_PER_USER * 4]
+    }
+    # Completa com contas populares para quem segue pouca gente.
+    popular = CustomUser.objects.filter(is_active=True).exclude(pk__in=excluded).order_by("-followers_count")
+    candidate_ids = set(mutuals) | set(popular.values_list("id", flat=True)[:settings.SUGGESTIONS_PER_USER])
+
+    followers_count = dict(CustomUser.objects.filter(pk__in=candidate_ids, is_active=True).values_list("id", "followers_count"))
+    suggestions = [
+        FollowSuggestion(
+            user=user,
+            candidate_id=candidate_id,
+            mutual_count=mutuals.get(candidate_id, 0),
+            score=mutuals.get(candidate_id, 0) * settings.SUGGESTIONS_MUTUAL_WEIGHT + math.log1p(count),
+        )
+        for candidate_id, count in followers_count.items()
+    ]
+    suggestions.sort(key=lambda suggestion: -suggestion.score)
+
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user=user).delete()
+        FollowSuggestion.objects.bulk_create(suggestions[:settings.SUGGESTIONS_PER_USER])
+    return len(suggestions[:settings.SUGGESTIONS_PER_USER])
+
+
+def _probe_random_users(limit, excluded):
+    # Sorteia ids entre 1 e o maior id e pega o primeiro usuário >= id sorteado (busca pelo índice da PK).
+    max_id = CustomUser.objects.aggregate(max_id=Max("id"))["max_id"]
+    if not max_id:
+        return []
+
+    found = {}
+    for _ in range(limit * 4):
+        if len(found) >= limit:
+            break
+        user = (
+            CustomUser.objects.filter(pk__gte=random.randint(1, max_id), is_active=True)
+            .exclude(pk__in=excluded | set(found))
+            .order_by("pk")
+            .first()
+        )
+        if user is not None:
+            found[user.pk] = user
+    return list(found.values())
+
+
+def suggest(user, limit):
+    if not user.is_authenticated:
+        return _probe_random_users(limit, set())
+
+    pool = list(
+        FollowSuggestion.objects.filter(user=user, candidate__is_active=True)
+        .exclude(candidate__followers=user) # Pode ter seguido alguém depois do último cálculo.
+        .select_related("candidate")
+        .order_by("-score")[:settings.SUGGESTIONS_SAMPLE_POOL]
+    )
+    chosen = [suggestion.candidate for suggestion in random.sample(pool, min(limit, len(pool)))]
+    if len(chosen) < limit:
+        excluded = following_ids(user) | {user.pk} | {candidate.pk for candidate in chosen}
+        chosen += _probe_random_users(limit - len(chosen), excluded)
+    return chosen
@@ -0,0 +1,85 @@
+from django.conf import settings
+
+from notifications import unread
+from notifications.models import Notification
+from notifications.serializers import NotificationSerializer
+
+from .changes import latest_token
+from .models import ChangeLog, Post
+from .serializers import PostSerializer
+from .timeline import feed_queryset
+from .viewer_state import resolve_page_state
+
+# GET /api/sync/?since=<token>&posts=<ids>: o cliente guarda o token da última resposta e recebe só o que mudou
+# desde então (posts novos do feed, contadores dos posts que já tem, notificações e contadores do perfil),
+# em vez de recarregar tudo da primeira página. Token ausente, mais antigo que a retenção ou desconhecido
+# responde resync_required: o cliente recarrega como na primeira visita e guarda o token novo.
+
+POST_COUNTER_FIELDS = {"likes": "likes_count", "bookmark": "bookmarks_count", "reposts": "reposts_count"} # Nomes do PostSerializer.
+
+
+def parse_token(value):
+    try:
+        token = int(value)
+    except (TypeError, ValueError):
+        return None
+    return token if token >= 0 else None
+
+
+def is_expired(since, token):
+    # Token do futuro (banco recriado) ou anterior ao que a retenção já apagou.
+    if since > token:
+        return True
+    oldest = ChangeLog.objects.order_by("id").values_list("id", flat=True).first()
+    return oldest is not None and since < oldest - 1
+
+
+def changes_since(request, since, held_post_ids):
+    user = request.user
+    token = latest_token()
+    payload = {"token": str(token), "resync_required": since is None or is_expired(since, token)}
+    if payload["resync_required"]:
+        return payload
+
+    window = ChangeLog.objects.filter(id__gt=since, id__lte=token)
+
+    # Posts novos do feed: criados na janela e visíveis na timeline de quem lê.
+    created = window.filter(kind=ChangeLog.POST_CREATED).values("object_id")
+    posts = list(
+        feed_queryset(user).filter(pk__in=created).select_related("user")[:settings.SYNC_MAX_POSTS + 1]
+    )
+    payload["posts_truncated"] = len(posts) > settings.SYNC_MAX_POSTS # Muitos posts novos: recarregar o topo do feed.
+    posts = posts[:settings.SYNC_MAX_POSTS]
+    context = {"request": request, "page_state": resolve_page_state(user, posts)}
+    payload["posts"] = PostSerializer(posts, many=True, context=context).data
+
+    # Contadores de engajamento e remoções dos posts que o cliente já tem.
+    held = window.filter(object_id__in=held_post_ids)
+    changed = held.filter(kind=ChangeLog.POST_COUNTERS).values("object_id")
+    payload["post_counters"] = [
+        {"id": row["id"], **{name: row[field] for name, field in POST_COUNTER_FIELDS.items()}}
+        for row in Post.objects.filter(pk__in=changed).order_by("id").values("id", *POST_COUNTER_FIELDS.values())
+    ]
+    payload["deleted_posts"] = sorted(
+        set(held.filter(kind=ChangeLog.POST_DELETED).values_list("object_id", flat=True))
+    )
+
+    # Notificações novas ou atualizadas (agrupadas) e as removidas (interação desfeita).
+    mine = window.filter(user_id=user.pk)
+    touched = set(mine.filter(kind=ChangeLog.NOTIFICATION).values_list("object_id", flat=True))
+    notifications = list(Notification.objects.filter(pk__in=touched, recipient=user).select_related("sender"))
+    removed = set(mine.filter(kind=ChangeLog.NOTIFICATION_DELETED).values_list("object_id", flat=True))
+    payload["notifications"] = NotificationSerializer(notifications, many=True, context={"request": request}).data
+    payload["deleted_notifications"] = sorted((removed | touched) - {notification.pk for notification in notifications})
+    payload["unread_count"] = unread.unread_count(user.pk)
+
+    # Contadores do próprio perfil.
+    payload["counters"] = None
+    if mine.filter(kind=ChangeLog.USER_COUNTERS).exists():
+        user.refresh_from_db(fields=["followers_count", "following_count", "posts_count"])
+        payload["counters"] = {
+            "followers_count": user.followers_count,
+            "following_count": user.following_count,
+            "posts_count": user.posts_count,
+        }
+    return payload
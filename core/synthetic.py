@@ -0,0 +1,174 @@
+import itertools
+import math
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from notifications.models import Notification
+
+from .models import Bookmark, CustomUser, Like, Post
+
+# Gerador de dados sintéticos para reproduzir localmente o comportamento em escala (comando generate_dataset).
+# - Grafo de seguidores com cauda longa: a popularidade segue uma lei de potência (Zipf), então poucos
+#   perfis concentram a maior parte dos seguidores, como em produção.
+# - Posts, reposts (sempre do original), likes e bookmarks também pesam a favor dos autores populares.
+# - Tudo entra por bulk_create em lotes; contadores, timelines e ranking são recalculados no fim pelos
+#   próprios comandos de manutenção (recount_counters, rebuild_timelines, compute_trending).
+
+WORDS = (
+    "hoje amanhã café código deploy django python banco índice cache feed timeline bug teste produção "
+    "reunião projeto ideia leitura música futebol viagem chuva sol trabalho estudo série filme"
+).split()
+
+Follow = CustomUser.followers.through
+
+
+def _zipf_weights(count, exponent):
+    return [1 / math.pow(rank, exponent) for rank in range(1, count + 1)]
+
+
+def _sample_distinct(rng, population, cum_weights, k, exclude):
+    # Amostra ponderada sem repetição (aproximada): sorteia em lote e descarta repetidos.
+    # cum_weights (pesos acumulados, calculados uma vez): com weights= o choices refaria a soma acumulada a cada
+    # chamada, O(n) por usuário e O(n²) no grafo inteiro. None sorteia com pesos iguais.
+    chosen = set()
+    attempts = 0
+    while len(chosen) < k and attempts < 4:
+        for item in rng.choices(population, cum_weights=cum_weights, k=(k - len(chosen)) * 2):
+            if item not in exclude:
+                chosen.add(item)
+                if len(chosen) == k:
+                    break
+        attempts += 1
+    return chosen
+
+
+def _content(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 25)))[:280]
+
+
+class DatasetGenerator:
+    def __init__(self, users, posts_per_user=20, mean_following=50, likes_per_post=8, repost_ratio=0.1,
+                 bookmark_ratio=0.2, days=30, exponent=1.1, prefix="synth", seed=1, batch_size=2000, stdout=None):
+        self.users = users
+        self.posts_per_user = posts_per_user
+        self.mean_following = mean_following
+        self.likes_per_post = likes_per_post
+        self.repost_ratio = repost_ratio
+        self.bookmark_ratio = bookmark_ratio
+        self.days = days
+        self.exponent = exponent
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.now = timezone.now()
+        self.stdout = stdout
+
+    def log(self, message):
+        if self.stdout is not None:
+            self.stdout.write(message)
+
+    def run(self):
+        user_ids = self.create_users()
+        # Ordem de popularidade: o primeiro id sorteado no embaralhamento é o perfil mais seguido.
+        self.rng.shuffle(user_ids)
+        weights = _zipf_weights(len(user_ids), self.exponent)
+        self.create_follows(user_ids, weights)
+        posts = self.create_posts(user_ids, weights)
+        self.create_reposts(user_ids, posts)
+        self.create_reactions(user_ids, weights, posts)
+        return {"users": len(user_ids), "posts": len(posts)}
+
+    def random_moment(self, after=None):
+        start = after or self.now - timedelta(days=self.days)
+        span = max((self.now - start).total_seconds(), 1)
+        return start + timedelta(seconds=self.rng.random() * span)
+
+    def create_users(self):
+        password = make_password(None) # Senha inutilizável, igual para todos: não gasta o hasher N vezes.
+        first = CustomUser.objects.filter(username__startswith=f"{self.prefix}_").count()
+        users = [
+            CustomUser(username=f"{self.prefix}_{first + n}", first_name=self.prefix.title(), last_name=str(first + n),
+                       email=f"{self.prefix}_{first + n}@example.com", password=password)
+            for n in range(self.users)
+        ]
+        CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+        ids = list(CustomUser.objects.filter(username__in=[user.username for user in users]).values_list("id", flat=True))
+        self.log(f"{len(ids)} usuários.")
+        return ids
+
+    def create_follows(self, user_ids, weights):
+        # Quantos cada um segue: distribuição log-normal em torno da média (muitos seguem pouco, alguns muito).
+        rows, total = [], 0
+        sigma = 1.0
+        mu = math.log(max(self.mean_following, 1)) - sigma ** 2 / 2
+        cum_weights = list(itertools.accumulate(weights))
+        for follower in user_ids:
+            count = min(int(self.rng.lognormvariate(mu, sigma)), len(user_ids) - 1)
+            for followed in _sample_distinct(self.rng, user_ids, cum_weights, count, {follower}):
+                rows.append(Follow(from_customuser_id=followed, to_customuser_id=follower))
+            if len(rows) >= self.batch_size * 10: # Grava em blocos: o grafo inteiro não cabe em memória em escala.
+                Follow.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+                total += len(rows)
+                rows = []
+        Follow.objects.bulk_create(rows, batch_size=self.batch_size, ignore_conflicts=True)
+        self.log(f"{total + len(rows)} follows.")
+
+    def create_posts(self, user_ids, weights):
+        # Perfis populares postam mais: média escalada pelo peso relativo, com piso de zero posts.
+        top = weights[0]
+        posts = []
+        for user_id, weight in zip(user_ids, weights):
+            expected = self.posts_per_user * (0.5 + 1.5 * math.sqrt(weight / top))
+            for _ in range(int(self.rng.expovariate(1 / expected)) if expected else 0):
+                posts.append(Post(user_id=user_id, content=_content(self.rng)))
+        created = self._bulk_posts(posts, [self.random_moment() for _ in posts])
+        self.log(f"{len(created)} posts.")
+        return created
+
+    def _bulk_posts(self, posts, moments):
+        # created_at é auto_now_add: o bulk_create grava "agora" e as datas sorteadas entram num bulk_update.
+        # Depende do bulk_create devolver os ids (PostgreSQL, SQLite 3.35+).
+        with transaction.atomic():
+            created = Post.objects.bulk_create(posts, batch_size=self.batch_size)
+            for post, moment in zip(created, moments):
+                post.created_at = moment
+            Post.objects.bulk_update(created, ["created_at"], batch_size=self.batch_size)
+        return created
+
+    def create_reposts(self, user_ids, posts):
+        originals = [post for post in posts if post.repost_id is None]
+        if not originals:
+            return
+        reposts, moments = [], []
+        for _ in range(int(len(originals) * self.repost_ratio)):
+            original = self.rng.choice(originals)
+            reposts.append(Post(user_id=self.rng.choice(user_ids), repost_id=original.pk, repost_author_id=original.user_id))
+            moments.append(self.random_moment(after=original.created_at))
+        created = self._bulk_posts(reposts, moments)
+        self.log(f"{len(created)} reposts.")
+
+    def create_reactions(self, user_ids, weights, posts):
+        # Posts de autores populares recebem mais likes; cada like vira uma notificação, como na ação de curtir.
+        weight_by_user = dict(zip(user_ids, weights))
+        top = weights[0]
+        likes, bookmarks, notifications = [], [], []
+        for post in posts:
+            expected = self.likes_per_post * math.sqrt(weight_by_user[post.user_id] / top) * 4
+            count = min(int(self.rng.expovariate(1 / expected)) if expected else 0, len(user_ids) - 1)
+            for user_id in _sample_distinct(self.rng, user_ids, None, count, {post.user_id}):
+                moment = self.random_moment(after=post.created_at)
+                likes.append(Like(post_id=post.pk, user_id=user_id, created_at=moment))
+                notifications.append(Notification(
+                    recipient_id=post.user_id, sender_id=user_id, type="LIKE", post_id=post.pk,
+                    message="curtiu seu post", created_at=moment, is_read=self.rng.random() < 0.7,
+                ))
+                if self.rng.random() < self.bookmark_ratio:
+                    bookmarks.append(Bookmark(post_id=post.pk, user_id=user_id, created_at=moment))
+        Like.objects.bulk_create(likes, batch_size=self.batch_size, ignore_conflicts=True)
+        Bookmark.objects.bulk_create(bookmarks, batch_size=self.batch_size, ignore_conflicts=True)
+        Notification.objects.bulk_create(notifications, batch_size=self.batch_size)
+        self.log(f"{len(likes)} likes, {len(bookmarks)} bookmarks, {len(notifications)} notificações.")
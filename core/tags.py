@@ -0,0 +1,115 @@
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import CustomUser, Hashtag, HashtagBucket, Mention, PostHashtag
+
+# Extração de #hashtags e @menções na escrita do post (criação e edição), gravadas em tabelas
+# indexadas (PostHashtag, Mention). Contadores por tag:
+# - posts_count: total de posts com a tag;
+# - recent_count: usos na janela HASHTAG_TRENDING_WINDOW, com baldes por hora (HashtagBucket);
+#   expire_buckets() desconta os baldes que saíram da janela (roda junto com compute_trending).
+# - O desconto vem do post_delete de PostHashtag (ver apps.py): vale para a edição, o DELETE do post e as
+#   remoções em cascata (original de reposts apagado, usuário excluído), que não passam pela view.
+# Tags com mais de 50 caracteres são ignoradas: cortar no limite indexaria outra tag.
+
+HASHTAG_RE = re.compile(r"(?<![\w#])#(\w{1,50})(?!\w)")
+MENTION_RE = re.compile(r"(?<![\w@])@([\w.+-]*\w)")
+
+
+def extract_hashtags(content):
+    return {name.lower() for name in HASHTAG_RE.findall(content or "")}
+
+
+def extract_mentions(content):
+    return {username for username in MENTION_RE.findall(content or "")}
+
+
+def _bucket_start(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _in_window(moment):
+    return _bucket_start(moment) > timezone.now() - timedelta(seconds=settings.HASHTAG_TRENDING_WINDOW)
+
+
+def _count_usage(hashtag_ids, moment, delta):
+    if not hashtag_ids:
+        return
+    total = F("posts_count") + delta if delta > 0 else Greatest(F("posts_count") + delta, 0)
+    Hashtag.objects.filter(pk__in=hashtag_ids).update(posts_count=total)
+    if not _in_window(moment):
+        return
+    start = _bucket_start(moment)
+    if delta > 0:
+        HashtagBucket.objects.bulk_create(
+            [HashtagBucket(hashtag_id=hashtag_id, start=start) for hashtag_id in hashtag_ids], ignore_conflicts=True
+        )
+        HashtagBucket.objects.filter(hashtag_id__in=hashtag_ids, start=start).update(count=F("count") + delta)
+        Hashtag.objects.filter(pk__in=hashtag_ids).update(recent_count=F("recent_count") + delta)
+    else:
+        # Só desconta da janela o que ainda está num balde (não expirado).
+        live = list(
+            HashtagBucket.objects.filter(hashtag_id__in=hashtag_ids, start=start, count__gt=0).values_list("hashtag_id", flat=True)
+        )
+        HashtagBucket.objects.filter(hashtag_id__in=live, start=start).update(count=Greatest(F("count") + delta, 0))
+        Hashtag.objects.filter(pk__in=live).update(recent_count=Greatest(F("recent_count") + delta, 0))
+
+
+def index_post(post):
+    # Sincroniza hashtags e menções com o conteúdo atual; devolve os usuários mencionados agora pela primeira vez.
+    names = extract_hashtags(post.content)
+    usernames = extract_mentions(post.content)
+
+    with transaction.atomic():
+        if names:
+            Hashtag.objects.bulk_create([Hashtag(name=name) for name in names], ignore_conflicts=True)
+        wanted = set(Hashtag.objects.filter(name__in=names).values_list("id", flat=True)) if names else set()
+        current = set(PostHashtag.objects.filter(post=post).values_list("hashtag_id", flat=True))
+
+        added, removed = wanted - current, current - wanted
+        PostHashtag.objects.bulk_create(
+            [PostHashtag(post=post, hashtag_id=hashtag_id, created_at=post.created_at) for hashtag_id in added],
+            ignore_conflicts=True,
+        )
+        PostHashtag.objects.filter(post=post, hashtag_id__in=removed).delete() # Desconta em uncount_on_delete.
+        _count_usage(added, post.created_at, 1)
+
+        mentioned = {}
+        if usernames:
+            mentioned = {user.pk: user for user in CustomUser.objects.filter(username__in=usernames, is_active=True)}
+        known = set(Mention.objects.filter(post=post).values_list("user_id", flat=True))
+        Mention.objects.filter(post=post).exclude(user_id__in=mentioned).delete()
+        new_mentions = [mentioned[user_id] for user_id in mentioned.keys() - known]
+        Mention.objects.bulk_create(
+            [Mention(post=post, user=user, created_at=post.created_at) for user in new_mentions], ignore_conflicts=True
+        )
+    return [user for user in new_mentions if user.pk != post.user_id]
+
+
+def uncount_on_delete(sender, instance, **kwargs):
+    # created_at é a data do post: o uso sai do mesmo balde em que entrou.
+    _count_usage([instance.hashtag_id], instance.created_at, -1)
+
+
+def expire_buckets():
+    cutoff = _bucket_start(timezone.now() - timedelta(seconds=settings.HASHTAG_TRENDING_WINDOW))
+    with transaction.atomic():
+        buckets = HashtagBucket.objects.select_for_update().filter(start__lte=cutoff)
+        totals = {}
+        for hashtag_id, count in buckets.values_list("hashtag_id", "count"):
+            totals[hashtag_id] = totals.get(hashtag_id, 0) + count
+        for hashtag_id, total in totals.items():
+            if total:
+                Hashtag.objects.filter(pk=hashtag_id).update(recent_count=Greatest(F("recent_count") - total, 0))
+        expired, _ = buckets.delete()
+    return expired
+
+
+def trending_hashtags(limit):
+    return list(Hashtag.objects.filter(recent_count__gt=0).order_by("-recent_count", "name")[:limit])
@@ -1,3 +1,984 @@
-from django.test import TestCase
+import asyncio
+import base64
+import itertools
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.contrib import admin
+from django.db import OperationalError, connection
+from django.db.models import F
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from notifications.models import Notification
+
+from .models import (
+    CustomUser, FollowSuggestion, Hashtag, HashtagBucket, Like, Mention, Post, PostHashtag, TimelineEntry, TrendingPost,
+)
+from . import benchmark, concurrency, db_routing, graph, synthetic, trending
+from .serializers import PostSerializer
+from .suggestions import compute_for
+from .views import PostViewSet
+
+
+class TimelineTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def feed_ids(self):
+        response = self.client.get("/api/posts/feed/")
+        return [post["id"] for post in response.data["results"]]
+
+    def test_post_is_fanned_out_to_followers(self):
+        self.bob.followers.add(self.alice)
+        bob_client = APIClient()
+        bob_client.force_authenticate(self.bob)
+        post_id = bob_client.post("/api/posts/", {"content": "oi"}).data["id"]
+
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.alice, post_id=post_id).exists())
+        self.assertEqual(self.feed_ids(), [post_id])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        post = Post.objects.create(user=self.bob, content="antes")
+
+        self.client.post(f"/api/users/{self.bob.username}/follow/")
+        self.assertEqual(self.feed_ids(), [post.id])
+
+        self.client.post(f"/api/users/{self.bob.username}/follow/")
+        self.assertEqual(self.feed_ids(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_demand(self):
+        self.client.post(f"/api/users/{self.bob.username}/follow/")
+        post = Post.objects.create(user=self.bob, content="viral")
+
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.alice).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_author_dropping_below_limit_keeps_posts_in_feed(self):
+        carol = CustomUser.objects.create_user(username="carol", password="x")
+        carol_client = APIClient()
+        carol_client.force_authenticate(carol)
+        self.client.put(f"/api/users/{self.bob.username}/follow/")
+        carol_client.put(f"/api/users/{self.bob.username}/follow/")
+        post = Post.objects.create(user=self.bob, content="enquanto popular")
+        self.assertFalse(TimelineEntry.objects.filter(owner=self.alice, post=post).exists())
+
+        carol_client.delete(f"/api/users/{self.bob.username}/follow/")
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.alice, post=post).exists())
+        self.assertEqual(self.feed_ids(), [post.id])
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.posts = [Post.objects.create(user=self.alice, content=str(i)) for i in range(5)]
+        self.client = APIClient()
+
+    def test_walks_forward_and_back_without_duplicates(self):
+        url = f"/api/posts/user/{self.alice.username}/?cursor=&page_size=2"
+        first = self.client.get(url).data
+        self.assertEqual(first["count"], 5)
+        self.assertIsNone(first["previous"])
+
+        second = self.client.get(first["next"]).data
+        third = self.client.get(second["next"]).data
+        self.assertIsNone(third["next"])
+
+        seen = [p["id"] for page in (first, second, third) for p in page["results"]]
+        self.assertEqual(seen, [p.id for p in reversed(self.posts)])
+
+        back = self.client.get(third["previous"]).data
+        self.assertEqual(back["results"], second["results"])
+
+    def test_new_posts_do_not_shift_cursor_pages(self):
+        first = self.client.get("/api/posts/?cursor=&page_size=2&count=false").data
+        self.assertNotIn("count", first)
+        Post.objects.create(user=self.alice, content="novo")
+
+        second = self.client.get(first["next"]).data
+        self.assertEqual([p["id"] for p in second["results"]], [self.posts[2].id, self.posts[1].id])
+
+    def test_page_number_mode_is_kept(self):
+        data = self.client.get("/api/posts/?page=2&page_size=2").data
+        self.assertEqual(data["count"], 5)
+        self.assertEqual([p["id"] for p in data["results"]], [self.posts[2].id, self.posts[1].id])
+
+    def test_invalid_cursor_returns_404(self):
+        self.assertEqual(self.client.get("/api/posts/?cursor=lixo").status_code, 404)
+
+    def test_cursor_with_bad_values_returns_404(self):
+        for values in (["notadate", 1], [{"a": 1}, 1], ["2020-01-01T00:00:00", "x"], [None, 1], ["2020-01-01T00:00:00", 2 ** 70]):
+            raw = json.dumps({"d": "next", "v": values}).encode()
+            cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+            self.assertEqual(self.client.get(f"/api/posts/?cursor={cursor}").status_code, 404, values)
+
+
+class PostPageQueryCountTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        for i in range(12):
+            post = Post.objects.create(user=self.bob, content=str(i))
+            post.likes.add(self.alice, self.bob)
+            post.bookmark.add(self.alice)
+            Post.objects.create(user=self.alice, repost=post)
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def count_queries(self, page_size):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"/api/posts/?page_size={page_size}")
+        self.assertEqual(len(response.data["results"]), page_size)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.assertEqual(self.count_queries(3), self.count_queries(20))
+
+    def test_viewer_flags_and_counts(self):
+        post = Post.objects.create(user=self.bob, content="novo")
+        for action in ("like", "bookmark", "repost"):
+            self.client.post(f"/api/posts/{post.id}/{action}/")
+        bob_client = APIClient()
+        bob_client.force_authenticate(self.bob)
+        bob_client.post(f"/api/posts/{post.id}/like/")
+
+        response = self.client.get(f"/api/posts/user/{self.bob.username}/?page_size=1")
+        post = response.data["results"][0]
+        self.assertEqual((post["likes"], post["bookmark"]), (2, 1))
+        self.assertTrue(post["is_liked"] and post["is_bookmarked"] and post["is_reposted"])
+
+
+class CounterTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_actions_keep_counters_in_sync(self):
+        post_id = self.client.post("/api/posts/", {"content": "oi"}).data["id"]
+        self.client.post(f"/api/posts/{post_id}/like/")
+        self.client.post(f"/api/posts/{post_id}/repost/")
+        self.client.post(f"/api/users/{self.bob.username}/follow/")
+
+        post = Post.objects.get(pk=post_id)
+        self.assertEqual((post.likes_count, post.reposts_count), (1, 1))
+        self.alice.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((self.alice.posts_count, self.alice.following_count, self.bob.followers_count), (2, 1, 1))
+
+        self.client.post(f"/api/posts/{post_id}/like/")
+        self.client.delete(f"/api/posts/{post_id}/")
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.posts_count, 0)
+
+    def test_recount_command_repairs_drift(self):
+        post = Post.objects.create(user=self.bob, content="oi")
+        post.likes.add(self.alice)
+        self.bob.followers.add(self.alice)
+
+        call_command("recount_counters", batch_size=1, stdout=StringIO())
+
+        post.refresh_from_db()
+        self.bob.refresh_from_db()
+        self.assertEqual((post.likes_count, self.bob.followers_count, self.bob.posts_count), (1, 1, 1))
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.old = Post.objects.create(user=self.bob, content="antigo")
+        self.hot = Post.objects.create(user=self.bob, content="quente")
+        self.client = APIClient()
+
+    def test_recent_engagement_outranks_old_likes(self):
+        old_like = Like.objects.create(post=self.old, user=self.alice)
+        Like.objects.filter(pk=old_like.pk).update(created_at=timezone.now() - timedelta(hours=20))
+        Like.objects.create(post=self.old, user=self.bob)
+        Like.objects.filter(post=self.old, user=self.bob).update(created_at=timezone.now() - timedelta(hours=20))
+        Post.objects.create(user=self.alice, repost=self.hot)
+
+        call_command("compute_trending", stdout=StringIO())
+
+        response = self.client.get("/api/most-liked-posts/?window=24h")
+        self.assertEqual([p["id"] for p in response.data["results"]], [self.hot.id, self.old.id])
+        self.assertEqual(TrendingPost.objects.filter(window="1h").count(), 1)
+
+    def test_incremental_run_matches_full_recompute(self):
+        now = timezone.now()
+        carol = CustomUser.objects.create_user(username="carol", password="x")
+
+        def like(post, user, minutes_ago):
+            Like.objects.filter(pk=Like.objects.create(post=post, user=user).pk).update(created_at=now - timedelta(minutes=minutes_ago))
+
+        like(self.old, self.alice, 65) # Sai da janela de 1h entre as duas execuções.
+        like(self.hot, self.alice, 20)
+        trending.recompute("1h", now=now - timedelta(minutes=15))
+        like(self.hot, self.bob, 10)
+        like(self.old, carol, 5)
+
+        with self.assertNumQueries(6): # Duas fatias (novos e expirados) x três fontes, sem reler a janela.
+            scores, _ = trending.update_scores("1h", now=now)
+        full = trending.compute_scores("1h", now=now)
+        self.assertEqual(set(full), {self.old.id, self.hot.id})
+        for post_id, score in full.items():
+            self.assertAlmostEqual(scores[post_id], score)
+
+    def test_falls_back_to_like_counter_before_first_run(self):
+        Post.objects.filter(pk=self.old.pk).update(likes_count=3)
+        response = self.client.get("/api/most-liked-posts/")
+        self.assertEqual(response.data["results"][0]["id"], self.old.id)
+
+    def test_unknown_window_is_rejected(self):
+        self.assertEqual(self.client.get("/api/most-liked-posts/?window=2y").status_code, 400)
+        self.assertEqual(self.client.get("/api/most-liked-posts/?limit=-1").status_code, 400)
+        self.assertEqual(self.client.get("/api/most-liked-posts/?limit=0").status_code, 400)
+
+    def test_detail_routes_are_not_exposed(self):
+        url = f"/api/most-liked-posts/{self.old.id}/"
+        self.assertEqual([self.client.get(url).status_code, self.client.patch(url, {"content": "x"}).status_code,
+                          self.client.delete(url).status_code], [404, 404, 404])
+        self.assertTrue(Post.objects.filter(pk=self.old.pk, content="antigo").exists())
+
+
+class SuggestionTests(TestCase):
+    def setUp(self):
+        self.alice, self.bob, self.carol, self.dave = (
+            CustomUser.objects.create_user(username=name, password="x") for name in ("alice", "bob", "carol", "dave")
+        )
+        self.bob.followers.add(self.alice) # alice segue bob
+        self.carol.followers.add(self.bob) # bob segue carol
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_friends_of_friends_rank_first_and_follows_are_excluded(self):
+        compute_for(self.alice)
+        candidates = list(FollowSuggestion.objects.filter(user=self.alice).order_by("-score").values_list("candidate__username", flat=True))
+        self.assertEqual(candidates, ["carol", "dave"])
+
+    def test_endpoint_never_suggests_self_or_followed(self):
+        compute_for(self.alice)
+        self.carol.followers.add(self.alice) # Segue depois do cálculo.
+
+        usernames = {user["username"] for user in self.client.get("/api/random-users/").data["results"]}
+        self.assertEqual(usernames, {"dave"})
+
+    def test_anonymous_gets_random_probe(self):
+        results = APIClient().get("/api/random-users/").data["results"]
+        self.assertEqual(len(results), 4)
+
+    def test_detail_routes_are_not_exposed(self):
+        url = f"/api/random-users/{self.dave.id}/"
+        anonymous = APIClient()
+        self.assertEqual([anonymous.patch(url, {"username": "x"}).status_code, anonymous.delete(url).status_code], [404, 404])
+        self.assertTrue(CustomUser.objects.filter(pk=self.dave.pk, username="dave").exists())
+
+
+class ReactionEndpointTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.post = Post.objects.create(user=self.bob, content="oi")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_put_and_delete_are_idempotent(self):
+        url = f"/api/posts/{self.post.id}/like/"
+        self.assertEqual(self.client.put(url).data, {"active": True, "count": 1})
+        self.assertEqual(self.client.put(url).data, {"active": True, "count": 1})
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 1)
+
+        self.assertEqual(self.client.delete(url).data, {"active": False, "count": 0})
+        self.assertEqual(self.client.delete(url).data, {"active": False, "count": 0})
+
+    def test_post_toggle_still_works(self):
+        url = f"/api/posts/{self.post.id}/bookmark/"
+        self.assertEqual(self.client.post(url).status_code, 204)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).bookmarks_count, 1)
+        self.client.post(url)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).bookmarks_count, 0)
+
+    def test_follow_put_delete(self):
+        url = f"/api/users/{self.bob.username}/follow/"
+        self.assertEqual(self.client.put(url).data, {"following": True, "followers_count": 1})
+        self.assertEqual(self.client.put(url).data, {"following": True, "followers_count": 1})
+        self.assertEqual(self.client.delete(url).data, {"following": False, "followers_count": 0})
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.following_count, 0)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.post = Post.objects.create(user=self.bob, content="oi")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def revalidate(self, url):
+        etag = self.client.get(url)["ETag"]
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_resources_answer_304(self):
+        for url in (
+            f"/api/users/profile/{self.bob.username}/",
+            f"/api/posts/{self.post.id}/",
+            f"/api/posts/user/{self.bob.username}/",
+            "/api/most-liked-posts/",
+        ):
+            _, response = self.revalidate(url)
+            self.assertEqual(response.status_code, 304, url)
+
+    def test_engagement_changes_the_etag(self):
+        url = f"/api/posts/user/{self.bob.username}/"
+        etag, _ = self.revalidate(url)
+        self.client.put(f"/api/posts/{self.post.id}/like/")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["results"][0]["is_liked"])
+
+    def test_follow_changes_profile_etag(self):
+        url = f"/api/users/profile/{self.bob.username}/"
+        etag, _ = self.revalidate(url)
+        self.client.put(f"/api/users/{self.bob.username}/follow/")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data["is_following"])
+
+    def test_author_timeline_validator_reads_only_the_page(self):
+        for i in range(30):
+            Post.objects.create(user=self.bob, content=f"mais {i}")
+        url = f"/api/posts/user/{self.bob.username}/?page_size=2"
+        etag, _ = self.revalidate(url)
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertFalse([query for query in captured.captured_queries if "SUM(" in query["sql"].upper()])
+
+        Post.objects.filter(pk=self.post.pk).update(version=F("version") + 1) # Fora da página: não muda o ETag.
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_etag_depends_on_viewer(self):
+        url = f"/api/posts/{self.post.id}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(APIClient().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self):
+        caches["fragments"].clear()
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.posts = [Post.objects.create(user=self.bob, content=f"post {i}") for i in range(5)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+        self.url = f"/api/posts/user/{self.bob.username}/"
+
+    def test_second_page_load_is_served_from_cache(self):
+        first = self.client.get(self.url).data["results"]
+        with mock.patch.object(PostSerializer, "to_fragment") as to_fragment:
+            second = self.client.get(self.url).data["results"]
+        to_fragment.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_versions_and_viewer_flags_are_fresh(self):
+        self.client.get(self.url)
+        post = self.posts[0]
+        self.client.put(f"/api/posts/{post.id}/like/")
+        bob_client = APIClient()
+        bob_client.force_authenticate(self.bob)
+        edited = bob_client.patch(f"/api/posts/{post.id}/", {"content": "editado"}).data
+        self.assertEqual(edited["content"], "editado")
+
+        row = next(p for p in self.client.get(self.url).data["results"] if p["id"] == post.id)
+        self.assertEqual((row["content"], row["likes"], row["is_liked"]), ("editado", 1, True))
+        row = next(p for p in bob_client.get(self.url).data["results"] if p["id"] == post.id)
+        self.assertFalse(row["is_liked"])
+
+
+@override_settings(AVATAR_PROCESSING="sync")
+class AvatarPipelineTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def upload(self, size=(1200, 800), image_format="JPEG", name="foto.jpg"):
+        buffer = BytesIO()
+        image = Image.new("RGB", size, "red")
+        exif = Image.Exif()
+        exif[0x010F] = "Camera"
+        image.save(buffer, image_format, exif=exif)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    def test_upload_generates_stripped_hashed_thumbnails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch("/api/users/me/", {"avatar": self.upload()}, format="multipart")
+        self.assertEqual(response.status_code, 200)
+
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.avatar_source, self.alice.avatar.name)
+        name = self.alice.avatar_variants["small"]["jpeg"]
+        self.assertRegex(name, r"^avatars/v/[0-9a-f]{20}-96\.jpeg$")
+        with default_storage.open(name) as file, Image.open(file) as thumbnail:
+            self.assertEqual(thumbnail.size, (96, 96))
+            self.assertEqual(len(thumbnail.getexif()), 0)
+        with self.alice.avatar.open("rb") as file, Image.open(file) as original: # O original também é servido.
+            self.assertEqual((original.format, original.size, len(original.getexif())), ("JPEG", (1200, 800), 0))
+
+        data = self.client.get("/api/users/me/").data
+        self.assertTrue(data["avatar_urls"]["medium"]["webp"].endswith("-200.webp"))
+        self.assertTrue(data["avatar"].endswith("-400.jpeg"))
+
+    def test_rejects_oversized_upload(self):
+        with override_settings(AVATAR_MAX_PIXELS=1000):
+            response = self.client.patch("/api/users/me/", {"avatar": self.upload()}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("avatar", response.data)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media)
+        override.enable()
+        self.addCleanup(override.disable)
+        default_storage.save("avatars/default1.png", ContentFile(b"default"))
+        default_storage.save("avatars/v/0123456789abcdef0123-96.jpeg", ContentFile(b"0123456789"))
+
+    def test_hashed_names_are_immutable_and_support_ranges(self):
+        url = "/media/avatars/v/0123456789abcdef0123-96.jpeg"
+        response = self.client.get(url)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+        partial = self.client.get(url, HTTP_RANGE="bytes=2-5")
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(b"".join(partial.streaming_content), b"2345")
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=20-").status_code, 416)
+
+        cached = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_missing_avatar_falls_back_to_default(self):
+        response = self.client.get("/media/avatars/sumiu.png")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"default")
+        self.assertEqual(self.client.get("/media/outros/sumiu.png").status_code, 404)
+        self.assertEqual(self.client.get("/media/../manage.py").status_code, 404)
+
+    @override_settings(MEDIA_ACCEL="nginx")
+    def test_offloads_to_proxy(self):
+        response = self.client.get("/media/avatars/default1.png")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/avatars/default1.png")
+        self.assertEqual(response.content, b"")
+
+
+class RepostTests(TestCase):
+    def setUp(self):
+        caches["fragments"].clear()
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.carol = CustomUser.objects.create_user(username="carol", password="x")
+        self.original = Post.objects.create(user=self.bob, content="original")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def test_reposting_a_repost_targets_the_root(self):
+        carol_client = APIClient()
+        carol_client.force_authenticate(self.carol)
+        carol_client.post(f"/api/posts/{self.original.id}/repost/")
+        carols_repost = Post.objects.get(user=self.carol)
+
+        self.client.post(f"/api/posts/{carols_repost.id}/repost/")
+        repost = Post.objects.get(user=self.alice)
+        self.assertEqual((repost.repost_id, repost.repost_author_id), (self.original.id, self.bob.id))
+        self.assertEqual(Post.objects.get(pk=self.original.pk).reposts_count, 2)
+
+        # Apagar o original remove um único nível de reposts.
+        self.original.delete()
+        self.assertFalse(Post.objects.filter(repost__isnull=False).exists())
+
+    def test_page_resolves_originals_in_batch(self):
+        for i in range(6):
+            author = CustomUser.objects.create_user(username=f"autor{i}", password="x")
+            Post.objects.create(user=self.carol, repost=Post.objects.create(user=author, content=str(i)))
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f"/api/posts/user/{self.carol.username}/")
+        originals = [q["sql"] for q in ctx.captured_queries if '"core_post"."id" IN' in q["sql"]]
+        self.assertEqual(len(originals), 1)
+
+        nested = response.data["results"][0]["repost"]
+        self.assertEqual(nested["username"], "autor5")
+        self.assertEqual((nested["likes"], nested["reposts"]), (0, 0))
+        self.assertTrue(nested["user_avatar"].startswith("http://testserver/media/"))
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x", first_name="Alice")
+        self.alicia = CustomUser.objects.create_user(username="alicia", password="x", followers_count=10)
+        self.bob = CustomUser.objects.create_user(username="bob", password="x", last_name="Alisson")
+        Post.objects.create(user=self.bob, content="Aprendendo Django com testes")
+        Post.objects.create(user=self.bob, content="Django Django Django e desenvolvimento")
+        Post.objects.create(user=self.bob, content="Nada a ver")
+        self.client = APIClient()
+
+    def search(self, query, kind="posts", **params):
+        return self.client.get("/api/search/", {"q": query, "type": kind, **params})
+
+    def test_posts_are_ranked_and_prefix_matched(self):
+        results = self.search("djang").data["results"]
+        self.assertEqual([post["content"] for post in results][0], "Django Django Django e desenvolvimento")
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len(self.search("django desenvolv").data["results"]), 1)
+
+    def test_edits_and_deletes_update_the_index(self):
+        post = Post.objects.get(content="Nada a ver")
+        post.content = "agora fala de python"
+        post.save()
+        self.assertEqual(self.search("python").data["results"][0]["id"], post.id)
+        post.delete()
+        self.assertEqual(self.search("python").data["results"], [])
+
+    def test_users_by_username_prefix_then_name(self):
+        usernames = [user["username"] for user in self.search("ali", "users").data["results"]]
+        self.assertEqual(usernames, ["alicia", "alice", "bob"])
+        self.assertEqual(self.search("alice", "users").data["results"][0]["username"], "alice")
+
+    def test_cursor_pages(self):
+        first = self.search("django", page_size=1).data
+        second = self.client.get(first["next"]).data
+        self.assertEqual(len(second["results"]), 1)
+        self.assertNotEqual(first["results"][0]["id"], second["results"][0]["id"])
+        self.assertIsNone(second["next"])
+
+    def test_short_query_is_rejected(self):
+        self.assertEqual(self.search("a").status_code, 400)
+
+
+@override_settings(NOTIFICATIONS_DELIVERY="sync")
+class HashtagMentionTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def create(self, content):
+        return self.client.post("/api/posts/", {"content": content}).data["id"]
+
+    def test_tags_and_mentions_are_indexed_on_write(self):
+        post_id = self.create("Olá @bob, veja #Django e #python! email@exemplo.com #django")
+        self.assertEqual(set(PostHashtag.objects.filter(post_id=post_id).values_list("hashtag__name", flat=True)), {"django", "python"})
+        self.assertEqual(list(Mention.objects.filter(post_id=post_id).values_list("user__username", flat=True)), ["bob"])
+        notification = Notification.objects.get(recipient=self.bob)
+        self.assertEqual((notification.type, notification.post_id), ("MENTION", post_id))
+
+        # Edição: troca a tag e não repete a notificação de quem já estava mencionado.
+        self.client.patch(f"/api/posts/{post_id}/", {"content": "@bob agora só #python"})
+        self.assertEqual(list(PostHashtag.objects.filter(post_id=post_id).values_list("hashtag__name", flat=True)), ["python"])
+        self.assertEqual(Notification.objects.filter(recipient=self.bob).count(), 1)
+        self.assertEqual(Hashtag.objects.get(name="django").recent_count, 0)
+
+    def test_tag_timeline_and_trending(self):
+        ids = [self.create(f"post {i} #django") for i in range(3)]
+        self.create("outro #python")
+        first = self.client.get("/api/posts/tag/Django/?page_size=2").data
+        second = self.client.get(first["next"]).data
+        self.assertEqual([p["id"] for p in first["results"] + second["results"]], ids[::-1])
+
+        trending = self.client.get("/api/posts/trending-tags/").data
+        self.assertEqual([(tag["name"], tag["count"]) for tag in trending], [("django", 3), ("python", 1)])
+
+        self.client.delete(f"/api/posts/{ids[0]}/")
+        self.assertEqual(Hashtag.objects.get(name="django").recent_count, 2)
+
+    def test_cascade_deletes_discount_tag_counters(self):
+        self.create("primeiro #django #python")
+        self.create("outro #django")
+        bob = APIClient()
+        bob.force_authenticate(self.bob)
+        bob.post("/api/posts/", {"content": "do bob #django"})
+
+        self.alice.delete() # Os posts dela saem em cascata, sem passar pelo DELETE da view.
+        django_tag, python_tag = Hashtag.objects.get(name="django"), Hashtag.objects.get(name="python")
+        self.assertEqual((django_tag.posts_count, django_tag.recent_count), (1, 1))
+        self.assertEqual((python_tag.posts_count, python_tag.recent_count), (0, 0))
+
+    def test_overlong_tags_are_not_truncated(self):
+        post_id = self.create(f"#{'a' * 60} e #{'b' * 50}")
+        self.assertEqual(list(PostHashtag.objects.filter(post_id=post_id).values_list("hashtag__name", flat=True)), ["b" * 50])
+
+    def test_expired_buckets_leave_the_window(self):
+        self.create("#django")
+        HashtagBucket.objects.update(start=timezone.now() - timedelta(days=2))
+        call_command("compute_trending", stdout=StringIO())
+        self.assertEqual(self.client.get("/api/posts/trending-tags/").data, [])
+        self.assertEqual(Hashtag.objects.get(name="django").posts_count, 1)
+
+    def test_migration_backfills_existing_posts(self):
+        self.create("indexado #django")
+        old = Post.objects.create(user=self.bob, content="antigo #Django @alice") # Sem passar por index_post.
+        import_module("core.migrations.0014_backfill_hashtags").backfill_hashtags(django_apps, None)
+        import_module("core.migrations.0014_backfill_hashtags").backfill_hashtags(django_apps, None) # Idempotente.
+
+        tag = Hashtag.objects.get(name="django")
+        self.assertEqual((tag.posts_count, tag.recent_count), (2, 2))
+        self.assertTrue(Mention.objects.filter(post=old, user=self.alice).exists())
+        self.assertIn(old.id, [p["id"] for p in self.client.get("/api/posts/tag/django/").data["results"]])
+        self.assertEqual(self.client.get("/api/posts/trending-tags/?limit=-1").status_code, 400)
+
+
+class DatasetBenchmarkTests(TestCase):
+    def test_follow_sampling_scales_to_large_graphs(self):
+        # 200 mil perfis: com os pesos acumulados uma vez, sortear os seguidos de 2 mil usuários é rápido
+        # (refazendo a soma acumulada por usuário levaria dezenas de segundos).
+        population = list(range(200_000))
+        cum_weights = list(itertools.accumulate(synthetic._zipf_weights(len(population), 1.1)))
+        rng = random.Random(1)
+        started = time.perf_counter()
+        sizes = [len(synthetic._sample_distinct(rng, population, cum_weights, 50, {follower})) for follower in range(2000)]
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertGreater(sum(sizes) / len(sizes), 45)
+
+    def test_generate_and_benchmark(self):
+        call_command("generate_dataset", users=40, posts_per_user=3, mean_following=6, seed=3, stdout=StringIO())
+        counts = CustomUser.objects.order_by("-followers_count").values_list("followers_count", flat=True)
+        self.assertGreater(counts[0], counts[len(counts) // 2]) # Cauda longa: o topo concentra seguidores.
+        self.assertTrue(Post.objects.filter(repost__isnull=False).exists())
+        self.assertTrue(Like.objects.exists() and TimelineEntry.objects.exists())
+
+        path = os.path.join(tempfile.mkdtemp(), "baseline.json")
+        self.addCleanup(shutil.rmtree, os.path.dirname(path), ignore_errors=True)
+        call_command("benchmark", iterations=3, output=path, stdout=StringIO())
+        with open(path) as file:
+            report = json.load(file)
+        self.assertEqual({result["status"] for result in report["results"].values()}, {200})
+        self.assertGreater(report["results"]["feed"]["queries"], 0)
+
+        # Mais consultas que a baseline conta como regressão.
+        report["results"]["feed"]["queries"] -= 1
+        with open(path, "w") as file:
+            json.dump(report, file)
+        with self.assertRaises(CommandError):
+            call_command("benchmark", iterations=3, only=["feed"], baseline=path, stdout=StringIO())
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="ana", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Post.objects.create(user=self.user, content="oi")
+
+    @override_settings(PERF_SERVER_TIMING=True, METRICS_TOKEN="segredo")
+    def test_server_timing_and_metrics(self):
+        response = self.client.get("/api/posts/feed/")
+        timing = response["Server-Timing"]
+        self.assertIn("db;dur=", timing)
+        self.assertIn("serializer;dur=", timing)
+        self.assertIn("render;dur=", timing)
+        self.assertIn("total;dur=", timing)
+
+        body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer segredo").content.decode()
+        self.assertIn('http_request_duration_seconds_bucket{route="post-feed-async",method="GET",status="200"', body)
+        self.assertIn('http_request_queries_count{route="post-feed-async"}', body)
+
+    @override_settings(METRICS_TOKEN="segredo")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer segredo").status_code, 200)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer segrédo").status_code, 401)
+
+    def test_private_by_default(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404) # Sem METRICS_TOKEN.
+        self.assertNotIn("Server-Timing", self.client.get("/api/posts/feed/"))
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0)
+    def test_slow_request_log_lists_worst_queries(self):
+        with self.assertLogs("core.performance", level="WARNING") as logs:
+            self.client.get("/api/posts/feed/")
+        self.assertIn("/api/posts/feed/", logs.output[0])
+        self.assertIn("SELECT", logs.output[0])
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="ana", password="x", first_name="Ana")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}")
+
+    def test_reads_reuse_the_cached_user(self):
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get("/api/users/me/").data["username"], "ana")
+
+    def test_patch_and_deactivation_invalidate(self):
+        self.client.get("/api/users/me/")
+        self.client.patch("/api/users/me/", {"first_name": "Aninha"}, format="multipart")
+        self.assertTrue(self.client.get("/api/users/me/").data["name"].startswith("Aninha"))
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/users/me/").status_code, 401)
+
+    def test_profile_follow_state_after_follow(self):
+        other = CustomUser.objects.create_user(username="bia", password="x")
+        self.assertFalse(self.client.get("/api/users/profile/bia/").data["is_following"])
+        self.client.put("/api/users/bia/follow/")
+        other.refresh_from_db()
+        self.assertTrue(self.client.get("/api/users/profile/bia/").data["is_following"])
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = db_routing.ReplicaRouter()
+        self.middleware = db_routing.ReplicaRoutingMiddleware(lambda request: None)
+        self.view = PostViewSet.as_view({"get": "list"})
+
+    def route(self, method="get", view=None, healthy=True):
+        state = db_routing.RoutingState(write=method != "get")
+        token = db_routing._state.set(state)
+        self.addCleanup(db_routing._state.reset, token)
+        with mock.patch.object(db_routing, "healthy", return_value=healthy):
+            self.middleware.process_view(getattr(RequestFactory(), method)("/"), view or self.view, (), {})
+        return state
+
+    def test_reads_use_replica_until_the_user_writes(self):
+        self.route()
+        self.assertEqual(self.router.db_for_read(Post), "replica1")
+        db_routing.mark_write(7)
+        db_routing.identify(7)
+        self.assertEqual(self.router.db_for_read(Post), "default")
+
+    def test_writes_other_apps_and_unhealthy_replicas_stay_on_primary(self):
+        self.route(method="post")
+        self.assertEqual(self.router.db_for_read(Post), "default")
+        self.route(view=admin.site.index)
+        self.assertEqual(self.router.db_for_read(Post), "default")
+        self.route(healthy=False)
+        self.assertEqual(self.router.db_for_read(Post), "default")
+        self.assertEqual(self.router.db_for_write(Post), "default")
+
+    def test_failed_connection_marks_replica_down(self):
+        broken = mock.MagicMock()
+        broken.__getitem__.return_value.ensure_connection.side_effect = OperationalError
+        with mock.patch.object(db_routing, "connections", broken), self.assertLogs("core.db", level="WARNING"):
+            self.assertFalse(db_routing.healthy("replica1"))
+        self.addCleanup(db_routing._down_until.clear)
+        self.assertFalse(db_routing.healthy("replica1")) # Fora até REPLICA_RETRY_SECONDS, sem nova tentativa.
+
+    def test_write_request_pins_the_author(self):
+        user = CustomUser.objects.create_user(username="ana", password="x")
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        client.post("/api/posts/", {"content": "oi"}, format="json")
+        self.assertTrue(cache.get(db_routing.sticky_key(user.pk)))
+
+
+@override_settings(NOTIFICATIONS_DELIVERY="outbox") # As notificações do teste são criadas direto, sem o follow/repost.
+class AsyncReadViewTests(TransactionTestCase):
+    # Fora de transação: as consultas paralelas usam conexões próprias (ver concurrency.py).
+    def setUp(self):
+        cache.clear()
+        self.ana = CustomUser.objects.create_user(username="ana", password="x")
+        self.bia = CustomUser.objects.create_user(username="bia", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.ana)
+        self.client.put("/api/users/bia/follow/")
+        self.post = self.client.post("/api/posts/", {"content": "oi"}, format="json").data
+
+    def test_feed_profile_and_notifications(self):
+        self.client.force_authenticate(self.bia)
+        self.client.post(f"/api/posts/{self.post['id']}/repost/")
+
+        response = self.client.get("/api/posts/feed/?cursor=")
+        self.assertEqual(response.resolver_match.url_name, "post-feed-async")
+        self.assertEqual(response.data["count"], 1)
+        self.assertEqual(response.data["results"][0]["repost"]["id"], self.post["id"])
+        self.assertTrue(response.data["results"][0]["is_reposted"])
+
+        self.assertFalse(self.client.get("/api/users/profile/ana/").data["is_following"])
+        self.client.force_authenticate(self.ana)
+        profile = self.client.get("/api/users/profile/bia/")
+        self.assertTrue(profile.data["is_following"])
+        self.assertEqual(self.client.get("/api/users/profile/bia/", HTTP_IF_NONE_MATCH=profile["ETag"]).status_code, 304)
+
+        for type in ("FOLLOW", "LIKE"):
+            Notification.objects.create(recipient=self.bia, sender=self.ana, type=type, message=type)
+        self.client.force_authenticate(self.bia)
+        notifications = self.client.get("/api/notifications/?limit=1")
+        self.assertEqual(notifications.data["count"], 2)
+        self.assertEqual([item["type"] for item in notifications.data["results"]], ["LIKE"])
+
+    def test_errors_match_the_sync_views(self):
+        self.assertEqual(self.client.get("/api/posts/feed/?cursor=xyz").status_code, 404)
+        self.assertEqual(self.client.get("/api/users/profile/ninguem/").status_code, 404)
+        self.assertEqual(self.client.post("/api/posts/feed/").status_code, 405)
+        anonymous = APIClient().get("/api/notifications/")
+        self.assertEqual(anonymous.status_code, 401)
+        self.assertIn("Bearer", anonymous["WWW-Authenticate"])
+
+    def test_parallel_queries_use_a_bounded_pool(self):
+        queries = [lambda: (threading.get_ident(), CustomUser.objects.count()) for _ in range(12)]
+        results = asyncio.run(concurrency.gather(*queries))
+        self.assertEqual({count for _, count in results}, {2})
+        self.assertLessEqual(len({ident for ident, _ in results}), settings.ASYNC_QUERY_WORKERS)
+
+    def test_benchmark_counts_queries_of_parallel_threads(self):
+        result = benchmark.measure(self.client, "/api/users/profile/bia/", iterations=1)
+        self.assertEqual(result["status"], 200)
+        self.assertGreater(result["queries"], 0) # Perfil e is_following rodam fora da thread da requisição.
+
+
+class FollowGraphTests(TestCase):
+    def setUp(self):
+        self.ana, self.bia, self.caio, self.duda = (
+            CustomUser.objects.create_user(username=name, password="x") for name in ("ana", "bia", "caio", "duda")
+        )
+        self.client = APIClient()
+
+    def follow(self, user, *usernames):
+        self.client.force_authenticate(user)
+        for username in usernames:
+            self.client.put(f"/api/users/{username}/follow/")
+
+    def usernames(self, url):
+        return [user["username"] for user in self.client.get(url).data["results"]]
+
+    def test_write_through_keeps_cached_adjacency(self):
+        self.assertFalse(graph.is_following(self.ana.pk, self.bia.pk)) # Carrega os índices vazios no cache.
+        self.assertEqual(list(graph.followers(self.bia.pk)), [])
+        self.follow(self.ana, "bia")
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(self.ana.pk, self.bia.pk))
+            self.assertEqual(list(graph.followers(self.bia.pk)), [self.ana.pk])
+        self.client.delete("/api/users/bia/follow/")
+        self.assertFalse(graph.is_following(self.ana.pk, self.bia.pk))
+
+        self.bia.followers.add(self.ana) # Fora de reactions.py: só invalida.
+        self.assertTrue(graph.is_following(self.ana.pk, self.bia.pk))
+
+    def test_local_cache_uses_short_ttl(self):
+        # Sem cache compartilhado o write-through não chega aos outros processos.
+        self.assertEqual(graph._ttl(), settings.GRAPH_LOCAL_CACHE_TTL)
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost:6379"}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(graph._ttl(), settings.GRAPH_CACHE_TTL)
+
+    def test_mutuals_and_followed_by(self):
+        self.follow(self.ana, "bia", "caio", "duda")
+        self.follow(self.bia, "ana", "duda")
+        self.follow(self.caio, "ana", "duda")
+        self.assertEqual(self.usernames("/api/users/profile/ana/mutuals/"), ["bia", "caio"])
+
+        self.client.force_authenticate(self.ana)
+        self.assertEqual(self.usernames("/api/users/profile/duda/followed_by/"), ["bia", "caio"])
+        with override_settings(GRAPH_MAX_IDS=0): # Perfil grande: interseção pelo banco.
+            self.assertEqual(self.usernames("/api/users/profile/duda/followed_by/"), ["bia", "caio"])
+            self.assertEqual(self.usernames("/api/users/profile/ana/mutuals/"), ["bia", "caio"])
+        self.assertTrue(self.client.get("/api/users/profile/duda/").data["is_following"])
+
+
+@override_settings(NOTIFICATIONS_DELIVERY="sync", SYNC_SETTLE_SECONDS=0)
+class SyncTests(TestCase):
+    def setUp(self):
+        self.ana = CustomUser.objects.create_user(username="ana", password="x")
+        self.bia = CustomUser.objects.create_user(username="bia", password="x")
+        self.client = APIClient()
+        self.client.force_authenticate(self.ana)
+        self.client.put("/api/users/bia/follow/")
+        self.bia_client = APIClient()
+        self.bia_client.force_authenticate(self.bia)
+        self.post_id = self.bia_client.post("/api/posts/", {"content": "antes"}).data["id"]
+
+    def sync(self, since, posts=()):
+        return self.client.get("/api/sync/", {"since": since, "posts": ",".join(map(str, posts))}).data
+
+    def test_without_token_requires_resync(self):
+        data = self.client.get("/api/sync/").data
+        self.assertTrue(data["resync_required"])
+        self.assertFalse(self.sync(data["token"])["resync_required"])
+        self.assertTrue(self.sync(int(data["token"]) + 100)["resync_required"])
+
+    def test_new_posts_counters_and_deletions(self):
+        token = self.client.get("/api/sync/").data["token"]
+        self.bia_client.put(f"/api/posts/{self.post_id}/like/")
+        new_id = self.bia_client.post("/api/posts/", {"content": "depois"}).data["id"]
+
+        data = self.sync(token, [self.post_id])
+        self.assertEqual([post["id"] for post in data["posts"]], [new_id])
+        self.assertEqual(data["post_counters"], [{"id": self.post_id, "likes": 1, "bookmark": 0, "reposts": 0}])
+        self.assertEqual(data["deleted_posts"], [])
+
+        token = data["token"]
+        self.bia_client.delete(f"/api/posts/{self.post_id}/")
+        data = self.sync(token, [self.post_id, new_id])
+        self.assertEqual((data["posts"], data["post_counters"], data["deleted_posts"]), ([], [], [self.post_id]))
+        self.assertEqual(self.sync(data["token"], [new_id])["deleted_posts"], [])
+
+    def test_own_counters_and_notifications(self):
+        token = self.client.get("/api/sync/").data["token"]
+        self.bia_client.put("/api/users/ana/follow/")
+        data = self.sync(token)
+        self.assertEqual(data["counters"]["followers_count"], 1)
+        self.assertEqual([notification["type"] for notification in data["notifications"]], ["FOLLOW"])
+        self.assertEqual(data["unread_count"], 1)
+
+        notification_id = data["notifications"][0]["id"]
+        self.bia_client.delete("/api/users/ana/follow/")
+        data = self.sync(data["token"])
+        self.assertEqual((data["notifications"], data["deleted_notifications"]), ([], [notification_id]))
+        self.assertIsNone(self.sync(data["token"])["counters"])
+
+    @override_settings(SYNC_RETENTION=0)
+    def test_pruned_token_requires_resync(self):
+        token = self.client.get("/api/sync/").data["token"]
+        self.bia_client.put(f"/api/posts/{self.post_id}/like/")
+        self.bia_client.put(f"/api/posts/{self.post_id}/bookmark/")
+        call_command("prune_changes", stdout=StringIO())
+        self.assertTrue(self.sync(token)["resync_required"])
+        fresh = self.client.get("/api/sync/").data["token"] # A linha mais recente fica: o token novo continua válido.
+        self.assertFalse(self.sync(fresh)["resync_required"])
+
+    def test_rejects_invalid_held_posts(self):
+        self.assertEqual(self.client.get("/api/sync/", {"since": 0, "posts": "1,x"}).status_code, 400)
@@ -0,0 +1,98 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import CustomUser, Post, TimelineEntry
+from .pubsub import author_channel, publish, user_channel
+
+# Timeline híbrida:
+# - Autores comuns têm seus posts copiados (fan-out na escrita) para a TimelineEntry de cada seguidor.
+# - Autores populares (muitos seguidores) não fazem fan-out; seus posts são lidos na hora (fan-out na leitura),
+#   evitando que um único post gere milhares de escritas.
+# - Quem cai abaixo do limite tem os posts recentes copiados para os seguidores (demote); timelines de usuários
+#   que já existiam antes da TimelineEntry são preenchidas pela migração 0013 (e por rebuild_timelines).
+
+
+def is_popular(user):
+    # Autor com seguidores acima do limite não recebe fan-out na escrita.
+    return user.followers_count >= settings.TIMELINE_FANOUT_LIMIT
+
+
+def popular_following_ids(user):
+    # IDs dos autores populares que o usuário segue (lidos no momento do feed).
+    return list(
+        CustomUser.objects.filter(followers=user, followers_count__gte=settings.TIMELINE_FANOUT_LIMIT)
+        .values_list("id", flat=True)
+    )
+
+
+def fan_out_post(post):
+    # Entrega um post (ou repost) recém-criado às timelines do autor e dos seguidores.
+    author = post.user
+    owner_ids = [author.pk]
+    popular = is_popular(author)
+    if not popular:
+        owner_ids += list(author.followers.values_list("id", flat=True))
+
+    entries = [TimelineEntry(owner_id=owner_id, post=post, created_at=post.created_at) for owner_id in owner_ids]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True, batch_size=1000)
+
+    # Avisa as conexões abertas (stream de eventos) que há post novo no feed.
+    if popular:
+        channels = [author_channel(author.pk)] # Seguidores de autores populares assinam o canal do autor.
+    else:
+        channels = [user_channel(owner_id) for owner_id in owner_ids[1:]]
+    event = {"type": "new_post", "post_id": post.pk, "author_id": author.pk}
+    transaction.on_commit(lambda: publish(channels, event))
+
+
+def _copy_recent_posts(owner, author):
+    posts = Post.objects.filter(user=author).order_by("-created_at").values_list("id", "created_at")[:settings.TIMELINE_BACKFILL_SIZE]
+    entries = [TimelineEntry(owner=owner, post_id=post_id, created_at=created_at) for post_id, created_at in posts]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True, batch_size=1000)
+
+
+def backfill(owner, author):
+    # Ao seguir alguém, copia os posts mais recentes do autor para a timeline de quem seguiu.
+    if is_popular(author):
+        return # Posts de autores populares já entram pelo caminho de leitura.
+    _copy_recent_posts(owner, author)
+
+
+def demote(author):
+    # O autor voltou a ficar abaixo do limite: os posts feitos enquanto era popular só existiam no caminho de
+    # leitura e sumiriam do feed dos seguidores. Copia os recentes para as timelines deles, uma vez.
+    posts = list(Post.objects.filter(user=author).order_by("-created_at").values_list("id", "created_at")[:settings.TIMELINE_BACKFILL_SIZE])
+    follower_ids = author.followers.values_list("id", flat=True).iterator(chunk_size=1000)
+    batch = []
+    for owner_id in follower_ids:
+        batch += [TimelineEntry(owner_id=owner_id, post_id=post_id, created_at=created_at) for post_id, created_at in posts]
+        if len(batch) >= 5000:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True, batch_size=1000)
+            batch = []
+    TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True, batch_size=1000)
+
+
+def prune(owner, author):
+    # Ao deixar de seguir, remove da timeline os posts daquele autor.
+    TimelineEntry.objects.filter(owner=owner, post__user=author).delete()
+
+
+def feed_queryset(user):
+    # Posts materializados na timeline + posts dos autores populares seguidos.
+    timeline_post_ids = TimelineEntry.objects.filter(owner=user).values("post_id")
+    condition = Q(pk__in=timeline_post_ids)
+
+    popular_ids = popular_following_ids(user)
+    if popular_ids:
+        condition |= Q(user_id__in=popular_ids)
+
+    return Post.objects.filter(condition).order_by("-created_at", "-id")
+
+
+def rebuild(user):
+    # Reconstrói do zero a timeline de um usuário (usado pelo comando rebuild_timelines).
+    TimelineEntry.objects.filter(owner=user).delete()
+    _copy_recent_posts(user, user) # Os próprios posts sempre ficam na timeline, mesmo de autores populares.
+    for author in CustomUser.objects.filter(followers=user):
+        backfill(user, author)
@@ -0,0 +1,131 @@
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour, TruncMinute
+from django.utils import timezone
+
+from .models import Bookmark, Like, Post, TrendingPost
+
+# Trending com decaimento temporal:
+#   score(post) = soma, para cada evento na janela, de peso(tipo) * 0.5 ** (idade / meia_vida)
+# Os eventos (likes, bookmarks e reposts) são agregados por balde de tempo no banco, lendo só o
+# intervalo pedido pelos índices de created_at. O resultado (top N) fica em TrendingPost e no cache,
+# e a leitura do endpoint é só buscar a lista pronta. O TTL curto do cache faz processos que não rodaram
+# o job (cache local) relerem a tabela pequena periodicamente.
+#
+# Manutenção incremental (update_scores): os scores de todos os posts da janela ficam no cache com a
+# marca "as_of" da última execução. Na seguinte:
+# - tudo decai pelo tempo decorrido (um fator só: 0.5 ** (decorrido / meia_vida));
+# - entram os eventos criados desde "as_of" e saem os que cruzaram o início da janela nesse intervalo.
+# Cada execução lê só duas fatias do tamanho do intervalo entre execuções, não a janela inteira.
+# Likes desfeitos e eventos gravados com created_at anterior à marca (transação lenta) não passam pelas
+# fatias: a cada TRENDING_REBUILD_SECONDS, ou sem estado no cache, a janela é recalculada do zero.
+
+CACHE_KEY = "trending:{window}"
+STATE_KEY = "trending:state:{window}"
+MIN_SCORE = 1e-9 # Abaixo disso é resto de arredondamento de um evento que já saiu da janela.
+
+
+def window_seconds(window):
+    try:
+        return settings.TRENDING_WINDOWS[window]
+    except KeyError:
+        raise ValueError(f"Janela de trending desconhecida: {window}")
+
+
+def _bucketed(queryset, post_field, trunc, since, until):
+    return (
+        queryset.filter(created_at__gte=since, created_at__lt=until)
+        .annotate(bucket=trunc("created_at"))
+        .values(post_field, "bucket")
+        .annotate(total=Count("*"))
+        .order_by()
+    )
+
+
+def _accumulate(scores, seconds, since, until, now, sign=1):
+    # Soma (ou desconta, com sign=-1) os eventos de [since, until) com o peso que têm em "now".
+    # O mesmo evento cai sempre no mesmo balde: o que entra e depois sai se anula exatamente.
+    half_life = seconds * settings.TRENDING_HALF_LIFE_RATIO
+    trunc = TruncMinute if seconds <= 6 * 3600 else TruncHour # Baldes mais finos para janelas curtas.
+    weights = settings.TRENDING_WEIGHTS
+
+    sources = [
+        (_bucketed(Like.objects, "post_id", trunc, since, until), "post_id", weights["like"]),
+        (_bucketed(Bookmark.objects, "post_id", trunc, since, until), "post_id", weights["bookmark"]),
+        (_bucketed(Post.objects.filter(repost__isnull=False), "repost_id", trunc, since, until), "repost_id", weights["repost"]),
+    ]
+    for rows, post_field, weight in sources:
+        for row in rows:
+            age = max((now - row["bucket"]).total_seconds(), 0)
+            scores[row[post_field]] += sign * weight * row["total"] * math.pow(0.5, age / half_life)
+
+
+def compute_scores(window, now=None):
+    now = now or timezone.now()
+    seconds = window_seconds(window)
+    scores = defaultdict(float)
+    _accumulate(scores, seconds, now - timedelta(seconds=seconds), now, now)
+    return scores
+
+
+def update_scores(window, now=None):
+    # Devolve (scores, built_at): built_at é quando a janela foi recalculada do zero pela última vez.
+    now = now or timezone.now()
+    seconds = window_seconds(window)
+    state = cache.get(STATE_KEY.format(window=window))
+    if (state is None or (now - state["built_at"]).total_seconds() >= settings.TRENDING_REBUILD_SECONDS
+            or not timedelta(0) <= now - state["as_of"] < timedelta(seconds=seconds)):
+        return compute_scores(window, now), now
+
+    elapsed = (now - state["as_of"]).total_seconds()
+
+    window_start = timedelta(seconds=seconds)
+    decay = math.pow(0.5, elapsed / (seconds * settings.TRENDING_HALF_LIFE_RATIO))
+    scores = defaultdict(float, {post_id: score * decay for post_id, score in state["scores"].items()})
+    _accumulate(scores, seconds, state["as_of"], now, now)
+    _accumulate(scores, seconds, state["as_of"] - window_start, now - window_start, now, sign=-1)
+    return scores, state["built_at"]
+
+
+def recompute(window, now=None):
+    now = now or timezone.now()
+    scores, built_at = update_scores(window, now)
+    scores = {post_id: score for post_id, score in scores.items() if score > MIN_SCORE}
+
+    # Posts apagados desde o último recálculo completo ainda podem ter score no estado: saem aqui.
+    candidates = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:settings.TRENDING_SIZE * 2]
+    alive = set(Post.objects.filter(pk__in=[post_id for post_id, _ in candidates]).values_list("id", flat=True))
+    for post_id, _ in candidates:
+        if post_id not in alive:
+            del scores[post_id]
+    top = [(post_id, score) for post_id, score in candidates if post_id in alive][:settings.TRENDING_SIZE]
+
+    with transaction.atomic():
+        TrendingPost.objects.filter(window=window).delete()
+        TrendingPost.objects.bulk_create(
+            TrendingPost(window=window, post_id=post_id, rank=rank, score=score, computed_at=now)
+            for rank, (post_id, score) in enumerate(top, start=1)
+        )
+    cache.set(CACHE_KEY.format(window=window), {"ids": [post_id for post_id, _ in top], "computed_at": now}, settings.TRENDING_CACHE_TTL)
+    cache.set(STATE_KEY.format(window=window), {"scores": scores, "as_of": now, "built_at": built_at}, settings.TRENDING_REBUILD_SECONDS)
+    return len(top)
+
+
+def ranking(window):
+    # Lista pronta de ids (mais quente primeiro) + quando foi calculada. None se o job nunca rodou.
+    window_seconds(window) # Valida a janela.
+    key = CACHE_KEY.format(window=window)
+    data = cache.get(key)
+    if data is None:
+        entries = list(TrendingPost.objects.filter(window=window).order_by("rank").values_list("post_id", "computed_at"))
+        if not entries:
+            return None
+        data = {"ids": [post_id for post_id, _ in entries], "computed_at": entries[0][1]}
+        cache.set(key, data, settings.TRENDING_CACHE_TTL)
+    return data
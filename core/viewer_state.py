@@ -0,0 +1,40 @@
+from . import concurrency
+from .models import Bookmark, Like, Post
+from .reposts import target_id
+
+# Resolve de uma vez, para a página inteira, o que o PostSerializer buscaria post a post:
+# se o usuário logado curtiu, salvou ou repostou cada post (os contadores já estão nas colunas do Post).
+# O resultado vai para o serializer via context['page_state'].
+
+STATE_NAMES = ("liked_ids", "bookmarked_ids", "reposted_ids")
+
+
+def _page_queries(user, posts):
+    post_ids = [post.id for post in posts]
+    if not (user.is_authenticated and post_ids):
+        return None
+    return {
+        "liked_ids": lambda: set(Like.objects.filter(user_id=user.pk, post_id__in=post_ids).values_list("post_id", flat=True)),
+        "bookmarked_ids": lambda: set(
+            Bookmark.objects.filter(user_id=user.pk, post_id__in=post_ids).values_list("post_id", flat=True)
+        ),
+        # Reposts apontam para o original: um repost na página conta como repostado se o original foi.
+        "reposted_ids": lambda: set(
+            Post.objects.filter(user=user, repost_id__in={target_id(post) for post in posts}).values_list("repost_id", flat=True)
+        ),
+    }
+
+
+def resolve_page_state(user, posts):
+    queries = _page_queries(user, posts)
+    if queries is None:
+        return {name: set() for name in STATE_NAMES}
+    return {name: query() for name, query in queries.items()}
+
+
+async def aresolve_page_state(user, posts):
+    # Views assíncronas: as três consultas em paralelo.
+    queries = _page_queries(user, posts)
+    if queries is None:
+        return {name: set() for name in STATE_NAMES}
+    return dict(zip(queries, await concurrency.gather(*queries.values())))
@@ -1,24 +1,48 @@
-from rest_framework import viewsets, permissions
+from rest_framework import mixins, viewsets, permissions
 from rest_framework.views import APIView
+from rest_framework.generics import GenericAPIView
 from rest_framework.decorators import action
 from rest_framework import status
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from django.db.models import Q
-
 from django.shortcuts import get_object_or_404
 
-from .models import CustomUser, Post
+from .models import CustomUser, Hashtag, Post, PostHashtag
+from .pagination import HashtagCursorPagination, PostListPagination, SearchPostPagination, SearchUserPagination, UserListPagination
 from .serializers import UserSerializer, PostSerializer, UserRegisterSerializer, UserUpdateSerializer
-from django.db.models import Count
-
-class PostPagination(PageNumberPagination): # Classe de paginação
-    page_size = 10  # Número de itens por página
-    page_size_query_param = 'page_size'
-    max_page_size = 100  # Tamanho máximo da página
+from .timeline import fan_out_post, feed_queryset
+from .viewer_state import resolve_page_state
+from . import avatars, conditional, counters, graph, reactions, reposts, search, suggestions, sync, tags, trending
+from django.conf import settings
+from django.db import transaction
+
+POST_RELATED = ('user',) # Evita uma consulta por linha para o autor; os originais dos reposts vêm em lote (ver reposts.py).
+
+# Dados públicos do perfil e se o usuário logado segue aquele perfil (também usado pela versão assíncrona).
+def profile_payload(request, user, is_following):
+    # Constrói a URL absoluta do avatar (miniatura grande, ver avatars.py).
+    avatar_url = avatars.avatar_url(request, user, "large") if user.avatar else "/default-avatar.png"
+    return {
+        "id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "avatar": avatar_url,
+        "avatar_urls": avatars.avatar_urls(request, user) if user.avatar else None,
+        "followers_count": user.followers_count,
+        "following_count": user.following_count,
+        "is_me": request.user == user,
+        "is_following": is_following,
+    }
+
+class PostPageMixin:
+    # Em listagens (many=True), resolve o estado do usuário para a página inteira em consultas fixas.
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many') and args:
+            kwargs.setdefault('context', self.get_serializer_context())
+            kwargs['context']['page_state'] = resolve_page_state(self.request.user, args[0])
+        return super().get_serializer(*args, **kwargs)
 
 # VieSet para gerenciar usuários.
 class CustomUserViewSet(viewsets.ModelViewSet):
@@ -41,6 +65,9 @@ class CustomUserViewSet(viewsets.ModelViewSet):
             serializer = UserUpdateSerializer(user, data=request.data, partial=True, context={'request': request})
             if serializer.is_valid():
                 serializer.save()
+                counters.touch_user(user.pk) # Invalida os ETags do perfil.
+                if serializer.validated_data.get('avatar'):
+                    avatars.schedule_on_commit(user.pk) # Miniaturas geradas fora da requisição.
                 return Response(serializer.data)
             return Response(serializer.errors, status=400)
 
@@ -49,23 +76,15 @@ class CustomUserViewSet(viewsets.ModelViewSet):
 
         user = get_object_or_404(CustomUser, username=username) # Busca o usuário pelo nome de usuário ou retorna 404.
 
-        # Constrói a URL absoluta do avatar.
-        avatar_url = user.avatar.url if user.avatar else "/default-avatar.png"
-        if user.avatar:
-            avatar_url = request.build_absolute_uri(user.avatar.url)
-
-        # Retorna um dicionário com os dados públicos do perfil e se o usuário logado segue aquele perfil.
-        user_data = {
-            "id": user.id,
-            "first_name": user.first_name,
-            "last_name": user.last_name,
-            "avatar": avatar_url,
-            "followers_count": user.followers.count(),
-            "following_count": user.following.count(),
-            "is_me": request.user == user,
-            "is_following": request.user in user.followers.all() if request.user.is_authenticated else False
-        }
-        return Response(user_data)
+        # Perfil sem mudanças desde a última leitura do cliente: 304 sem consultar o follow.
+        etag = conditional.make_etag(request, user.pk, user.version)
+        cached = conditional.not_modified(request, etag, user.updated_at)
+        if cached is not None:
+            return cached
+
+        is_following = request.user.is_authenticated and graph.is_following(request.user.pk, user.pk)
+        user_data = profile_payload(request, user, is_following)
+        return conditional.with_validators(Response(user_data), etag, user.updated_at)
     
     @action(
         detail=False,
@@ -77,7 +96,7 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         user = get_object_or_404(CustomUser, username=username)
         qs = user.followers.all().order_by('id')
 
-        paginator = PostPagination()
+        paginator = UserListPagination()
         page = paginator.paginate_queryset(qs, request)
         serializer = UserSerializer(page, many=True, context={'request': request})
         return paginator.get_paginated_response(serializer.data)
@@ -92,29 +111,68 @@ class CustomUserViewSet(viewsets.ModelViewSet):
         user = get_object_or_404(CustomUser, username=username)
         qs = user.following.all().order_by('id')
 
-        paginator = PostPagination()
+        paginator = UserListPagination()
         page = paginator.paginate_queryset(qs, request)
         serializer = UserSerializer(page, many=True, context={'request': request})
         return paginator.get_paginated_response(serializer.data)
 
 
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def follow(self, request, pk=None):
-    # Cria POST /users/<id>/follow/.
+    def user_page(self, request, ids):
+        # Página de usuários a partir de ids vindos do índice do grafo (ver graph.py).
+        qs = CustomUser.objects.filter(pk__in=ids).order_by('id')
+        paginator = UserListPagination()
+        page = paginator.paginate_queryset(qs, request)
+        serializer = UserSerializer(page, many=True, context={'request': request})
+        return paginator.get_paginated_response(serializer.data)
+
+    # GET /users/profile/<username>/mutuals/ — quem o usuário segue e também o segue de volta.
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticatedOrReadOnly],
+        url_path=r'profile/(?P<username>[^/.]+)/mutuals'
+    )
+    def mutuals(self, request, username=None):
+        user = get_object_or_404(CustomUser, username=username)
+        return self.user_page(request, graph.mutual_ids(user))
+
+    # GET /users/profile/<username>/followed_by/ — quem o usuário logado segue e também segue esse perfil.
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+        url_path=r'profile/(?P<username>[^/.]+)/followed_by'
+    )
+    def followed_by(self, request, username=None):
+        user = get_object_or_404(CustomUser, username=username)
+        return self.user_page(request, graph.followed_by_ids(request.user.pk, user))
 
+    # POST /users/<username>/follow/ alterna; PUT segue e DELETE deixa de seguir (idempotentes).
+    @action(detail=True, methods=['post', 'put', 'delete'], permission_classes=[IsAuthenticated])
+    def follow(self, request, username=None):
         target_user = self.get_object()
         user = request.user
         # Impede seguir a si mesmo.
         if user == target_user:
             return Response({"detail": "Você não pode seguir a si mesmo."}, status=400)
 
-        if target_user in user.following.all():
-            user.following.remove(target_user)
-            return Response({"detail": "Unfollowed"}, status=204)
+        removed = created = False
+        if request.method == 'DELETE':
+            following = False
+            removed = reactions.remove_follow(user, target_user)
+        elif request.method == 'PUT':
+            following = True
+            created = reactions.add_follow(user, target_user)
         else:
-            user.following.add(target_user)
-
-            from notifications.utils import create_notification
+            # Toggle: tenta desfazer; se não havia follow, cria.
+            removed = reactions.remove_follow(user, target_user)
+            following = not removed
+            created = following and reactions.add_follow(user, target_user)
+
+        from notifications.utils import create_notification, retract_notification
+        if removed:
+            retract_notification(recipient=target_user, sender=user, type='FOLLOW')
+        if created:
             create_notification(
                 recipient=target_user,
                 sender=request.user,
@@ -122,17 +180,65 @@ class CustomUserViewSet(viewsets.ModelViewSet):
                 message=f'{request.user.username} começou a seguir você  '
             )
 
-        return Response({"detail": "Followed"}, status=201)
+        if request.method == 'POST':
+            if following:
+                return Response({"detail": "Followed"}, status=201)
+            return Response({"detail": "Unfollowed"}, status=204)
+        return Response({"following": following, "followers_count": reactions.followers_count(target_user)})
 
-# Lista os posts mais curtidos.
-class MostLikedPostsViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.annotate(like_count=Count('likes')).order_by('-like_count')[:4]
+# Lista os posts em alta (trending), lidos do ranking pré-calculado por compute_trending. Só leitura (sem rotas de detalhe).
+class MostLikedPostsViewSet(PostPageMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+    queryset = Post.objects.select_related(*POST_RELATED)
     serializer_class = PostSerializer
-
-# Lista perfis aleatórios.
-class RandomFollowersViewSet(viewsets.ModelViewSet):
-    queryset = CustomUser.objects.order_by("?")[:4]
+    permission_classes = [AllowAny]
+    default_limit = 4
+
+    # GET /most-liked-posts/?window=1h|24h|7d&limit=4
+    def list(self, request, *args, **kwargs):
+        window = request.query_params.get('window', settings.TRENDING_DEFAULT_WINDOW)
+        try:
+            limit = min(int(request.query_params.get('limit', self.default_limit)), settings.TRENDING_SIZE)
+            ranked = trending.ranking(window)
+        except ValueError:
+            return Response({"detail": "Parâmetros inválidos."}, status=400)
+        if limit < 1:
+            return Response({"detail": "Parâmetros inválidos."}, status=400)
+
+        if ranked is None:
+            # Ranking ainda não calculado: usa o contador de likes (coluna), sem agregar a tabela inteira.
+            ids = list(Post.objects.order_by('-likes_count', '-id').values_list('id', flat=True)[:limit])
+            computed_at = None
+        else:
+            ids = ranked["ids"][:limit]
+            computed_at = ranked["computed_at"]
+
+        # Carimbos dos posts do ranking (uma consulta leve) decidem o 304 antes de carregar e serializar.
+        stamps = sorted(Post.objects.filter(pk__in=ids).values_list('id', 'version', 'user__version', 'repost__version', 'repost_author__version', 'updated_at'))
+        etag = conditional.make_etag(request, window, computed_at, *(stamp[:5] for stamp in stamps))
+        last_modified = max([stamp[5] for stamp in stamps] + ([computed_at] if computed_at else []), default=None)
+        cached = conditional.not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
+        by_id = self.get_queryset().in_bulk(ids)
+        posts = [by_id[post_id] for post_id in ids if post_id in by_id]
+
+        page = self.paginate_queryset(posts)
+        serializer = self.get_serializer(page, many=True)
+        return conditional.with_validators(self.get_paginated_response(serializer.data), etag, last_modified)
+
+# Sugestões de perfis para seguir (pré-calculadas em FollowSuggestion, ver suggestions.py). Só a listagem.
+class RandomFollowersViewSet(mixins.ListModelMixin, viewsets.GenericViewSet):
+    queryset = CustomUser.objects.all()
     serializer_class = UserSerializer
+    permission_classes = [AllowAny]
+    default_limit = 4
+
+    def list(self, request, *args, **kwargs):
+        users = suggestions.suggest(request.user, self.default_limit)
+        page = self.paginate_queryset(users)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 # View para cadastro de novo usuário. Usa o UserRegisterSerializer e retorna os dados do novo usuário após salvar.
 class UserRegisterView(APIView):
@@ -142,33 +248,117 @@ class UserRegisterView(APIView):
         serializer = UserRegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
+            if serializer.validated_data.get('avatar'):
+                avatars.schedule_on_commit(user.pk)
             response_data = UserSerializer(user, context={'request': request}).data
             return Response(response_data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+# Sincronização incremental: GET /api/sync/?since=<token>&posts=1,2,3 (posts que o cliente já tem na tela).
+class SyncView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        held = request.query_params.get('posts', '')
+        try:
+            held_post_ids = [int(value) for value in held.split(',') if value.strip()]
+        except ValueError:
+            return Response({"detail": "posts deve ser uma lista de ids separados por vírgula."}, status=400)
+        if len(held_post_ids) > settings.SYNC_MAX_HELD:
+            return Response({"detail": f"Informe no máximo {settings.SYNC_MAX_HELD} posts."}, status=400)
+
+        since = sync.parse_token(request.query_params.get('since'))
+        return Response(sync.changes_since(request, since, held_post_ids))
+
+# Busca textual: GET /api/search/?q=texto&type=posts|users, ordenada por relevância e paginada por cursor.
+class SearchView(PostPageMixin, GenericAPIView):
+    permission_classes = [AllowAny]
+    serializer_class = PostSerializer
+    min_query_length = 2
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        kind = request.query_params.get('type', 'posts')
+        if len(query) < self.min_query_length or kind not in ('posts', 'users'):
+            return Response({"detail": "Informe q (mínimo de 2 caracteres) e type=posts ou users."}, status=400)
+
+        if kind == 'users':
+            paginator = SearchUserPagination()
+            page = paginator.paginate_queryset(search.search_users(query), request)
+            serializer = UserSerializer(page, many=True, context={'request': request})
+        else:
+            paginator = SearchPostPagination()
+            page = paginator.paginate_queryset(search.search_posts(query).select_related(*POST_RELATED), request)
+            serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
 # ViewSet completo para posts.
-class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all().order_by('-created_at')
+class PostViewSet(PostPageMixin, viewsets.ModelViewSet):
+    queryset = Post.objects.select_related(*POST_RELATED).order_by('-created_at', '-id')
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    pagination_class = PostPagination 
+    pagination_class = PostListPagination
 
     # Ao criar um post, associa automaticamente ao usuário autenticado.
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        with transaction.atomic():
+            post = serializer.save(user=self.request.user)
+            counters.post_created(post)
+            mentioned = tags.index_post(post) if post.content else [] # Hashtags e menções do texto.
+        fan_out_post(post) # Entrega o post às timelines dos seguidores.
+        self.notify_mentions(post, mentioned)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            post = serializer.save()
+            counters.touch_post(post.pk) # Edição muda o conteúdo: nova versão, novo ETag e novo fragmento em cache.
+            mentioned = tags.index_post(post)
+        post.refresh_from_db(fields=['version', 'updated_at'])
+        self.notify_mentions(post, mentioned)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            counters.post_deleted(instance)
+            instance.delete() # As hashtags são descontadas no post_delete de PostHashtag (ver tags.py).
+
+    def notify_mentions(self, post, users):
+        from notifications.utils import create_notification
+        for user in users:
+            create_notification(
+                recipient=user,
+                sender=post.user,
+                type='MENTION',
+                post=post,
+                message=f'{post.user.username} mencionou você em um post  '
+            )
+
+    # GET /posts/<id>/ condicional: o ETag combina as versões do post, do autor e do original (em reposts).
+    def retrieve(self, request, *args, **kwargs):
+        post = self.get_object()
+        reposts.attach_originals([post])
+        stamps = [post.version, post.user.version]
+        last_modified = max(post.updated_at, post.user.updated_at)
+        if post.repost is not None:
+            stamps += [post.repost.version, post.repost.user.version]
+            last_modified = max(last_modified, post.repost.updated_at, post.repost.user.updated_at)
+
+        etag = conditional.make_etag(request, post.pk, *stamps)
+        cached = conditional.not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+        serializer = self.get_serializer(post)
+        return conditional.with_validators(Response(serializer.data), etag, last_modified)
 
 
     @action(detail=False, methods=['get'], url_path='feed', permission_classes=[IsAuthenticated])
     def feed(self, request):
         # Cria GET /posts/feed/ — mostra posts do usuário logado + de quem ele segue.
 
-        # Filtra posts de user + user.following.
-        user = request.user
-        following = user.following.all()
-        posts = Post.objects.filter(Q(user__in=[*following, user])).order_by('-created_at')
+        # Lê a timeline materializada do usuário + posts dos autores populares que ele segue.
+        posts = feed_queryset(request.user).select_related(*POST_RELATED)
 
         # Aplica paginação e retorna resposta paginada.
-        paginator = PostPagination()
+        paginator = PostListPagination()
         paginated_posts = paginator.paginate_queryset(posts, request)
         serializer = self.get_serializer(paginated_posts, many=True)
         return paginator.get_paginated_response(serializer.data)
@@ -177,78 +367,125 @@ class PostViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], url_path='user/(?P<username>[^/.]+)')
     def posts_by_user(self, request, username=None):
         user = get_object_or_404(CustomUser, username=username)
-        posts = Post.objects.filter(user=user).order_by('-created_at')
+        posts = Post.objects.filter(user=user).select_related(*POST_RELATED).order_by('-created_at', '-id')
         # Retorna todos os posts criados por um usuário específico.
 
-        # Aplica paginação e retorna resposta paginada.
-        paginator = PostPagination()
-        paginated_posts = paginator.paginate_queryset(posts, request)
+        # Página primeiro (LIMIT pelo índice do autor) e originais dos reposts em lote, como o serializer faria;
+        # o 304 sai dos carimbos só dessa página: versão do autor (muda a cada post criado/apagado) + versões dos
+        # posts, dos originais repostados e dos autores deles. Decide antes do serializer, que é a parte cara.
+        paginator = PostListPagination()
+        paginated_posts = reposts.attach_originals(paginator.paginate_queryset(posts, request))
+        rows = [(post, post.repost if post.repost_id else None) for post in paginated_posts]
+        etag = conditional.make_etag(request, user.pk, user.version, *(
+            (post.pk, post.version, original and original.version, original and original.user.version) for post, original in rows
+        ))
+        last_modified = max(filter(None, [user.updated_at] + [row.updated_at for pair in rows for row in pair if row]))
+        cached = conditional.not_modified(request, etag, last_modified)
+        if cached is not None:
+            return cached
+
         serializer = self.get_serializer(paginated_posts, many=True)
+        return conditional.with_validators(paginator.get_paginated_response(serializer.data), etag, last_modified)
+
+    # GET /posts/tag/<nome>/ — posts com a hashtag, mais recentes primeiro, paginados por cursor.
+    @action(detail=False, methods=['get'], url_path=r'tag/(?P<name>\w+)')
+    def tag(self, request, name=None):
+        hashtag = get_object_or_404(Hashtag, name=name.lower())
+        paginator = HashtagCursorPagination()
+        entries = paginator.paginate_queryset(PostHashtag.objects.filter(hashtag=hashtag), request)
+        by_id = Post.objects.select_related(*POST_RELATED).in_bulk([entry.post_id for entry in entries])
+        posts = [by_id[entry.post_id] for entry in entries if entry.post_id in by_id]
+        serializer = self.get_serializer(posts, many=True)
         return paginator.get_paginated_response(serializer.data)
 
+    # GET /posts/trending-tags/?limit=10 — leitura dos k maiores contadores da janela (ver tags.py).
+    @action(detail=False, methods=['get'], url_path='trending-tags')
+    def trending_tags(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response({"detail": "Parâmetros inválidos."}, status=400)
+        if limit < 1:
+            return Response({"detail": "Parâmetros inválidos."}, status=400)
+        return Response([
+            {"name": hashtag.name, "count": hashtag.recent_count, "posts_count": hashtag.posts_count}
+            for hashtag in tags.trending_hashtags(limit)
+        ])
+
     @action(detail=False, methods=['get'], url_path='bookmark', permission_classes=[IsAuthenticated])
     def bookmarked_posts(self, request):
         user = request.user
-        posts = user.bookmarked_posts.all()
+        posts = user.bookmarked_posts.select_related(*POST_RELATED).order_by('-created_at', '-id')
         # Retorna os posts salvos pelo usuário atual.
 
         # Paginação
-        paginator = PostPagination()
+        paginator = PostListPagination()
         paginated_posts = paginator.paginate_queryset(posts, request)
         serializer = self.get_serializer(paginated_posts, many=True)
         return paginator.get_paginated_response(serializer.data)
 
-    # Curtidas: adiciona ou remove o like do post com pk.
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def like(self, request, pk=None):
+    # Aplica uma reação (like/bookmark) conforme o método:
+    # PUT adiciona, DELETE remove (ambos idempotentes e devolvem o estado e o contador); POST alterna (compatibilidade).
+    def react(self, request, kind, notification_type, message):
         post = self.get_object()
-        if request.user in post.likes.all():
-            post.likes.remove(request.user)
-        else:
-            post.likes.add(request.user)
 
-            from notifications.utils import create_notification
+        removed = created = False
+        if request.method == 'DELETE':
+            active = False
+            removed = reactions.remove_reaction(kind, post, request.user)
+        elif request.method == 'PUT':
+            active = True
+            created = reactions.add_reaction(kind, post, request.user)
+        else:
+            removed = reactions.remove_reaction(kind, post, request.user)
+            active = not removed
+            created = active and reactions.add_reaction(kind, post, request.user)
+
+        from notifications.utils import create_notification, retract_notification
+        if removed:
+            retract_notification(recipient=post.user, sender=request.user, type=notification_type, post=post)
+        if created:
             create_notification(
                 recipient=post.user,
                 sender=request.user,
-                type='LIKE',
+                type=notification_type,
                 post=post,
-                message=f'{request.user.username} curtiu seu post  '
+                message=message
             )
 
-        return Response(status=204)
+        if request.method == 'POST':
+            return Response(status=204)
+        return Response({"active": active, "count": reactions.reaction_count(kind, post)})
+
+    # Curtidas: adiciona ou remove o like do post com pk.
+    @action(detail=True, methods=['post', 'put', 'delete'], permission_classes=[IsAuthenticated])
+    def like(self, request, pk=None):
+        return self.react(request, 'like', 'LIKE', f'{request.user.username} curtiu seu post  ')
 
     # Favoritos: salva ou remove post dos bookmarks.
-    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @action(detail=True, methods=['post', 'put', 'delete'], permission_classes=[IsAuthenticated])
     def bookmark(self, request, pk=None):
-        post = self.get_object()
-        if request.user in post.bookmark.all():
-            post.bookmark.remove(request.user)
-        else:
-            post.bookmark.add(request.user)
+        return self.react(request, 'bookmark', 'BOOKMARK', f'{request.user.username} salvou seu post  ')
 
-            from notifications.utils import create_notification
-            create_notification(
-                recipient=post.user,
-                sender=request.user,
-                type='BOOKMARK',
-                post=post,
-                message=f'{request.user.username} salvou seu post  '
-            )
-
-        return Response(status=204)
-
-    # Repost: cria ou desfaz repost de um post existente.
+    # Repost: cria ou desfaz repost de um post existente. Repostar um repost reposta o original (sem cadeias).
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
     def repost(self, request, pk=None):
-        original_post = self.get_object()
+        original_post = reposts.root_of(self.get_object())
         repost_instance = Post.objects.filter(user=request.user, repost=original_post).first()
 
         if repost_instance:
-            repost_instance.delete()
+            with transaction.atomic():
+                counters.post_deleted(repost_instance)
+                repost_instance.delete()
+
+            from notifications.utils import retract_notification
+            retract_notification(recipient=original_post.user, sender=request.user, type='REPOST', post=original_post)
             return Response({"detail": "Repost removed"}, status=204)
 
-        Post.objects.create(user=request.user, repost=original_post)
+        with transaction.atomic():
+            repost_instance = Post.objects.create(user=request.user, repost=original_post, repost_author_id=original_post.user_id)
+            counters.post_created(repost_instance)
+        fan_out_post(repost_instance)
 
         from notifications.utils import create_notification
         create_notification(
@@ -1,3 +1,8 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import NotificationOutbox
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin): # Permite inspecionar eventos presos (tentativas esgotadas).
+    list_display = ("type", "sender", "recipient", "attempts", "available_at", "last_error")
+    list_filter = ("type",)
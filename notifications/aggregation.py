@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import changes
+from core.models import ChangeLog, CustomUser
+from core.pubsub import publish, user_channel
+
+from .models import Notification
+from . import unread
+
+# Agrupamento de notificações na escrita: eventos do mesmo destinatário, tipo e post dentro da janela
+# NOTIFICATIONS_COALESCE_WINDOW atualizam uma única linha (contador + últimos atores) em vez de criar outra.
+# Assim o armazenamento e a leitura crescem com eventos distintos, não com o número de interações.
+
+COALESCED_TYPES = {'LIKE', 'REPOST', 'BOOKMARK', 'FOLLOW'}
+
+# Verbo no singular e no plural, para montar "alice e 41 outros curtiram seu post".
+VERBS = {
+    'LIKE': ('curtiu seu post', 'curtiram seu post'),
+    'REPOST': ('repostou seu post', 'repostaram seu post'),
+    'BOOKMARK': ('salvou seu post', 'salvaram seu post'),
+    'FOLLOW': ('começou a seguir você', 'começaram a seguir você'),
+}
+
+
+def aggregate_message(type, actor_count, recent_actors):
+    singular, plural = VERBS[type]
+    lead = recent_actors[0]['username'] if recent_actors else 'Alguém'
+    if actor_count <= 1:
+        return f'{lead} {singular}'
+    others = actor_count - 1
+    return f'{lead} e {others} {"outro" if others == 1 else "outros"} {plural}'
+
+
+def _key(item):
+    return (item.recipient_id, item.type, item.post_id)
+
+
+def _actor(event):
+    return {'id': event.sender_id, 'username': event.sender.username}
+
+
+def _known(row):
+    return set(row.actor_ids) | {a['id'] for a in row.recent_actors}
+
+
+def _add(row, event):
+    actor = _actor(event)
+    if row is None:
+        return Notification(
+            recipient_id=event.recipient_id, sender_id=event.sender_id, type=event.type, post_id=event.post_id,
+            message=event.message, created_at=event.created_at, actor_count=1, recent_actors=[actor],
+            actor_ids=[event.sender_id],
+        )
+
+    if event.sender_id not in _known(row):
+        row.actor_count += 1 # Ator novo; se já estava contado é só uma repetição.
+    row.actor_ids = [a for a in row.actor_ids if a != event.sender_id] + [event.sender_id]
+    others = [a for a in row.recent_actors if a['id'] != actor['id']]
+    row.recent_actors = [actor] + others[:settings.NOTIFICATIONS_RECENT_ACTORS - 1]
+    row.sender_id = event.sender_id
+    row.created_at = event.created_at
+    row.is_read = False # Nova atividade volta a aparecer como não lida.
+    row.message = aggregate_message(row.type, row.actor_count, row.recent_actors)
+    return row
+
+
+def _retract(row, event):
+    # Só desconta quem foi contado nesta linha: a interação desfeita pode ter entrado num agrupamento anterior.
+    if row is None or event.sender_id not in _known(row):
+        return row
+    row.actor_count -= 1
+    row.actor_ids = [a for a in row.actor_ids if a != event.sender_id]
+    row.recent_actors = [a for a in row.recent_actors if a['id'] != event.sender_id]
+    if row.actor_count <= 0:
+        return None
+    if not row.recent_actors:
+        # Saíram todos os recentes: o ator contado mais recente passa a ser o remetente.
+        lead = CustomUser.objects.filter(pk__in=row.actor_ids[-1:]).values('id', 'username').first()
+        if lead is None:
+            return None # Linha anterior a actor_ids, sem nenhum ator conhecido para mostrar.
+        row.recent_actors = [lead]
+    row.sender_id = row.recent_actors[0]['id']
+    row.message = aggregate_message(row.type, row.actor_count, row.recent_actors)
+    return row
+
+
+def apply_events(events):
+    # Aplica uma sequência de eventos (NotificationOutbox, salvos ou não) às notificações, em ordem.
+    plain = [e for e in events if e.type not in COALESCED_TYPES and e.action == 'CREATE']
+    grouped = OrderedDict()
+    for event in events:
+        if event.type in COALESCED_TYPES:
+            grouped.setdefault(_key(event), []).append(event)
+
+    with transaction.atomic():
+        changed, deleted = [], []
+        if plain:
+            changed = Notification.objects.bulk_create(
+                Notification(recipient_id=e.recipient_id, sender_id=e.sender_id, type=e.type, post_id=e.post_id,
+                             message=e.message, created_at=e.created_at)
+                for e in plain
+            )
+        if grouped:
+            grouped_changed, deleted = _apply_grouped(grouped)
+            changed += grouped_changed
+        # Registro de mudanças da sincronização incremental (ver core/changes.py).
+        changes.record_many(ChangeLog.NOTIFICATION, [(row.recipient_id, row.pk) for row in changed])
+        changes.record_many(ChangeLog.NOTIFICATION_DELETED, deleted)
+
+    recipient_ids = {e.recipient_id for e in events}
+    unread.invalidate(recipient_ids) # O contador em cache é recalculado na próxima leitura.
+    # Avisa as conexões abertas (stream de eventos) depois que as notificações estiverem gravadas.
+    transaction.on_commit(lambda: publish([user_channel(user_id) for user_id in recipient_ids], {'type': 'notification'}))
+
+
+def _apply_grouped(grouped):
+    # Agregados ainda abertos (dentro da janela) para as chaves do lote, travados contra outros workers.
+    since = timezone.now() - timedelta(seconds=settings.NOTIFICATIONS_COALESCE_WINDOW)
+    condition = Q()
+    for recipient_id, type, post_id in grouped:
+        condition |= Q(recipient_id=recipient_id, type=type, post_id=post_id)
+    existing = {}
+    for row in Notification.objects.select_for_update().filter(condition, created_at__gte=since).order_by('created_at'):
+        existing[_key(row)] = row # Fica a mais recente de cada chave.
+
+    to_create, to_update, to_delete = [], [], []
+    for key, key_events in grouped.items():
+        original = existing.get(key)
+        row = original
+        for event in key_events:
+            row = _add(row, event) if event.action == 'CREATE' else _retract(row, event)
+
+        if original is not None and row is not original:
+            to_delete.append((original.recipient_id, original.pk)) # Zerou (e talvez recomeçou numa linha nova).
+        if row is None:
+            continue
+        if row.pk is None:
+            to_create.append(row)
+        else:
+            to_update.append(row)
+
+    Notification.objects.bulk_create(to_create)
+    Notification.objects.bulk_update(to_update, ['sender', 'message', 'created_at', 'is_read', 'actor_count', 'recent_actors', 'actor_ids'])
+    Notification.objects.filter(pk__in=[pk for _, pk in to_delete]).delete()
+    return to_create + to_update, to_delete
@@ -0,0 +1,19 @@
+from asgiref.sync import sync_to_async
+from rest_framework.settings import api_settings
+
+from core.async_views import async_api, authenticate, render
+from .models import Notification
+from .serializers import NotificationSerializer
+
+# GET /api/notifications/ assíncrono (ver core/async_views.py): COUNT e página em paralelo.
+
+
+@async_api
+async def notification_list(request):
+    request = await authenticate(request)
+    queryset = Notification.objects.filter(recipient=request.user).select_related('sender')
+
+    paginator = api_settings.DEFAULT_PAGINATION_CLASS()
+    page = await paginator.apaginate_queryset(queryset, request)
+    data = await sync_to_async(lambda: NotificationSerializer(page, many=True, context={'request': request}).data)()
+    return render(paginator.get_paginated_response(data).data)
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Entrega as notificações pendentes do outbox em lotes (bulk_create)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--loop", type=float, default=0, metavar="SEGUNDOS", help="Fica rodando e espera N segundos quando a fila esvazia.")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = deliver_pending(options["batch_size"])
+            total += processed
+            if processed == options["batch_size"]:
+                continue # Lote cheio: ainda pode haver eventos, drena sem esperar.
+            if not options["loop"]:
+                break
+            time.sleep(options["loop"])
+        self.stdout.write(self.style.SUCCESS(f"{total} eventos processados."))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2 on 2026-10-17 20:42
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fill_recent_actors(apps, schema_editor):
+    # Notificações antigas passam a listar o próprio sender como ator.
+    Notification = apps.get_model('notifications', 'Notification')
+    batch = []
+    for notification in Notification.objects.select_related('sender').iterator(chunk_size=1000):
+        notification.recent_actors = [{'id': notification.sender_id, 'username': notification.sender.username}]
+        batch.append(notification)
+        if len(batch) >= 1000:
+            Notification.objects.bulk_update(batch, ['recent_actors'])
+            batch = []
+    Notification.objects.bulk_update(batch, ['recent_actors'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notificationoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='recent_actors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='action',
+            field=models.CharField(choices=[('CREATE', 'Create'), ('RETRACT', 'Retract')], default='CREATE', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='message',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(fill_recent_actors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-17 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notification_read_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='type',
+            field=models.CharField(choices=[('FOLLOW', 'Follow'), ('LIKE', 'Like'), ('COMMENT', 'Comment'), ('REPOST', 'Repost'), ('BOOKMARK', 'Bookmark'), ('MENTION', 'Mention')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='type',
+            field=models.CharField(choices=[('FOLLOW', 'Follow'), ('LIKE', 'Like'), ('COMMENT', 'Comment'), ('REPOST', 'Repost'), ('BOOKMARK', 'Bookmark'), ('MENTION', 'Mention')], max_length=20),
+        ),
+    ]
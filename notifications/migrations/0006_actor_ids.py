@@ -0,0 +1,31 @@
+# Generated by Django 5.2 on 2026-10-17 21:44
+
+from django.db import migrations, models
+
+
+def fill_actor_ids(apps, schema_editor):
+    # Linhas existentes: os atores recentes são os únicos conhecidos (mais recente por último).
+    Notification = apps.get_model('notifications', 'Notification')
+    batch = []
+    for notification in Notification.objects.exclude(recent_actors=[]).iterator(chunk_size=1000):
+        notification.actor_ids = [actor['id'] for actor in reversed(notification.recent_actors)]
+        batch.append(notification)
+        if len(batch) >= 1000:
+            Notification.objects.bulk_update(batch, ['actor_ids'])
+            batch = []
+    Notification.objects.bulk_update(batch, ['actor_ids'])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_mention_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fill_actor_ids, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from core.models import Post
 
 class Notification(models.Model):
@@ -9,6 +10,7 @@ class Notification(models.Model):
         ('COMMENT', 'Comment'),
         ('REPOST', 'Repost'),
         ('BOOKMARK', 'Bookmark'),
+        ('MENTION', 'Mention'),
     ]
     recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notifications')
     sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='sent_notifications')
@@ -16,10 +18,46 @@ class Notification(models.Model):
     message = models.CharField(max_length=255)
     post = models.ForeignKey(Post, null=True, blank=True, on_delete=models.CASCADE, related_name='notifications')
     is_read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now) # Em notificações agrupadas, é a data da interação mais recente.
+
+    # Agrupamento ("alice e 41 outros curtiram seu post"): interações do mesmo tipo e post dentro da janela
+    # NOTIFICATIONS_COALESCE_WINDOW viram uma única linha (ver aggregation.py). sender é o ator mais recente.
+    actor_count = models.PositiveIntegerField(default=1)
+    recent_actors = models.JSONField(default=list, blank=True) # Últimos atores: [{"id": ..., "username": ...}], mais recente primeiro.
+    actor_ids = models.JSONField(default=list, blank=True) # Ids de todos os atores contados, mais recente por último (desfazer só desconta quem está aqui).
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_read_idx'), # Lista e contagem de não lidas só pelo índice.
+        ]
 
     def __str__(self):
         return f"{self.sender} -> {self.recipient} ({self.type})"
+
+
+class NotificationOutbox(models.Model):
+    # Evento de notificação pendente. A requisição só grava aqui; o comando deliver_notifications
+    # entrega em lote (bulk_create) e apaga os eventos entregues. Falhas voltam com backoff (entrega ao menos uma vez).
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    sender = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    ACTION_CHOICES = [
+        ('CREATE', 'Create'),
+        ('RETRACT', 'Retract'), # Desfaz a interação (ex.: unlike) e atualiza a notificação agrupada.
+    ]
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, default='CREATE')
+    type = models.CharField(max_length=20, choices=Notification.TYPE_CHOICES)
+    message = models.CharField(max_length=255, blank=True)
+    post = models.ForeignKey(Post, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now) # Próxima tentativa (backoff após falha).
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at', 'id'], name='outbox_available_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sender} -> {self.recipient} ({self.type}, tentativas: {self.attempts})"
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .aggregation import apply_events
+from .models import NotificationOutbox
+
+
+def enqueue(recipient, sender, type, message='', post=None, action='CREATE'):
+    NotificationOutbox.objects.create(recipient=recipient, sender=sender, type=type, message=message, post=post, action=action)
+
+
+def _deliver(events):
+    apply_events(events) # Cria ou agrupa as notificações (ver aggregation.py).
+
+
+def _retry_later(event, error):
+    delay = settings.NOTIFICATIONS_RETRY_BACKOFF * 2 ** event.attempts # Backoff exponencial.
+    NotificationOutbox.objects.filter(pk=event.pk).update(
+        attempts=F('attempts') + 1,
+        available_at=timezone.now() + timedelta(seconds=delay),
+        last_error=str(error)[:1000],
+    )
+
+
+def deliver_pending(batch_size=500):
+    # Entrega um lote de eventos prontos. Retorna quantos foram processados (0 = fila vazia).
+    with transaction.atomic():
+        events = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True, of=('self',)) # Vários workers não pegam o mesmo lote.
+            .select_related('sender')
+            .filter(available_at__lte=timezone.now(), attempts__lt=settings.NOTIFICATIONS_MAX_ATTEMPTS)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return 0
+
+        try:
+            with transaction.atomic():
+                _deliver(events)
+            delivered = events
+        except DatabaseError:
+            # Um evento ruim não pode travar o lote: tenta um a um e só reagenda quem falhar.
+            delivered = []
+            for event in events:
+                try:
+                    with transaction.atomic():
+                        _deliver([event])
+                    delivered.append(event)
+                except DatabaseError as error:
+                    _retry_later(event, error)
+
+        NotificationOutbox.objects.filter(pk__in=[event.pk for event in delivered]).delete()
+    return len(events)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from core.instrumentation import TimedListSerializer, TimedSerializerMixin
 from .models import Notification
 
 class SenderMiniSerializer(serializers.ModelSerializer):
@@ -7,10 +8,11 @@ class SenderMiniSerializer(serializers.ModelSerializer):
         model = get_user_model()
         fields = ('username',)
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     sender = SenderMiniSerializer(read_only=True)
 
     class Meta:
         model = Notification
-        fields = ('id', 'recipient', 'sender', 'message', 'type', 'post', 'is_read', 'created_at')
-        read_only_fields = ('recipient', 'sender', 'created_at')
+        fields = ('id', 'recipient', 'sender', 'message', 'type', 'post', 'is_read', 'created_at', 'actor_count', 'recent_actors')
+        read_only_fields = ('recipient', 'sender', 'created_at', 'actor_count', 'recent_actors')
+        list_serializer_class = TimedListSerializer
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from core.authentication import CachedJWTAuthentication
+from core.pubsub import author_channel, get_broker, user_channel
+from core.timeline import popular_following_ids
+from . import unread
+
+# Endpoints assíncronos de eventos em tempo real (rodar sob ASGI, ver config/asgi.py):
+# - GET /api/events/stream/  Server-Sent Events; conexão aberta recebe "notifications" e "new_posts".
+# - GET /api/events/poll/    long-poll: espera até `timeout` segundos pelo próximo lote de eventos.
+# Enquanto espera, a conexão é só uma corrotina parada: não prende thread nem worker.
+# Autenticação pelo header "Authorization: Bearer <token>" ou por ?ticket= (EventSource não envia headers):
+# - POST /api/events/ticket/ (autenticado) devolve um ticket de uso único, válido por EVENTS_TICKET_TTL segundos.
+# - O access token nunca vai na URL, que acaba em logs de proxy e no histórico do navegador; um ticket vazado
+#   já foi gasto ou expira em segundos, e só abre o stream.
+# - O usuário sai do mesmo cache da autenticação JWT (ver core/authentication.py).
+
+
+def _ticket_key(ticket):
+    return f"events:ticket:{ticket}"
+
+
+def issue_ticket(user_id):
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_ticket_key(ticket), user_id, settings.EVENTS_TICKET_TTL)
+    return ticket
+
+
+def redeem_ticket(ticket):
+    key = _ticket_key(ticket)
+    user_id = cache.get(key)
+    # O delete decide o uso único: entre duas conexões com o mesmo ticket, só uma remove a chave.
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+class EventTicketView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({'ticket': issue_ticket(request.user.pk), 'expires_in': settings.EVENTS_TICKET_TTL})
+
+
+def _authenticate(request):
+    authentication = CachedJWTAuthentication()
+    try:
+        if request.headers.get('Authorization'):
+            result = authentication.authenticate(request)
+            return result and result[0]
+        user_id = redeem_ticket(request.GET.get('ticket', ''))
+        if user_id is None:
+            return None
+        authentication.cacheable = True # Só leitura daqui em diante, como um GET autenticado por header.
+        return authentication.get_user({api_settings.USER_ID_CLAIM: user_id})
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def _channels(user):
+    return [user_channel(user.pk)] + [author_channel(author_id) for author_id in popular_following_ids(user)]
+
+
+async def _open(request):
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return None, None
+    channels = await sync_to_async(_channels)(user)
+    return user, await get_broker().subscribe(channels)
+
+
+async def _next_batch(subscription, timeout):
+    # Espera o primeiro evento e junta o que mais já tiver chegado, para mandar um resumo só.
+    events = [await subscription.get(timeout)]
+    while True:
+        try:
+            events.append(await subscription.get(0))
+        except asyncio.TimeoutError:
+            return events
+
+
+async def _summarize(user, events):
+    payloads = []
+    if any(event.get('type') == 'notification' for event in events):
+        payloads.append({'type': 'notifications', 'unread': await sync_to_async(unread.unread_count)(user.pk)})
+    post_ids = [event['post_id'] for event in events if event.get('type') == 'new_post']
+    if post_ids:
+        payloads.append({'type': 'new_posts', 'count': len(post_ids), 'post_ids': post_ids})
+    return payloads
+
+
+def _sse(payload):
+    return f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n"
+
+
+async def _stream(user, subscription):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.EVENTS_MAX_STREAM_SECONDS # Reciclagem periódica; o EventSource reconecta sozinho.
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n\n"
+        yield _sse({'type': 'notifications', 'unread': await sync_to_async(unread.unread_count)(user.pk)})
+        while loop.time() < deadline:
+            try:
+                events = await _next_batch(subscription, settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n" # Mantém proxies sem derrubar a conexão ociosa.
+                continue
+            for payload in await _summarize(user, events):
+                yield _sse(payload)
+    finally:
+        await subscription.close()
+
+
+async def event_stream(request):
+    user, subscription = await _open(request)
+    if user is None:
+        return JsonResponse({'detail': 'As credenciais de autenticação não foram fornecidas.'}, status=401)
+    response = StreamingHttpResponse(_stream(user, subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no' # Desliga o buffer do nginx para o SSE.
+    return response
+
+
+async def event_poll(request):
+    try:
+        timeout = min(float(request.GET.get('timeout', settings.EVENTS_LONGPOLL_SECONDS)), settings.EVENTS_LONGPOLL_SECONDS)
+    except ValueError:
+        return JsonResponse({'detail': 'timeout inválido.'}, status=400)
+
+    user, subscription = await _open(request)
+    if user is None:
+        return JsonResponse({'detail': 'As credenciais de autenticação não foram fornecidas.'}, status=401)
+    try:
+        events = await _next_batch(subscription, max(timeout, 0))
+    except asyncio.TimeoutError:
+        events = []
+    finally:
+        await subscription.close()
+    return JsonResponse({'events': await _summarize(user, events)})
@@ -1,3 +1,245 @@
-from django.test import TestCase
+import asyncio
+import json
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import CustomUser, Post
+from core.pubsub import publish, user_channel
+from core.timeline import fan_out_post
+from . import unread
+from .models import Notification, NotificationOutbox
+from .utils import create_notification, retract_notification
+
+
+class OutboxDeliveryTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.post = Post.objects.create(user=self.bob, content="oi")
+
+    @override_settings(NOTIFICATIONS_DELIVERY="sync")
+    def test_sync_mode_writes_immediately(self):
+        create_notification(self.bob, self.alice, "LIKE", "alice curtiu seu post", post=self.post)
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    @override_settings(NOTIFICATIONS_DELIVERY="outbox")
+    def test_worker_drains_outbox_in_batches(self):
+        carol = CustomUser.objects.create_user(username="carol", password="x")
+        create_notification(self.bob, self.alice, "LIKE", "alice curtiu seu post", post=self.post)
+        create_notification(self.bob, carol, "LIKE", "carol curtiu seu post", post=self.post)
+        create_notification(self.alice, self.bob, "FOLLOW", "bob começou a seguir você")
+        self.assertEqual(Notification.objects.count(), 0)
+
+        call_command("deliver_notifications", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(Notification.objects.get(recipient=self.bob).actor_count, 2)
+        self.assertEqual(Notification.objects.filter(recipient=self.alice).count(), 1)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    @override_settings(NOTIFICATIONS_DELIVERY="outbox")
+    def test_self_interactions_are_not_notified(self):
+        # Mesmo comportamento de antes do outbox: curtir o próprio post não notifica.
+        create_notification(self.bob, self.bob, "LIKE", "bob curtiu seu post", post=self.post)
+        retract_notification(self.bob, self.bob, "LIKE", post=self.post)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    @override_settings(NOTIFICATIONS_DELIVERY="outbox", METRICS_TOKEN="segredo")
+    def test_pending_outbox_is_reported_in_metrics(self):
+        create_notification(self.bob, self.alice, "FOLLOW", "alice começou a seguir você")
+        body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer segredo").content.decode()
+        self.assertIn("notifications_outbox_pending 1", body)
+        self.assertIn("notifications_outbox_oldest_seconds", body)
+
+    @override_settings(NOTIFICATIONS_DELIVERY="outbox", NOTIFICATIONS_RETRY_BACKOFF=0)
+    def test_failed_delivery_is_retried(self):
+        create_notification(self.bob, self.alice, "FOLLOW", "alice começou a seguir você")
+
+        with mock.patch.object(Notification.objects, "bulk_create", side_effect=DatabaseError("fora do ar")):
+            call_command("deliver_notifications", stdout=StringIO())
+        event = NotificationOutbox.objects.get()
+        self.assertEqual((event.attempts, event.last_error), (1, "fora do ar"))
+
+        call_command("deliver_notifications", stdout=StringIO())
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+
+@override_settings(NOTIFICATIONS_DELIVERY="sync")
+class CoalescingTests(TestCase):
+    def setUp(self):
+        self.author = CustomUser.objects.create_user(username="autor", password="x")
+        self.fans = [CustomUser.objects.create_user(username=f"fan{i}", password="x") for i in range(5)]
+        self.post = Post.objects.create(user=self.author, content="viral")
+
+    def like(self, fan):
+        create_notification(self.author, fan, "LIKE", f"{fan.username} curtiu seu post", post=self.post)
+
+    def test_likes_on_same_post_are_merged(self):
+        for fan in self.fans:
+            self.like(fan)
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor_count, 5)
+        self.assertEqual([a["username"] for a in notification.recent_actors], ["fan4", "fan3", "fan2"])
+        self.assertEqual(notification.message, "fan4 e 4 outros curtiram seu post")
+
+    def test_unlike_updates_and_finally_removes_the_aggregate(self):
+        self.like(self.fans[0])
+        self.like(self.fans[1])
+        retract_notification(self.author, self.fans[1], "LIKE", post=self.post)
+
+        notification = Notification.objects.get()
+        self.assertEqual((notification.actor_count, notification.sender_id), (1, self.fans[0].id))
+        self.assertEqual(notification.message, "fan0 curtiu seu post")
+
+        retract_notification(self.author, self.fans[0], "LIKE", post=self.post)
+        self.assertFalse(Notification.objects.exists())
+
+    def test_retract_only_discounts_counted_actors(self):
+        for fan in self.fans[:4]:
+            self.like(fan)
+        outsider = CustomUser.objects.create_user(username="fora", password="x") # Like contado em outro agrupamento.
+        retract_notification(self.author, outsider, "LIKE", post=self.post)
+        self.assertEqual(Notification.objects.get().actor_count, 4)
+
+        retract_notification(self.author, self.fans[0], "LIKE", post=self.post) # Fora dos recentes, mas contado.
+        self.assertEqual(Notification.objects.get().actor_count, 3)
+
+    def test_sender_moves_on_when_all_recent_actors_retract(self):
+        for fan in self.fans:
+            self.like(fan)
+        for fan in self.fans[2:]:
+            retract_notification(self.author, fan, "LIKE", post=self.post)
+
+        notification = Notification.objects.get()
+        self.assertEqual((notification.actor_count, notification.sender_id), (2, self.fans[1].id))
+        self.assertEqual(notification.message, "fan1 e 1 outro curtiram seu post")
+
+    def test_like_endpoint_feeds_the_aggregate(self):
+        client = APIClient()
+        for fan in self.fans[:2]:
+            client.force_authenticate(fan)
+            client.post(f"/api/posts/{self.post.id}/like/")
+        client.post(f"/api/posts/{self.post.id}/like/") # fan1 desfaz o like
+
+        author_client = APIClient()
+        author_client.force_authenticate(self.author)
+        results = author_client.get("/api/notifications/").data["results"]
+        self.assertEqual([(n["actor_count"], n["type"]) for n in results], [(1, "LIKE")])
+
+
+@override_settings(NOTIFICATIONS_DELIVERY="sync")
+class ReadStateTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.others = [CustomUser.objects.create_user(username=f"u{i}", password="x") for i in range(3)]
+        for other in self.others:
+            create_notification(self.alice, other, "COMMENT", f"{other.username} comentou")
+        self.client = APIClient()
+        self.client.force_authenticate(self.alice)
+
+    def unread(self):
+        return self.client.get("/api/notifications/unread_count/").data["unreadNotifications"]
+
+    def test_unread_count_is_served_from_cache(self):
+        self.assertEqual(self.unread(), 3)
+        with self.assertNumQueries(0):
+            self.assertEqual(unread.unread_count(self.alice.pk), 3)
+
+        create_notification(self.alice, self.others[0], "FOLLOW", "u0 começou a seguir você")
+        self.assertEqual(self.unread(), 4)
+
+    def test_mark_all_read_is_a_single_update(self):
+        self.assertEqual(self.unread(), 3)
+        self.assertEqual(self.client.post("/api/notifications/mark_all_read/").data, {"updated": 3})
+        self.assertEqual(self.unread(), 0)
+
+    def test_mark_read_by_ids_and_up_to(self):
+        notifications = list(Notification.objects.order_by("created_at"))
+        self.unread()
+
+        response = self.client.post("/api/notifications/mark_read/", {"ids": [notifications[0].id]}, format="json")
+        self.assertEqual(response.data, {"updated": 1})
+        self.assertEqual(self.unread(), 2)
+
+        up_to = notifications[1].created_at.isoformat()
+        response = self.client.post("/api/notifications/mark_read/", {"up_to": up_to}, format="json")
+        self.assertEqual(response.data, {"updated": 1})
+        self.assertEqual(self.unread(), 1)
+
+        for invalid in ("ontem", "2020-13-45T00:00:00"):
+            response = self.client.post("/api/notifications/mark_read/", {"up_to": invalid}, format="json")
+            self.assertEqual(response.status_code, 400)
+
+    def test_mark_as_read_only_touches_own_notifications(self):
+        foreign = Notification.objects.create(recipient=self.others[0], sender=self.alice, type="COMMENT", message="x")
+        self.assertEqual(self.client.post(f"/api/notifications/{foreign.id}/mark_as_read/").status_code, 404)
+
+
+class EventStreamTests(TestCase):
+    def setUp(self):
+        self.alice = CustomUser.objects.create_user(username="alice", password="x")
+        self.bob = CustomUser.objects.create_user(username="bob", password="x")
+        self.auth = {"Authorization": f"Bearer {AccessToken.for_user(self.alice)}"}
+
+    async def publish_later(self, event):
+        await asyncio.sleep(0.05)
+        publish([user_channel(self.alice.pk)], event)
+
+    async def test_long_poll_returns_next_events(self):
+        response, _ = await asyncio.gather(
+            self.async_client.get("/api/events/poll/?timeout=2", headers=self.auth),
+            self.publish_later({"type": "new_post", "post_id": 7, "author_id": self.bob.pk}),
+        )
+        self.assertEqual(json.loads(response.content), {"events": [{"type": "new_posts", "count": 1, "post_ids": [7]}]})
+
+    async def test_long_poll_times_out_empty(self):
+        response = await self.async_client.get("/api/events/poll/?timeout=0.05", headers=self.auth)
+        self.assertEqual(json.loads(response.content), {"events": []})
+
+    async def test_stream_requires_token(self):
+        response = await self.async_client.get("/api/events/stream/")
+        self.assertEqual(response.status_code, 401)
+
+    async def ticket(self):
+        response = await self.async_client.post("/api/events/ticket/", headers=self.auth)
+        return json.loads(response.content)["ticket"]
+
+    async def test_stream_rejects_access_token_in_query_string(self):
+        response = await self.async_client.get(f"/api/events/stream/?token={AccessToken.for_user(self.alice)}")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_ticket_is_single_use(self):
+        self.assertEqual((await self.async_client.post("/api/events/ticket/")).status_code, 401)
+        ticket = await self.ticket()
+        response = await self.async_client.get(f"/api/events/poll/?timeout=0&ticket={ticket}")
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(f"/api/events/poll/?timeout=0&ticket={ticket}")
+        self.assertEqual(response.status_code, 401)
+
+    async def test_stream_pushes_notification_count(self):
+        response = await self.async_client.get(f"/api/events/stream/?ticket={await self.ticket()}")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = aiter(response.streaming_content)
+        await anext(chunks) # retry
+        self.assertIn(b'"unread": 0', await anext(chunks))
+
+        await self.publish_later({"type": "notification"})
+        self.assertIn(b"event: notifications", await anext(chunks))
+        await chunks.aclose()
+
+    def test_fan_out_publishes_new_post_to_followers(self):
+        self.bob.followers.add(self.alice)
+        with mock.patch("core.timeline.publish") as publish_mock, self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(user=self.bob, content="oi")
+            fan_out_post(post)
+        publish_mock.assert_called_once_with([user_channel(self.alice.pk)], {"type": "new_post", "post_id": post.pk, "author_id": self.bob.pk})
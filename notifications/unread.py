@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Notification
+
+# Contador de não lidas em cache, para o polling de unread_count não fazer COUNT a cada chamada.
+# Marcar como lida desconta do valor em cache; criação/agrupamento de notificações invalida a chave
+# (o próximo unread_count recalcula pelo índice (recipient, is_read, created_at)).
+
+KEY = 'notifications:unread:{user_id}'
+
+
+def unread_count(user_id):
+    key = KEY.format(user_id=user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cache.set(key, count, settings.NOTIFICATIONS_UNREAD_CACHE_TTL)
+    return count
+
+
+def discount(user_id, amount):
+    if not amount:
+        return
+    key = KEY.format(user_id=user_id)
+    try:
+        if cache.decr(key, amount) < 0:
+            cache.delete(key)
+    except ValueError:
+        pass # Sem valor em cache: será recalculado na próxima leitura.
+
+
+def invalidate(user_ids):
+    cache.delete_many([KEY.format(user_id=user_id) for user_id in set(user_ids)])
@@ -1,11 +1,24 @@
-from .models import Notification
+from django.conf import settings
+
+from .aggregation import apply_events
+from .models import NotificationOutbox
+from .outbox import enqueue
+
+# Modo "outbox" (deploy com worker): só registra o evento; o comando deliver_notifications entrega em lote.
+# Modo "sync" (padrão): aplica o evento na própria requisição.
+# Interações com o próprio conteúdo (curtir o próprio post...) não geram notificação, como antes do outbox.
+
+def _dispatch(recipient, sender, type, message, post, action):
+    if recipient == sender:
+        return
+    if settings.NOTIFICATIONS_DELIVERY == 'sync':
+        apply_events([NotificationOutbox(recipient=recipient, sender=sender, type=type, message=message, post=post, action=action)])
+    else:
+        enqueue(recipient=recipient, sender=sender, type=type, message=message, post=post, action=action)
 
 def create_notification(recipient, sender, type, message, post=None):
-    if recipient != sender:
-        Notification.objects.create(
-            recipient=recipient,
-            sender=sender,
-            type=type,
-            message=message,
-            post=post
-        )
+    _dispatch(recipient, sender, type, message, post, 'CREATE')
+
+def retract_notification(recipient, sender, type, post=None):
+    # Desfaz a participação do sender numa notificação agrupada (unlike, unfollow, repost removido...).
+    _dispatch(recipient, sender, type, '', post, 'RETRACT')
@@ -1,26 +1,64 @@
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Notification
 from .serializers import NotificationSerializer
+from . import unread
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Notification.objects.filter(recipient=self.request.user)
+        return Notification.objects.filter(recipient=self.request.user).select_related('sender')
+
+    # Marca como lidas numa única UPDATE e desconta do contador em cache.
+    def mark_queryset_read(self, queryset):
+        updated = queryset.filter(is_read=False).update(is_read=True)
+        unread.discount(self.request.user.pk, updated)
+        return updated
 
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
-        count = self.get_queryset().filter(is_read=False).count()
-        return Response({'unreadNotifications': count})
+        return Response({'unreadNotifications': unread.unread_count(request.user.pk)})
 
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
-        notif = self.get_object()
-        if notif.recipient != request.user:
-            return Response(status=403)
-        notif.is_read = True
-        notif.save(update_fields=['is_read'])
+        queryset = self.get_queryset().filter(pk=pk)
+        if not queryset.exists():
+            return Response(status=404)
+        self.mark_queryset_read(queryset)
         return Response(status=204)
+
+    # POST /notifications/mark_all_read/
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        updated = self.mark_queryset_read(self.get_queryset())
+        return Response({'updated': updated})
+
+    # POST /notifications/mark_read/ com {"ids": [1, 2, 3]} e/ou {"up_to": "<created_at ISO>"}
+    # (marca tudo até a notificação mais recente que o cliente já exibiu).
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        ids = request.data.get('ids')
+        up_to = request.data.get('up_to')
+        if not ids and not up_to:
+            return Response({'detail': 'Informe "ids" ou "up_to".'}, status=400)
+
+        queryset = self.get_queryset()
+        if ids:
+            if not isinstance(ids, list) or not all(str(i).isdigit() for i in ids):
+                return Response({'detail': '"ids" deve ser uma lista de inteiros.'}, status=400)
+            queryset = queryset.filter(pk__in=ids)
+        if up_to:
+            try:
+                moment = parse_datetime(str(up_to))
+            except ValueError: # Formato certo, data impossível (ex.: mês 13).
+                moment = None
+            if moment is None:
+                return Response({'detail': '"up_to" deve ser uma data ISO 8601.'}, status=400)
+            queryset = queryset.filter(created_at__lte=moment)
+
+        updated = self.mark_queryset_read(queryset)
+        return Response({'updated': updated})